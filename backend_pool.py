@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Load balancing across several Ollama hosts
+BackendPool has the same methods as OllamaClient, so the gateway and the apps can use it
+in place of a single client. Each request goes to a healthy host that has the model,
+preferring one that already holds it in memory unless that host is clearly busier, and
+otherwise the one with the fewest requests in flight. A host that refuses the connection
+or answers 5xx is marked down and the request is retried on the next one. /api/tags and
+/api/ps are polled in the background to keep health, model lists and residency current.
+
+    OLLAMA_URLS=http://gpu-box:11434,http://cpu-1:11434 python3 gateway_server.py
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple, TypeVar, Union
+
+from ollama_client import (DEFAULT_OLLAMA_URL, GATEWAY_URL, ChatChunk, ChatStream, Message, ModelInfo, OllamaClient,
+                           OllamaConnectionError, OllamaError, OllamaHTTPError, get_client)
+
+T = TypeVar("T")
+
+
+def configured_urls(default: str = DEFAULT_OLLAMA_URL) -> List[str]:
+    """Ollama hosts from OLLAMA_URLS (comma-separated) or OLLAMA_URL"""
+    urls = os.environ.get("OLLAMA_URLS") or os.environ.get("OLLAMA_URL") or default
+    return [url.strip().rstrip("/") for url in urls.split(",") if url.strip()]
+
+
+class Backend:
+    """One Ollama host and what the pool knows about it"""
+
+    def __init__(self, url: str, client: OllamaClient):
+        self.url = url
+        self.client = client
+        self.healthy = True  # Optimistic until the first health check says otherwise
+        self.models: Optional[Set[str]] = None  # None until /api/tags has answered
+        self.loaded: Set[str] = set()
+        self.outstanding = 0
+        self.served = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self.checked_at = 0.0
+
+    def has_model(self, model: Optional[str]) -> bool:
+        return model is None or self.models is None or model in self.models
+
+    def stats(self) -> Dict[str, Any]:
+        return {"healthy": self.healthy, "outstanding": self.outstanding, "served": self.served,
+                "failures": self.failures, "loaded": sorted(self.loaded), "last_error": self.last_error}
+
+
+class PooledStream:
+    """A ChatStream that gives its backend slot back when it ends or is closed"""
+
+    def __init__(self, stream: ChatStream, release: Callable[[], None]):
+        self.stream = stream
+        self._release = release
+        self._released = False
+        self._lock = threading.Lock()
+
+    def _done(self):
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        self._release()
+
+    def __iter__(self) -> Iterator[ChatChunk]:
+        try:
+            yield from self.stream
+        finally:
+            self._done()
+
+    @property
+    def closed(self) -> bool:
+        return self.stream.closed
+
+    def close(self):
+        self.stream.close()
+        self._done()
+
+
+class BackendPool:
+    """Routes requests over several Ollama hosts; a drop-in for OllamaClient"""
+
+    def __init__(self, urls: List[str], timeouts: Optional[Dict[str, Tuple[float, float]]] = None,
+                 pool_size: int = 8, check_interval: float = 15.0, affinity_weight: int = 2):
+        if not urls:
+            raise ValueError("BackendPool needs at least one URL")
+        self.backends = [Backend(url.rstrip("/"), OllamaClient(url, timeouts, pool_size)) for url in urls]
+        self.base_url = ",".join(backend.url for backend in self.backends)  # For logging
+        self.check_interval = check_interval
+        # A host holding the model wins unless it has this many more requests in flight
+        self.affinity_weight = affinity_weight
+        self.failovers = 0
+        self._checked = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._checker: Optional[threading.Thread] = None
+        self._executor = ThreadPoolExecutor(max_workers=len(self.backends), thread_name_prefix="pool-check")
+
+    # Health checks
+
+    def check(self):
+        """Probe every host concurrently (/api/tags, then /api/ps on the ones that answer)"""
+        list(self._executor.map(self._probe, self.backends))
+        self._checked = True
+
+    def _probe(self, backend: Backend):
+        try:
+            models = backend.client.tags()
+            loaded = backend.client.ps()
+        except OllamaError as e:
+            self._mark_down(backend, e)
+            return
+        with self._lock:
+            backend.models = {model["name"] for model in models}
+            backend.loaded = {model["name"] for model in loaded}
+            backend.healthy = True
+            backend.checked_at = time.time()
+
+    def start_health_checks(self):
+        """Re-probe every host every check_interval seconds on a background thread"""
+        if self._checker is not None:
+            return
+
+        def run():
+            while not self._stop.wait(0 if not self._checked else self.check_interval):
+                self.check()
+
+        self._checker = threading.Thread(target=run, name="pool-health", daemon=True)
+        self._checker.start()
+
+    def _mark_down(self, backend: Backend, error: Exception):
+        with self._lock:
+            backend.healthy = False
+            backend.failures += 1
+            backend.last_error = str(error)
+            backend.checked_at = time.time()
+
+    # Routing
+
+    def _acquire(self, model: Optional[str], exclude: List[Backend]) -> Optional[Backend]:
+        """Pick a host for model and count the request against it"""
+        if not self._checked:
+            self.check()
+        with self._lock:
+            candidates = [b for b in self.backends if b not in exclude and b.has_model(model)]
+            # Hosts marked down are only tried when no healthy host is left
+            healthy = [b for b in candidates if b.healthy]
+            if not healthy and any(b.healthy and not b.has_model(model) for b in self.backends):
+                return None  # The hosts that are up do not have the model; skip the ones that are down
+            candidates = healthy or candidates
+            if not candidates:
+                return None
+            backend = min(candidates, key=lambda b: (
+                b.outstanding + (0 if model in b.loaded else self.affinity_weight),
+                self.backends.index(b)))
+            backend.outstanding += 1
+            return backend
+
+    def _release(self, backend: Backend, model: Optional[str] = None, served: bool = True):
+        with self._lock:
+            backend.outstanding -= 1
+            if served:
+                backend.served += 1
+            if model:
+                backend.loaded.add(model)
+
+    def _route(self, model: Optional[str], call: Callable[[OllamaClient], T],
+               keep_slot: bool = False) -> Tuple[Backend, T]:
+        """Run call on the best host, failing over to the next one on connection or server errors
+
+        A 404 (model missing on that host) also moves on to the next host. With keep_slot the
+        caller releases the host itself (streams hold it until they end).
+        """
+        tried: List[Backend] = []
+        last_error: Optional[OllamaError] = None
+        not_found: Optional[OllamaHTTPError] = None  # Reported in preference to hosts being down
+        while True:
+            backend = self._acquire(model, tried)
+            if backend is None:
+                raise not_found or last_error or self._unavailable(model)
+            tried.append(backend)
+            try:
+                result = call(backend.client)
+            except OllamaHTTPError as e:
+                self._release(backend, served=False)
+                if e.status_code == 404:
+                    not_found = e
+                    with self._lock:
+                        if backend.models is not None:
+                            backend.models.discard(model)
+                elif e.status_code >= 500:
+                    self._mark_down(backend, e)
+                    last_error = e
+                else:
+                    raise
+                self._count_failover()
+                continue
+            except OllamaConnectionError as e:
+                self._release(backend, served=False)
+                self._mark_down(backend, e)
+                last_error = e
+                self._count_failover()
+                continue
+            except BaseException:
+                self._release(backend, served=False)
+                raise
+            if not keep_slot:
+                self._release(backend, model)
+            return backend, result
+
+    def _unavailable(self, model: Optional[str]) -> OllamaError:
+        with self._lock:
+            if any(b.healthy and not b.has_model(model) for b in self.backends):
+                return OllamaHTTPError(404, f"model '{model}' not found on any host")
+        return OllamaConnectionError(f"No Ollama host available{f' for {model}' if model else ''}")
+
+    def _count_failover(self):
+        with self._lock:
+            self.failovers += 1
+
+    def _gather(self, call: Callable[[OllamaClient], List[ModelInfo]]) -> List[Tuple[Backend, List[ModelInfo]]]:
+        """call on every healthy host concurrently; raises when none of them answers"""
+        with self._lock:
+            backends = [b for b in self.backends if b.healthy] or list(self.backends)
+
+        def run(backend: Backend):
+            try:
+                return backend, call(backend.client), None
+            except OllamaError as e:
+                self._mark_down(backend, e)
+                return backend, None, e
+
+        results = list(self._executor.map(run, backends))
+        answered = [(backend, models) for backend, models, _ in results if models is not None]
+        if not answered:
+            raise next(error for _, _, error in results if error is not None)
+        return answered
+
+    # OllamaClient interface
+
+    def tags(self) -> List[ModelInfo]:
+        """Models available on any healthy host (each name once)"""
+        merged: Dict[str, ModelInfo] = {}
+        for backend, models in self._gather(lambda client: client.tags()):
+            with self._lock:
+                backend.models = {model["name"] for model in models}
+                backend.healthy = True
+            for model in models:
+                merged.setdefault(model["name"], model)
+        return list(merged.values())
+
+    def model_names(self) -> List[str]:
+        return [model["name"] for model in self.tags()]
+
+    def ps(self) -> List[ModelInfo]:
+        """Models in memory on any host; also refreshes model affinity"""
+        merged: Dict[str, ModelInfo] = {}
+        for backend, models in self._gather(lambda client: client.ps()):
+            with self._lock:
+                backend.loaded = {model["name"] for model in models}
+                backend.healthy = True
+            for model in models:
+                merged.setdefault(model["name"], model)
+        return list(merged.values())
+
+    def show(self, model: str) -> Dict[str, Any]:
+        return self._route(model, lambda client: client.show(model))[1]
+
+    def load(self, model: str, keep_alive: Optional[str] = None) -> Dict[str, Any]:
+        return self._route(model, lambda client: client.load(model, keep_alive=keep_alive))[1]
+
+    def chat(self, model: str, messages: List[Message],
+             options: Optional[Dict[str, Any]] = None, **extra) -> Dict[str, Any]:
+        return self._route(model, lambda client: client.chat(model, messages, options, **extra))[1]
+
+    def chat_stream(self, model: str, messages: List[Message],
+                    options: Optional[Dict[str, Any]] = None, **extra) -> PooledStream:
+        """Failover only happens before the first chunk; a stream cut off midway raises"""
+        backend, stream = self._route(
+            model, lambda client: client.chat_stream(model, messages, options, **extra), keep_slot=True)
+        return PooledStream(stream, lambda: self._release(backend, model))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"failovers": self.failovers,
+                    "backends": {backend.url: backend.stats() for backend in self.backends}}
+
+    def close(self):
+        self._stop.set()
+        self._executor.shutdown(wait=False)
+        for backend in self.backends:
+            backend.client.close()
+
+
+_pools: Dict[Tuple[str, ...], BackendPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_backend(urls: Optional[List[str]] = None) -> Union[OllamaClient, BackendPool]:
+    """The process-wide client for urls (default: configured_urls())
+
+    One URL gives the plain shared OllamaClient; several give a BackendPool with
+    background health checks running.
+    """
+    urls = urls or configured_urls()
+    if len(urls) == 1:
+        return get_client(urls[0])
+    key = tuple(url.rstrip("/") for url in urls)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = BackendPool(list(key))
+            pool.start_health_checks()
+        return pool
+
+
+def get_app_client(gateway_url: str = GATEWAY_URL) -> Union[OllamaClient, BackendPool]:
+    """Client for the desktop apps
+
+    With several hosts configured the apps balance over them directly; otherwise they
+    use the gateway when it is running and fall back to the configured host.
+    """
+    urls = configured_urls()
+    if len(urls) > 1:
+        return get_backend(urls)
+    return get_client(gateway_url, fallback_url=urls[0])
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Headless batch mode: run a JSONL file of prompts through Ollama
+
+Each input line is a JSON object:
+    {"id": "001", "prompt": "Rewrite ...", "model": "gemma3:1b", "options": {"temperature": 0.2}}
+"id" defaults to the line number, "model" to --model, and "messages" may be given instead
+of "prompt". Results are appended to the output JSONL as they finish; re-running with the
+same output file skips records that already succeeded.
+
+    python3 batch_runner.py prompts.jsonl results.jsonl --workers 4
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterator, List, Set
+
+from ollama_client import DEFAULT_OLLAMA_URL, OllamaClient, OllamaError
+from request_scheduler import percentile
+
+DEFAULT_MODEL = "gemma3:1b"
+
+
+def read_records(path: str) -> Iterator[Dict[str, Any]]:
+    """Yield input records, assigning line-number ids to records without one
+
+    A line that is not a JSON object is yielded as {"id": <line number>, "error": ...}
+    so it becomes an error line in the output instead of stopping the run.
+    """
+    with open(path, 'r') as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield {"id": str(line_no), "error": f"Invalid JSON: {e}"}
+                continue
+            if not isinstance(record, dict):
+                yield {"id": str(line_no), "error": "Invalid record: expected a JSON object"}
+                continue
+            record.setdefault("id", str(line_no))
+            yield record
+
+
+def completed_ids(path: str) -> Set[str]:
+    """Ids already written successfully to the output file"""
+    done: Set[str] = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, 'r') as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Partial line from an interrupted run
+            if "error" not in result:
+                done.add(str(result["id"]))
+    return done
+
+
+def process_record(client, record: Dict[str, Any], default_model: str) -> Dict[str, Any]:
+    """Send one record to /api/chat and build its output line"""
+    model = record.get("model") or default_model
+    start = time.time()
+    result: Dict[str, Any] = {"id": record["id"], "model": model}
+    try:
+        if "error" in record:  # Unreadable input line
+            raise ValueError(record["error"])
+        if not record.get("messages") and "prompt" not in record:
+            raise ValueError("Record has neither 'prompt' nor 'messages'")
+        messages = record.get("messages") or [{"role": "user", "content": record["prompt"]}]
+        data = client.chat(model, messages, options=record.get("options"))
+        result["response"] = data["message"]["content"]
+        result["eval_count"] = data.get("eval_count")
+        result["total_duration"] = data.get("total_duration")
+    except (OllamaError, KeyError, ValueError) as e:
+        result["error"] = str(e)
+    result["latency"] = round(time.time() - start, 3)
+    return result
+
+
+def run_batch(input_path: str, output_path: str, model: str = DEFAULT_MODEL,
+              workers: int = 4, ollama_url: str = DEFAULT_OLLAMA_URL) -> Dict[str, Any]:
+    """Process every pending record and return a throughput/latency summary"""
+    client = OllamaClient(ollama_url, pool_size=max(workers, 8))
+    done = completed_ids(output_path)
+    pending = [r for r in read_records(input_path) if str(r["id"]) not in done]
+    print(f"📦 {len(pending)} records to process ({len(done)} already done) with {workers} workers")
+
+    latencies: List[float] = []
+    failed = 0
+    start = time.time()
+
+    with open(output_path, 'a') as out, ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(process_record, client, record, model) for record in pending]
+        for i, future in enumerate(as_completed(futures), 1):
+            result = future.result()
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            out.flush()
+            if "error" in result:
+                failed += 1
+                print(f"❌ [{i}/{len(pending)}] {result['id']}: {result['error']}")
+            else:
+                latencies.append(result["latency"])
+                print(f"✅ [{i}/{len(pending)}] {result['id']} in {result['latency']:.1f}s")
+
+    elapsed = time.time() - start
+    return {
+        "processed": len(pending),
+        "succeeded": len(latencies),
+        "failed": failed,
+        "skipped": len(done),
+        "elapsed": round(elapsed, 3),
+        "throughput_per_min": round(len(pending) / elapsed * 60, 2) if elapsed else 0.0,
+        "latency_p50": percentile(latencies, 50),
+        "latency_p95": percentile(latencies, 95),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a JSONL file of prompts through Ollama")
+    parser.add_argument("input", help="Input JSONL (id, prompt or messages, model, options)")
+    parser.add_argument("output", help="Output JSONL; existing successful ids are skipped")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="Model for records without one")
+    parser.add_argument("--workers", type=int, default=4, help="Parallel requests")
+    parser.add_argument("--ollama-url", default=DEFAULT_OLLAMA_URL)
+    args = parser.parse_args(argv)
+
+    summary = run_batch(args.input, args.output, args.model, args.workers, args.ollama_url)
+    print(f"🏁 {summary['succeeded']}/{summary['processed']} succeeded in {summary['elapsed']:.1f}s "
+          f"({summary['throughput_per_min']:.1f}/min, p50 {summary['latency_p50']:.2f}s, "
+          f"p95 {summary['latency_p95']:.2f}s)")
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1 @@
+"""Benchmark suite: mock Ollama server and headless harness (python3 -m benchmarks.run)"""
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Mock Ollama server for benchmarks
+Speaks enough of the Ollama API (/api/tags, /api/ps, /api/show, /api/chat) for the apps,
+the gateway and the benchmark harness, with configurable latency, token rate and payload size.
+
+    python3 -m benchmarks.mock_ollama --port 11434 --latency 0.05 --token-rate 80
+"""
+
+import argparse
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+
+@dataclass
+class MockConfig:
+    """Behaviour of the mock server"""
+
+    latency: float = 0.02          # Seconds before the first byte of every response
+    token_rate: float = 200.0      # Generated tokens per second (0 = as fast as possible)
+    response_tokens: int = 64      # Tokens per chat reply
+    token_text: str = "lorem"      # Text of each generated token
+    load_time: float = 0.0         # Extra delay the first time each model is used
+    parallel: int = 0              # Concurrent generations (like OLLAMA_NUM_PARALLEL; 0 = unlimited)
+    fail_status: int = 0           # When set, every request is answered with this HTTP status
+    models: List[str] = field(default_factory=lambda: ["gemma3:1b", "llama3.2:3b"])
+
+
+class MockOllamaServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # Concurrency benchmarks open many connections at once
+
+    def __init__(self, address: Tuple[str, int], config: MockConfig):
+        super().__init__(address, MockOllamaHandler)
+        self.config = config
+        self.loaded: Dict[str, float] = {}
+        self.requests: Dict[str, int] = {}
+        self.lock = threading.Lock()
+        self.slots = threading.BoundedSemaphore(config.parallel) if config.parallel else None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def handle_error(self, request, client_address):
+        pass  # Clients dropping idle keep-alive connections is expected
+
+    def count(self, path: str):
+        with self.lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+
+    def load(self, model: str) -> float:
+        """Seconds spent loading model for this request (only the first time)"""
+        with self.lock:
+            if model in self.loaded:
+                return 0.0
+            self.loaded[model] = time.time()
+        time.sleep(self.config.load_time)
+        return self.config.load_time
+
+
+class MockOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # Headers and body go out in separate writes
+    server: MockOllamaServer
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, obj: Any, status: int = 200):
+        body = json.dumps(obj).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_json(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        self.server.count(self.path)
+        config = self.server.config
+        time.sleep(config.latency)
+        if config.fail_status:
+            self.send_json({"error": "mock failure"}, config.fail_status)
+        elif self.path == "/api/tags":
+            self.send_json({"models": [{"name": name, "size": 1} for name in config.models]})
+        elif self.path == "/api/ps":
+            self.send_json({"models": [{"name": name} for name in self.server.loaded]})
+        elif self.path == "/health":
+            self.send_json({"status": "ok"})
+        else:
+            self.send_json({"error": "not found"}, 404)
+
+    def do_POST(self):
+        self.server.count(self.path)
+        body = self.read_json()
+        time.sleep(self.server.config.latency)
+        if self.server.config.fail_status:
+            self.send_json({"error": "mock failure"}, self.server.config.fail_status)
+        elif self.path == "/api/show":
+            self.send_json({"details": {"family": "mock"}, "parameters": ""})
+        elif self.path == "/api/chat":
+            self.chat(body)
+        else:
+            self.send_json({"error": "not found"}, 404)
+
+    def chat(self, body: Dict[str, Any]):
+        config = self.server.config
+        model = body.get("model", "")
+        if model not in config.models:
+            self.send_json({"error": f"model '{model}' not found"}, 404)
+            return
+
+        slots = self.server.slots
+        if slots is None:
+            self.generate(model, body)
+            return
+        with slots:  # Requests beyond the parallel limit queue, as they do in Ollama
+            self.generate(model, body)
+
+    def generate(self, model: str, body: Dict[str, Any]):
+        config = self.server.config
+        start = time.time()
+        load = self.server.load(model)
+        messages = body.get("messages") or []
+        prompt_tokens = sum(len(m.get("content", "").split()) for m in messages)
+        tokens = [(" " if i else "") + config.token_text for i in range(config.response_tokens)] if messages else []
+
+        if not body.get("stream", True):
+            if config.token_rate:
+                time.sleep(len(tokens) / config.token_rate)
+            self.send_json(self.final_chunk(model, start, load, prompt_tokens, len(tokens), "".join(tokens)))
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for token in tokens:
+                if config.token_rate:
+                    time.sleep(1 / config.token_rate)
+                self.write_chunk({"model": model, "message": {"role": "assistant", "content": token}, "done": False})
+            self.write_chunk(self.final_chunk(model, start, load, prompt_tokens, len(tokens), ""))
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # Client cancelled the stream
+
+    def write_chunk(self, obj: Dict[str, Any]):
+        data = (json.dumps(obj) + "\n").encode()
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def final_chunk(self, model: str, start: float, load: float, prompt_tokens: int,
+                    eval_count: int, content: str) -> Dict[str, Any]:
+        total = time.time() - start
+        rate = self.server.config.token_rate
+        return {
+            "model": model,
+            "message": {"role": "assistant", "content": content},
+            "done": True,
+            "done_reason": "stop" if eval_count else "load",
+            "total_duration": int(total * 1e9),
+            "load_duration": int(load * 1e9),
+            "prompt_eval_count": prompt_tokens,
+            "prompt_eval_duration": int(1e6),
+            "eval_count": eval_count,
+            "eval_duration": int((eval_count / rate if rate else max(total - load, 1e-6)) * 1e9),
+        }
+
+
+def serve(config: Optional[MockConfig] = None, host: str = "127.0.0.1", port: int = 0) -> MockOllamaServer:
+    """Start a mock server on a background thread (port 0 picks a free port)"""
+    server = MockOllamaServer((host, port), config or MockConfig())
+    threading.Thread(target=server.serve_forever, name="mock-ollama", daemon=True).start()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mock Ollama server for benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--latency", type=float, default=MockConfig.latency)
+    parser.add_argument("--token-rate", type=float, default=MockConfig.token_rate)
+    parser.add_argument("--response-tokens", type=int, default=MockConfig.response_tokens)
+    parser.add_argument("--load-time", type=float, default=MockConfig.load_time)
+    parser.add_argument("--parallel", type=int, default=MockConfig.parallel)
+    args = parser.parse_args(argv)
+
+    config = MockConfig(latency=args.latency, token_rate=args.token_rate,
+                        response_tokens=args.response_tokens, load_time=args.load_time,
+                        parallel=args.parallel)
+    server = MockOllamaServer((args.host, args.port), config)
+    print(f"🧪 Mock Ollama on {server.url} ({config.token_rate:.0f} tok/s, {config.latency * 1000:.0f} ms latency)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,605 @@
+#!/usr/bin/env python3
+"""
+Headless benchmark harness
+Runs the request, logging, history, similar-prompt, clipboard, clipboard worker, diff and metrics code
+paths against the mock Ollama server and writes the results to
+benchmarks/results/<timestamp>.json.
+
+    python3 -m benchmarks.run                      # full run
+    python3 -m benchmarks.run --quick              # smaller counts, for a quick check
+    python3 -m benchmarks.run --baseline benchmarks/results/previous.json
+
+With --baseline, metrics that got worse by more than --tolerance are listed and the
+exit code is 1.
+"""
+
+import argparse
+import functools
+import json
+import logging
+import os
+import platform
+import queue
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from backend_pool import BackendPool
+from benchmarks.mock_ollama import MockConfig, serve
+from clipboard_backends import ClipboardSnapshot, ClipboardWatcher, FakeClipboardBackend
+from clipboard_worker import ClipboardService
+from history_store import HistoryStore
+from log_pipeline import LogPipeline
+from ollama_client import OllamaClient
+from request_metrics import MetricsRecorder, RequestTrace
+from request_scheduler import RequestScheduler, percentile
+from similar_prompts import SimilarPromptIndex
+from text_diff import StreamingDiff, diff_words
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+MODEL = "gemma3:1b"
+
+# Metrics compared against a baseline: (path in the results, True if higher is better)
+TRACKED_METRICS: List[Tuple[str, bool]] = [
+    ("latency.stream.p50", False),
+    ("latency.stream.p95", False),
+    ("latency.stream.ttft_p50", False),
+    ("latency.chat.p50", False),
+    ("throughput.4.requests_per_sec", True),
+    ("throughput.8.requests_per_sec", True),
+    ("pool.3.requests_per_sec", True),
+    ("logging.pipeline.per_call_us", False),
+    ("history.add_per_call_us", False),
+    ("history.search_ms", False),
+    ("similar_prompts.lookup_p50_us", False),
+    ("similar_prompts.near_duplicate_hit_rate", True),
+    ("clipboard.unchanged_check_us", False),
+    ("diff.full_ms", False),
+    ("diff.feed_p99_us", False),
+    ("memory.growth_per_request_kb", False),
+    ("ui_stall.p99_ms", False),
+    ("ui_stall.max_ms", False),
+]
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    return {
+        "count": len(values),
+        "mean": sum(values) / len(values) if values else 0.0,
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "max": max(values) if values else 0.0,
+    }
+
+
+def messages(i: int) -> List[Dict[str, str]]:
+    return [{"role": "user", "content": f"Rewrite paragraph {i} so it reads more clearly."}]
+
+
+def bench_latency(url: str, requests: int) -> Dict[str, Any]:
+    """Sequential end-to-end latency for streaming and non-streaming chat"""
+    client = OllamaClient(url)
+    client.load(MODEL)
+    results = {}
+
+    totals, ttfts = [], []
+    for i in range(requests):
+        start = time.perf_counter()
+        first = None
+        for chunk in client.chat_stream(MODEL, messages(i)):
+            if first is None and chunk.get("message", {}).get("content"):
+                first = time.perf_counter() - start
+        totals.append(time.perf_counter() - start)
+        ttfts.append(first or 0.0)
+    stream = summarize(totals)
+    stream["ttft_p50"] = percentile(ttfts, 50)
+    stream["ttft_p95"] = percentile(ttfts, 95)
+    results["stream"] = stream
+
+    totals = []
+    for i in range(requests):
+        start = time.perf_counter()
+        client.chat(MODEL, messages(i))
+        totals.append(time.perf_counter() - start)
+    results["chat"] = summarize(totals)
+    client.close()
+    return results
+
+
+def bench_throughput(url: str, requests: int, levels: List[int]) -> Dict[str, Any]:
+    """Requests/sec through the scheduler at several concurrency levels"""
+    results = {}
+    for workers in levels:
+        client = OllamaClient(url, pool_size=max(workers, 8))
+        scheduler = RequestScheduler(max_workers=workers, per_model_limit=workers)
+        start = time.perf_counter()
+        handles = [scheduler.submit(lambda handle, i=i: client.chat(MODEL, messages(i)), MODEL)
+                   for i in range(requests)]
+        for handle in handles:
+            handle.result()
+        elapsed = time.perf_counter() - start
+        metrics = scheduler.metrics()
+        results[str(workers)] = {
+            "requests": requests,
+            "elapsed": elapsed,
+            "requests_per_sec": requests / elapsed,
+            "wait_p95": metrics["wait_p95"],
+        }
+        scheduler.shutdown()
+        client.close()
+    return results
+
+
+def bench_pool(config: MockConfig, requests: int, hosts: int, concurrency: int) -> Dict[str, Any]:
+    """Requests/sec on one host vs a BackendPool of several (each runs 2 generations at a time)
+
+    Halfway through the pool run one host starts answering 503; its requests should fail over.
+    """
+    results: Dict[str, Any] = {}
+    for count in (1, hosts):
+        servers = [serve(MockConfig(latency=config.latency, token_rate=config.token_rate,
+                                    response_tokens=config.response_tokens, parallel=2))
+                   for _ in range(count)]
+        pool = BackendPool([server.url for server in servers], pool_size=concurrency)
+        scheduler = RequestScheduler(max_workers=concurrency, per_model_limit=concurrency)
+
+        def call(handle, i: int):
+            if count > 1 and i == requests // 2:
+                servers[0].config.fail_status = 503  # Take a host down halfway through
+            return pool.chat(MODEL, messages(i))
+
+        start = time.perf_counter()
+        handles = [scheduler.submit(lambda handle, i=i: call(handle, i), MODEL) for i in range(requests)]
+        failed = 0
+        for handle in handles:
+            try:
+                handle.result()
+            except Exception:
+                failed += 1
+        elapsed = time.perf_counter() - start
+        stats = pool.stats()
+        results[str(count)] = {
+            "requests": requests,
+            "elapsed": elapsed,
+            "requests_per_sec": requests / elapsed,
+            "failed": failed,
+            "failovers": stats["failovers"],
+            "served": [backend["served"] for backend in stats["backends"].values()],
+        }
+        scheduler.shutdown()
+        pool.close()
+        for server in servers:
+            server.shutdown()
+    return results
+
+
+def bench_logging(records: int, payload_chars: int, directory: str) -> Dict[str, Any]:
+    """Caller-side cost of logging a full response: queued pipeline vs a plain FileHandler"""
+    payload = "x" * payload_chars
+    formatter = logging.Formatter('%(asctime)s | %(message)s')
+
+    def timed_calls(logger: logging.Logger) -> float:
+        start = time.perf_counter()
+        for i in range(records):
+            logger.info(f"=== RESPONSE {i} ===\n{payload}")
+        return (time.perf_counter() - start) / records * 1e6
+
+    sync_logger = logging.getLogger("BenchSync")
+    sync_logger.handlers.clear()
+    sync_logger.propagate = False
+    handler = logging.FileHandler(os.path.join(directory, "sync.log"))
+    handler.setFormatter(formatter)
+    sync_logger.addHandler(handler)
+    sync_us = timed_calls(sync_logger)
+    handler.close()
+
+    pipeline = LogPipeline(os.path.join(directory, "pipeline"))
+    pipeline_logger = pipeline.add_logger("BenchPipeline", "bench.log", formatter)
+    pipeline.start()
+    pipeline_us = timed_calls(pipeline_logger)
+    drain_start = time.perf_counter()
+    pipeline.stop()
+    return {
+        "records": records,
+        "payload_chars": payload_chars,
+        "sync_file_handler": {"per_call_us": sync_us},
+        "pipeline": {"per_call_us": pipeline_us, "drain_ms": (time.perf_counter() - drain_start) * 1000},
+    }
+
+
+def bench_history(rows: int, directory: str) -> Dict[str, Any]:
+    """Write cost, flush time and page/search latency of the history store"""
+    store = HistoryStore(os.path.join(directory, "history.db"))
+    response = "The rewritten paragraph reads more clearly now. " * 20
+
+    start = time.perf_counter()
+    for i in range(rows):
+        store.add(MODEL, f"Rewrite paragraph {i} about topic{i % 100}", response, 1.0)
+    add_us = (time.perf_counter() - start) / rows * 1e6
+    start = time.perf_counter()
+    store.flush()
+    flush_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    store.page(0, 50)
+    page_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    matches = store.count("topic42")
+    store.page(0, 50, "topic42")
+    search_ms = (time.perf_counter() - start) * 1000
+    store.close()
+    return {"rows": rows, "add_per_call_us": add_us, "flush_ms": flush_ms,
+            "page_ms": page_ms, "search_ms": search_ms, "search_matches": matches}
+
+
+def bench_similar_prompts(entries: int, words: int = 80) -> Dict[str, Any]:
+    """Index cost and lookup latency of the similar-prompt index, and how often it finds
+    near-duplicates (trailing space, one changed word, a new first word) versus unrelated text"""
+    rng = random.Random(7)
+    vocabulary = [f"word{i}" for i in range(2000)]
+    prompts = [" ".join(rng.choice(vocabulary) for _ in range(words)) for _ in range(entries)]
+    index = SimilarPromptIndex(max_entries=entries)
+
+    start = time.perf_counter()
+    for i, prompt in enumerate(prompts):
+        index.add(MODEL, "improve", prompt, f"response {i}")
+    add_us = (time.perf_counter() - start) / entries * 1e6
+
+    def variant(i: int) -> str:
+        tokens = prompts[i].split()
+        if i % 3 == 0:
+            return prompts[i] + " "
+        if i % 3 == 1:
+            tokens[len(tokens) // 2] += "x"
+        else:
+            tokens[0] = "Also"
+        return " ".join(tokens)
+
+    lookups, hits, false_hits = [], 0, 0
+    probes = min(entries, 500)
+    for i in range(probes):
+        start = time.perf_counter()
+        match = index.lookup(MODEL, "improve", variant(i))
+        lookups.append((time.perf_counter() - start) * 1e6)
+        hits += match is not None and match.response == f"response {i}"
+        unrelated = " ".join(rng.choice(vocabulary) for _ in range(words))
+        false_hits += index.lookup(MODEL, "improve", unrelated) is not None
+    return {"entries": entries, "words": words, "add_per_call_us": add_us,
+            "lookup_p50_us": percentile(lookups, 50), "lookup_p99_us": percentile(lookups, 99),
+            "near_duplicate_hit_rate": hits / probes, "unrelated_hits": false_hits}
+
+
+def bench_clipboard(sizes: List[int], checks: int) -> Dict[str, Any]:
+    """Digest cost per clipboard size and the cost of an unchanged-clipboard check"""
+    results: Dict[str, Any] = {"snapshot_ms": {}}
+    for size in sizes:
+        text = "a" * size
+        start = time.perf_counter()
+        ClipboardSnapshot.from_text(text)
+        results["snapshot_ms"][str(size)] = (time.perf_counter() - start) * 1000
+
+    backend = FakeClipboardBackend()
+    backend.set_text("clipboard contents " * 1000)
+    changes = []
+    watcher = ClipboardWatcher(backend, changes.append, is_enabled=lambda: True)
+    watcher.check()
+    start = time.perf_counter()
+    for _ in range(checks):
+        watcher.check()
+    results["unchanged_check_us"] = (time.perf_counter() - start) / checks * 1e6
+    results["reads_while_unchanged"] = backend.reads - 1
+    return results
+
+
+def bench_diff(words: int, piece_chars: int = 4) -> Dict[str, Any]:
+    """Word diff of a document against a rewrite of every 50th word, whole and streamed"""
+    vocabulary = ["the", "model", "rewrites", "this", "sentence", "with", "care", "and", "a", "few", "words"]
+    original = [vocabulary[(i * 7) % len(vocabulary)] + ("." if i % 12 == 11 else "") for i in range(words)]
+    rewritten = [word.upper() if i % 50 == 25 else word for i, word in enumerate(original)]
+    old, new = " ".join(original), " ".join(rewritten)
+
+    start = time.perf_counter()
+    segments = diff_words(old, new)
+    full_ms = (time.perf_counter() - start) * 1000
+
+    differ = StreamingDiff(old)
+    feeds = []
+    for i in range(0, len(new), piece_chars):
+        start = time.perf_counter()
+        differ.feed(new[i:i + piece_chars])
+        feeds.append((time.perf_counter() - start) * 1e6)
+    differ.finish()
+    return {"words": words, "changes": sum(1 for tag, _ in segments if tag == "insert"), "full_ms": full_ms,
+            "feed_p50_us": percentile(feeds, 50), "feed_p99_us": percentile(feeds, 99),
+            "stream_ms": sum(feeds) / 1000}
+
+
+class UiLoop:
+    """Stand-in for the Tk main loop: runs root.after callbacks on one thread and measures stalls"""
+
+    def __init__(self, tick: float = 0.01):
+        self.tick = tick
+        self.callbacks: "queue.Queue[Tuple[Callable, tuple]]" = queue.Queue()
+        self.lateness: List[float] = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="ui-loop", daemon=True)
+
+    def after(self, ms: int, fn: Callable, *args):
+        if ms > 0:
+            timer = threading.Timer(ms / 1000, self.callbacks.put, ((fn, args),))
+            timer.daemon = True
+            timer.start()
+        else:
+            self.callbacks.put((fn, args))
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        next_tick = time.perf_counter() + self.tick
+        while not self._stop.is_set():
+            timeout = max(0.0, next_tick - time.perf_counter())
+            try:
+                fn, args = self.callbacks.get(timeout=timeout)
+                fn(*args)
+            except queue.Empty:
+                pass
+            now = time.perf_counter()
+            if now >= next_tick:
+                # How late the UI got to its next frame
+                self.lateness.append(now - next_tick)
+                next_tick = now + self.tick
+
+
+class SlowClipboardBackend(FakeClipboardBackend):
+    """Clipboard whose every read costs read_ms of pure-Python work (holding the GIL)"""
+
+    def __init__(self, read_ms: float = 30.0):
+        super().__init__("clipboard contents " * 1000)
+        self.read_ms = read_ms
+
+    def read(self) -> str:
+        deadline = time.perf_counter() + self.read_ms / 1000
+        while time.perf_counter() < deadline:
+            sum(range(1000))
+        return super().read()
+
+
+def bench_clipboard_worker(reads: int, read_ms: float) -> Dict[str, Any]:
+    """UI-loop lateness while slow clipboard reads run on the UI loop (no clipboard command) vs in the worker process"""
+    results: Dict[str, Any] = {}
+    for mode, isolated in (("in_process", False), ("process", True)):
+        ui = UiLoop()
+        ui.start()
+        ready = threading.Event()
+        done = threading.Event()
+        count = [0]
+
+        def on_read(snapshot: ClipboardSnapshot):
+            count[0] += 1
+            if count[0] >= reads:
+                done.set()
+            else:
+                service.read(on_read)
+
+        service = ClipboardService(ui, on_change=lambda snapshot: None, isolated=isolated,
+                                   backend_factory=functools.partial(SlowClipboardBackend, read_ms))
+        service.start(monitoring=False)
+        service.read(lambda snapshot: ready.set())  # Wait out process startup before measuring
+        ready.wait(30)
+        ui.lateness.clear()
+        start = time.perf_counter()
+        service.read(on_read)
+        done.wait(60)
+        elapsed = time.perf_counter() - start
+        service.stop()
+        ui.stop()
+        lateness = [late * 1000 for late in ui.lateness]
+        results[mode] = {"reads": count[0], "seconds": elapsed, "stall_p50_ms": percentile(lateness, 50),
+                         "stall_p99_ms": percentile(lateness, 99), "stall_max_ms": max(lateness, default=0.0)}
+    return results
+
+
+def simulate_app_request(url_client: OllamaClient, ui: UiLoop, i: int, metrics: MetricsRecorder,
+                         history: HistoryStore, logger: logging.Logger, rendered: List[str]):
+    """What the apps do per request: stream, batch UI updates, then log, store and record"""
+    trace = RequestTrace(MODEL, True)
+    parts, pending = [], []
+    last_flush = time.time()
+    final = {}
+    for chunk in url_client.chat_stream(MODEL, messages(i)):
+        token = chunk.get("message", {}).get("content", "")
+        if token:
+            trace.mark_first_token()
+            parts.append(token)
+            pending.append(token)
+            if time.time() - last_flush >= 0.05:
+                ui.after(0, trace.timed(rendered.append), "".join(pending))
+                pending.clear()
+                last_flush = time.time()
+        if chunk.get("done"):
+            final = chunk
+    if pending:
+        ui.after(0, trace.timed(rendered.append), "".join(pending))
+    response = "".join(parts)
+    trace.finish(final, len(response))
+    logger.info(f"=== RESPONSE {i} ===\n{response}")
+    history.add(MODEL, messages(i)[0]["content"], response)
+    ui.after(0, metrics.record, trace)
+
+
+def bench_app_pipeline(url: str, requests: int, concurrency: int, directory: str) -> Dict[str, Any]:
+    """UI-thread stall and memory growth while the full request pipeline runs"""
+    client = OllamaClient(url, pool_size=max(concurrency, 8))
+    scheduler = RequestScheduler(max_workers=concurrency, per_model_limit=concurrency)
+    metrics = MetricsRecorder(os.path.join(directory, "logs"))
+    history = HistoryStore(os.path.join(directory, "app_history.db"))
+    pipeline = LogPipeline(os.path.join(directory, "logs"))
+    logger = pipeline.add_logger("BenchResponses", "responses.log", logging.Formatter('%(message)s'))
+    pipeline.start()
+    ui = UiLoop()
+    rendered: List[str] = []
+
+    def run_batch(count: int, offset: int):
+        handles = [scheduler.submit(
+            lambda handle, i=i: simulate_app_request(client, ui, i, metrics, history, logger, rendered), MODEL)
+            for i in range(offset, offset + count)]
+        for handle in handles:
+            handle.result()
+
+    ui.start()
+    run_batch(concurrency * 2, 0)  # Warm up connections, caches and lazily built state
+    ui.lateness.clear()
+    rendered.clear()
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    run_batch(requests, concurrency * 2)
+    elapsed = time.perf_counter() - start
+    history.flush()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    ui.stop()
+    lateness_ms = [value * 1000 for value in ui.lateness]
+    scheduler.shutdown()
+    history.close()
+    metrics.close()
+    pipeline.stop()
+    client.close()
+    return {
+        "memory": {
+            "requests": requests,
+            "growth_kb": (after - before) / 1024,
+            "growth_per_request_kb": (after - before) / 1024 / requests,
+        },
+        "ui_stall": {
+            "frames": len(lateness_ms),
+            "p50_ms": percentile(lateness_ms, 50),
+            "p99_ms": percentile(lateness_ms, 99),
+            "max_ms": max(lateness_ms) if lateness_ms else 0.0,
+            "requests_per_sec": requests / elapsed,
+        },
+    }
+
+
+def lookup(results: Dict[str, Any], path: str) -> Optional[float]:
+    value: Any = results
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Describe every tracked metric that is worse than the baseline by more than tolerance"""
+    regressions = []
+    for path, higher_is_better in TRACKED_METRICS:
+        new, old = lookup(results, path), lookup(baseline, path)
+        if new is None or not old:
+            continue
+        change = (new - old) / old
+        worse = -change if higher_is_better else change
+        if worse > tolerance:
+            regressions.append(f"{path}: {old:.4g} -> {new:.4g} ({change:+.0%})")
+    return regressions
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args) -> Dict[str, Any]:
+    config = MockConfig(latency=args.latency, token_rate=args.token_rate,
+                        response_tokens=args.response_tokens)
+    server = serve(config)
+    scale = 0.25 if args.quick else 1.0
+
+    def n(count: int) -> int:
+        return max(int(count * scale), 4)
+
+    results: Dict[str, Any] = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "mock": {"latency": config.latency, "token_rate": config.token_rate,
+                 "response_tokens": config.response_tokens},
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        steps = [
+            ("latency", lambda: bench_latency(server.url, n(40))),
+            ("throughput", lambda: bench_throughput(server.url, n(64), [1, 2, 4, 8])),
+            ("pool", lambda: bench_pool(config, n(96), 3, 6)),
+            ("logging", lambda: bench_logging(n(2000), 8000, directory)),
+            ("history", lambda: bench_history(n(5000), directory)),
+            ("similar_prompts", lambda: bench_similar_prompts(n(2000))),
+            ("clipboard", lambda: bench_clipboard([1024, 256 * 1024, 4 * 1024 * 1024], n(2000))),
+            ("diff", lambda: bench_diff(n(20000))),
+            ("clipboard_worker", lambda: bench_clipboard_worker(n(40), 30.0)),
+            ("app_pipeline", lambda: bench_app_pipeline(server.url, n(80), 4, directory)),
+        ]
+        for name, step in steps:
+            start = time.perf_counter()
+            outcome = step()
+            print(f"⏱  {name:<13} done in {time.perf_counter() - start:.1f}s")
+            if name == "app_pipeline":
+                results.update(outcome)
+            else:
+                results[name] = outcome
+    server.shutdown()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the headless benchmark suite")
+    parser.add_argument("--quick", action="store_true", help="Smaller counts for a fast check")
+    parser.add_argument("--latency", type=float, default=0.005, help="Mock server latency in seconds")
+    parser.add_argument("--token-rate", type=float, default=500.0, help="Mock tokens per second")
+    parser.add_argument("--response-tokens", type=int, default=64, help="Tokens per mock reply")
+    parser.add_argument("--output", help="Results file (default benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--baseline", help="Earlier results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression")
+    args = parser.parse_args(argv)
+
+    results = run(args)
+    output = args.output or os.path.join(RESULTS_DIR, f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"📊 Results saved to {output}")
+    for path, _ in TRACKED_METRICS:
+        value = lookup(results, path)
+        if value is not None:
+            print(f"   {path:<40} {value:.4g}")
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"❌ {len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+            for line in regressions:
+                print(f"   {line}")
+            return 1
+        print("✅ No regressions against the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Multi-turn chat sessions
+A ChatSession keeps the system prompt and earlier turns so follow-up requests send the
+same message prefix every time. Ollama keeps the evaluated prefix of the previous
+request in the model's KV cache (while keep_alive holds the model loaded), so a
+stable prefix is only re-evaluated when it actually changes.
+
+Old turns are dropped when the estimated prompt size passes token_budget. They are
+dropped down to truncate_to of the budget in one go, rather than one turn per request,
+so the prefix changes (and is re-evaluated) only occasionally.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+from ollama_client import Message
+
+# Rough characters-per-token ratio for English text with Llama/Gemma tokenizers
+CHARS_PER_TOKEN = 4
+# Per-message overhead of the chat template (role markers, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of text"""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def message_tokens(messages: List[Message]) -> int:
+    return sum(estimate_tokens(m["content"]) + MESSAGE_OVERHEAD_TOKENS for m in messages)
+
+
+class ChatSession:
+    """Message history for one conversation, trimmed to a token budget"""
+
+    def __init__(self, system_prompt: Optional[str] = None, token_budget: int = 4096,
+                 truncate_to: float = 0.6):
+        self.system_prompt = system_prompt
+        self.token_budget = token_budget
+        self.truncate_to = truncate_to
+        self.turns: List[Tuple[Message, Message]] = []
+        self.truncated_turns = 0
+        self.last_prompt_eval_count: Optional[int] = None
+
+    def system_messages(self) -> List[Message]:
+        return [{"role": "system", "content": self.system_prompt}] if self.system_prompt else []
+
+    def history(self) -> List[Message]:
+        return [message for turn in self.turns for message in turn]
+
+    def build_messages(self, user_content: str) -> List[Message]:
+        """System prompt, retained turns and the new user message, within the token budget"""
+        user = {"role": "user", "content": user_content}
+        fixed = message_tokens(self.system_messages() + [user])
+        if fixed + message_tokens(self.history()) > self.token_budget:
+            self._truncate(int(self.token_budget * self.truncate_to) - fixed)
+        return self.system_messages() + self.history() + [user]
+
+    def _truncate(self, history_budget: int):
+        """Drop the oldest turns until the history fits history_budget tokens"""
+        while self.turns and message_tokens(self.history()) > history_budget:
+            self.turns.pop(0)
+            self.truncated_turns += 1
+
+    def record(self, user_content: str, assistant_content: str,
+               prompt_eval_count: Optional[int] = None):
+        """Add a finished turn; prompt_eval_count is Ollama's count of prompt tokens it evaluated"""
+        self.turns.append(({"role": "user", "content": user_content},
+                           {"role": "assistant", "content": assistant_content}))
+        if prompt_eval_count is not None:
+            self.last_prompt_eval_count = prompt_eval_count
+
+    def reset(self):
+        """Start a new conversation (the system prompt is kept)"""
+        self.turns.clear()
+        self.truncated_turns = 0
+        self.last_prompt_eval_count = None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "turns": len(self.turns),
+            "history_tokens": message_tokens(self.history()),
+            "truncated_turns": self.truncated_turns,
+        }
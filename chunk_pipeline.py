@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Map-reduce processing of oversized input
+Text larger than one chunk is split on paragraph and sentence boundaries into chunks of
+at most chunk_tokens, every chunk is sent to Ollama concurrently (map), and the partial
+results are either concatenated in order or merged by one more request (reduce). Each
+request stays small, so latency is bounded by the slowest chunk instead of growing with
+the whole document and running into the read timeout or the context window.
+"""
+
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from string import Template
+from typing import Callable, List, Optional, Set
+
+from chat_session import CHARS_PER_TOKEN, estimate_tokens
+from ollama_client import ChatStream, Message, OllamaClient, OllamaError
+
+DEFAULT_CHUNK_TOKENS = 1500
+PART_SEPARATOR = "\n\n---\n\n"
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+
+
+def _hard_split(text: str, max_chars: int) -> List[str]:
+    """Cut text into max_chars pieces, preferring the last whitespace before each cut"""
+    pieces = []
+    while len(text) > max_chars:
+        cut = text.rfind(" ", max_chars // 2, max_chars)
+        cut = cut if cut > 0 else max_chars
+        pieces.append(text[:cut])
+        text = text[cut:].lstrip()
+    if text:
+        pieces.append(text)
+    return pieces
+
+
+def split_text(text: str, max_tokens: int = DEFAULT_CHUNK_TOKENS) -> List[str]:
+    """Split text into chunks of at most max_tokens (estimated), on paragraph or sentence boundaries"""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    # (piece, separator that joins it to the previous piece)
+    units = []
+    for paragraph in _PARAGRAPH_BREAK.split(text.strip()):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        separator = "\n\n"
+        for sentence in _SENTENCE_END.split(paragraph) if len(paragraph) > max_chars else [paragraph]:
+            for piece in _hard_split(sentence, max_chars):
+                units.append((piece, separator))
+                separator = " "
+
+    chunks: List[str] = []
+    current = ""
+    for piece, separator in units:
+        if current and len(current) + len(separator) + len(piece) > max_chars:
+            chunks.append(current)
+            current = ""
+        current = current + separator + piece if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+@dataclass
+class ChunkProgress:
+    """Reported after each chunk finishes (or fails)"""
+
+    index: int
+    total: int
+    completed: int
+    elapsed: float
+    chars: int = 0
+    error: Optional[str] = None
+
+
+class ChunkPipeline:
+    """One map-reduce run; cancel() stops every chunk still generating"""
+
+    def __init__(self, client: OllamaClient, model: str, options: Optional[dict] = None,
+                 keep_alive: Optional[str] = None, chunk_tokens: int = DEFAULT_CHUNK_TOKENS,
+                 max_workers: int = 4):
+        self.client = client
+        self.model = model
+        self.options = options
+        self.keep_alive = keep_alive
+        self.chunk_tokens = chunk_tokens
+        self.max_workers = max_workers
+        self.eval_count = 0
+        self._cancelled = threading.Event()
+        self._streams: Set[ChatStream] = set()
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def needs_chunking(self, text: str) -> bool:
+        return estimate_tokens(text) > self.chunk_tokens
+
+    def split(self, text: str) -> List[str]:
+        return split_text(text, self.chunk_tokens)
+
+    def cancel(self):
+        self._cancelled.set()
+        with self._lock:
+            streams = list(self._streams)
+        for stream in streams:
+            stream.close()
+
+    def map(self, chunks: List[str], build_messages: Callable[[str], List[Message]],
+            on_progress: Optional[Callable[[ChunkProgress], None]] = None) -> List[str]:
+        """Run build_messages(chunk) for every chunk concurrently; results keep chunk order
+
+        The first failure cancels the remaining chunks and is raised.
+        """
+        start = time.time()
+        results: List[str] = [""] * len(chunks)
+        errors: List[Exception] = []
+        completed = 0
+        lock = threading.Lock()
+
+        def run(index: int):
+            nonlocal completed
+            try:
+                results[index] = self._generate(build_messages(chunks[index]))
+            except Exception as e:
+                with lock:
+                    first = not errors and not self.cancelled
+                    errors.append(e)
+                self.cancel()
+                if first and on_progress:
+                    on_progress(ChunkProgress(index, len(chunks), completed, time.time() - start, error=str(e)))
+                return
+            with lock:
+                completed += 1
+                progress = ChunkProgress(index, len(chunks), completed, time.time() - start, len(results[index]))
+            if on_progress:
+                on_progress(progress)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="chunk") as pool:
+            list(pool.map(run, range(len(chunks))))
+        if errors:
+            raise errors[0]
+        return results
+
+    def reduce_messages(self, parts: List[str], reduce_template: Template,
+                        system: Optional[str] = None,
+                        on_progress: Optional[Callable[[ChunkProgress], None]] = None) -> List[Message]:
+        """Messages for the final reduce request
+
+        When the joined parts are still larger than one chunk they are merged in groups
+        first (another map round), until they fit.
+        """
+        def messages(text: str) -> List[Message]:
+            prefix = [{"role": "system", "content": system}] if system else []
+            return prefix + [{"role": "user", "content": reduce_template.substitute(text=text)}]
+
+        while len(parts) > 1 and estimate_tokens(PART_SEPARATOR.join(parts)) > self.chunk_tokens:
+            groups = self._group(parts)
+            if len(groups) == len(parts):
+                break  # Every part is a chunk on its own; merging cannot shrink them further
+            parts = self.map([PART_SEPARATOR.join(group) for group in groups], messages, on_progress)
+        return messages(PART_SEPARATOR.join(parts))
+
+    def _group(self, parts: List[str]) -> List[List[str]]:
+        groups: List[List[str]] = [[]]
+        size = 0
+        for part in parts:
+            tokens = estimate_tokens(part)
+            if groups[-1] and size + tokens > self.chunk_tokens:
+                groups.append([])
+                size = 0
+            groups[-1].append(part)
+            size += tokens
+        return groups
+
+    def _generate(self, messages: List[Message]) -> str:
+        if self.cancelled:
+            raise OllamaError("Cancelled")
+        stream = self.client.chat_stream(self.model, messages, self.options, keep_alive=self.keep_alive)
+        with self._lock:
+            self._streams.add(stream)
+        if self.cancelled:
+            stream.close()  # cancel() ran before the stream was registered
+        try:
+            parts = []
+            for chunk in stream:
+                parts.append(chunk.get("message", {}).get("content", ""))
+                if chunk.get("done"):
+                    with self._lock:
+                        self.eval_count += chunk.get("eval_count", 0)
+            if self.cancelled:
+                raise OllamaError("Cancelled")
+            return "".join(parts)
+        finally:
+            with self._lock:
+                self._streams.discard(stream)
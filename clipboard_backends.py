@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Pluggable clipboard backends and a change-driven clipboard watcher
+Backends expose a cheap change token (macOS changeCount, X11 selection TIMESTAMP,
+Wayland wl-paste --watch events) so the clipboard is only read when it changes.
+Reads are hashed as they stream in and capped at a maximum ingest size, so huge
+clipboards cost the same memory as small ones.
+"""
+
+import hashlib
+import os
+import shutil
+import subprocess
+import sys
+import threading
+from typing import Callable, Hashable, List, Optional
+
+DEFAULT_MAX_INGEST_BYTES = 256 * 1024
+READ_CHUNK_BYTES = 64 * 1024
+
+
+class ClipboardSnapshot:
+    """Clipboard content capped at the ingest limit, plus a digest of the full content"""
+
+    __slots__ = ("text", "digest", "size", "truncated")
+
+    def __init__(self, text: str, digest: str, size: int, truncated: bool = False):
+        self.text = text
+        self.digest = digest
+        self.size = size
+        self.truncated = truncated
+
+    @classmethod
+    def from_text(cls, text: str, max_bytes: int = DEFAULT_MAX_INGEST_BYTES) -> "ClipboardSnapshot":
+        data = text.encode("utf-8")
+        digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+        if len(data) <= max_bytes:
+            return cls(text, digest, len(data))
+        return cls(data[:max_bytes].decode("utf-8", errors="ignore"), digest, len(data), True)
+
+    def is_blank(self) -> bool:
+        return not self.text or self.text.isspace()
+
+
+def snapshot_command(command: List[str], max_bytes: int = DEFAULT_MAX_INGEST_BYTES) -> ClipboardSnapshot:
+    """Run a clipboard command, hashing its output in chunks and keeping only the first max_bytes"""
+    digest = hashlib.blake2b(digest_size=16)
+    kept = bytearray()
+    size = 0
+    with subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL) as process:
+        while True:
+            chunk = process.stdout.read(READ_CHUNK_BYTES)
+            if not chunk:
+                break
+            digest.update(chunk)
+            size += len(chunk)
+            if len(kept) < max_bytes:
+                kept += chunk[:max_bytes - len(kept)]
+    text = kept.decode("utf-8", errors="ignore")
+    return ClipboardSnapshot(text, digest.hexdigest(), size, size > max_bytes)
+
+
+class ClipboardBackend:
+    """Base clipboard backend
+
+    change_token() returns a value that changes whenever the clipboard does, or None
+    when the backend has no cheap way to tell and the content must be read instead.
+    """
+
+    name = "base"
+    # True when change_token() is an in-process lookup rather than a subprocess call
+    cheap_token = False
+
+    def read(self) -> str:
+        raise NotImplementedError
+
+    def read_snapshot(self, max_bytes: int = DEFAULT_MAX_INGEST_BYTES) -> ClipboardSnapshot:
+        """Read the clipboard as a size-capped, hashed snapshot"""
+        return ClipboardSnapshot.from_text(self.read(), max_bytes)
+
+    def change_token(self) -> Optional[Hashable]:
+        return None
+
+    def wait_for_change(self, timeout: float, stop_event: threading.Event) -> bool:
+        """Block until the clipboard may have changed or timeout expires"""
+        stop_event.wait(timeout)
+        return False
+
+    def close(self):
+        pass
+
+
+def _run_text(command) -> str:
+    result = subprocess.run(command, capture_output=True, text=True)
+    return result.stdout
+
+
+class MacClipboardBackend(ClipboardBackend):
+    """macOS clipboard via pbpaste, with NSPasteboard.changeCount when pyobjc is installed"""
+
+    name = "pbpaste"
+
+    def __init__(self):
+        try:
+            from AppKit import NSPasteboard
+            self._pasteboard = NSPasteboard.generalPasteboard()
+            self.cheap_token = True
+        except ImportError:
+            self._pasteboard = None
+
+    def read(self) -> str:
+        return _run_text(['pbpaste'])
+
+    def read_snapshot(self, max_bytes: int = DEFAULT_MAX_INGEST_BYTES) -> ClipboardSnapshot:
+        return snapshot_command(['pbpaste'], max_bytes)
+
+    def change_token(self) -> Optional[Hashable]:
+        if self._pasteboard is None:
+            return None
+        return self._pasteboard.changeCount()
+
+
+class XClipBackend(ClipboardBackend):
+    """X11 clipboard via xclip; the selection TIMESTAMP target serves as the change token"""
+
+    name = "xclip"
+
+    def read(self) -> str:
+        return _run_text(['xclip', '-selection', 'clipboard', '-o'])
+
+    def read_snapshot(self, max_bytes: int = DEFAULT_MAX_INGEST_BYTES) -> ClipboardSnapshot:
+        return snapshot_command(['xclip', '-selection', 'clipboard', '-o'], max_bytes)
+
+    def change_token(self) -> Optional[Hashable]:
+        # Raw INTEGER atom bytes: compared as-is, never decoded
+        result = subprocess.run(['xclip', '-selection', 'clipboard', '-o', '-t', 'TIMESTAMP'],
+                                capture_output=True)
+        if result.returncode != 0:
+            return None
+        return result.stdout
+
+
+class WaylandClipboardBackend(ClipboardBackend):
+    """Wayland clipboard via wl-paste; a wl-paste --watch process pushes change events"""
+
+    name = "wl-paste"
+    cheap_token = True
+
+    def __init__(self):
+        self._changes = 0
+        self._changed = threading.Event()
+        self._watch = subprocess.Popen(['wl-paste', '--watch', 'echo'],
+                                       stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        threading.Thread(target=self._read_events, daemon=True).start()
+
+    def _read_events(self):
+        for _ in self._watch.stdout:
+            self._changes += 1
+            self._changed.set()
+
+    def read(self) -> str:
+        return _run_text(['wl-paste', '--no-newline'])
+
+    def read_snapshot(self, max_bytes: int = DEFAULT_MAX_INGEST_BYTES) -> ClipboardSnapshot:
+        return snapshot_command(['wl-paste', '--no-newline'], max_bytes)
+
+    def change_token(self) -> Optional[Hashable]:
+        return self._changes
+
+    def wait_for_change(self, timeout: float, stop_event: threading.Event) -> bool:
+        changed = self._changed.wait(timeout)
+        self._changed.clear()
+        return changed
+
+    def close(self):
+        self._watch.terminate()
+
+
+class TkClipboardBackend(ClipboardBackend):
+    """Fallback backend using Tk's own clipboard_get (no change token)"""
+
+    name = "tk"
+
+    def __init__(self, root):
+        self.root = root
+
+    def read(self) -> str:
+        import tkinter as tk
+        try:
+            return self.root.clipboard_get()
+        except tk.TclError:
+            return ""
+
+
+class FakeClipboardBackend(ClipboardBackend):
+    """In-memory clipboard for tests and headless runs"""
+
+    name = "fake"
+    cheap_token = True
+
+    def __init__(self, text: str = ""):
+        self.text = text
+        self.changes = 0
+        self.reads = 0
+        self._changed = threading.Event()
+
+    def set_text(self, text: str):
+        self.text = text
+        self.changes += 1
+        self._changed.set()
+
+    def read(self) -> str:
+        self.reads += 1
+        return self.text
+
+    def change_token(self) -> Optional[Hashable]:
+        return self.changes
+
+    def wait_for_change(self, timeout: float, stop_event: threading.Event) -> bool:
+        changed = self._changed.wait(timeout)
+        self._changed.clear()
+        return changed
+
+
+def _native_backend_class() -> Optional[type]:
+    if sys.platform == "darwin":
+        return MacClipboardBackend
+    if sys.platform.startswith("linux"):
+        if os.environ.get("WAYLAND_DISPLAY") and shutil.which("wl-paste"):
+            return WaylandClipboardBackend
+        if os.environ.get("DISPLAY") and shutil.which("xclip"):
+            return XClipBackend
+    return None
+
+
+def has_native_backend() -> bool:
+    """True when the platform has a clipboard command (pbpaste, wl-paste, xclip)"""
+    return _native_backend_class() is not None
+
+
+def get_native_backend() -> ClipboardBackend:
+    """The clipboard command backend for this platform (needs no Tk, so it works in a worker process)"""
+    backend_class = _native_backend_class()
+    if backend_class is None:
+        raise RuntimeError("No clipboard command found (pbpaste, wl-paste or xclip)")
+    return backend_class()
+
+
+def get_default_backend(root=None) -> ClipboardBackend:
+    """Pick the best clipboard backend for this platform"""
+    if has_native_backend():
+        return get_native_backend()
+    if root is not None:
+        return TkClipboardBackend(root)
+    return FakeClipboardBackend()
+
+
+class ClipboardWatcher:
+    """Background thread that reports clipboard changes
+
+    Backends with a change token are only read when the token moves, and a read only
+    counts as a change when its digest differs from the previous one. Subprocess-based
+    checks back off from min_interval to max_interval while the clipboard is idle and
+    snap back to min_interval as soon as something changes.
+    """
+
+    def __init__(self, backend: ClipboardBackend, on_change: Callable[[ClipboardSnapshot], None],
+                 is_enabled: Callable[[], bool] = lambda: True,
+                 min_interval: float = 0.25, max_interval: float = 1.0, backoff: float = 1.5,
+                 max_bytes: int = DEFAULT_MAX_INGEST_BYTES):
+        self.backend = backend
+        self.on_change = on_change
+        self.is_enabled = is_enabled
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.max_bytes = max_bytes
+        self.last_digest: Optional[str] = None
+        self._last_token: Optional[Hashable] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        interval = self.min_interval
+        while not self._stop.is_set():
+            self.backend.wait_for_change(interval, self._stop)
+            if self._stop.is_set():
+                break
+            if not self.is_enabled():
+                interval = self.max_interval
+                continue
+
+            if self.check():
+                interval = self.min_interval
+            elif not self.backend.cheap_token:
+                interval = min(interval * self.backoff, self.max_interval)
+
+    def check(self) -> bool:
+        """Read the clipboard if it changed; returns True when on_change fired"""
+        try:
+            token = self.backend.change_token()
+            if token is not None:
+                if token == self._last_token:
+                    return False
+                self._last_token = token
+
+            snapshot = self.backend.read_snapshot(self.max_bytes)
+        except Exception as e:
+            print(f"❌ Clipboard error: {e}")
+            return False
+
+        if snapshot.digest == self.last_digest or snapshot.is_blank():
+            return False
+        self.last_digest = snapshot.digest
+        self.on_change(snapshot)
+        return True
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Clipboard and hotkey access off the Tk thread
+ClipboardService runs the clipboard watcher, clipboard reads and the global hotkey
+listener in a worker process (started with spawn), so pbpaste/xclip/wl-paste calls,
+snapshot hashing and pynput never run on, or compete for the GIL with, the Tk main loop.
+The UI sends commands over one multiprocessing queue and drains events from another on a
+root.after timer; every callback runs on the Tk thread.
+
+Without a clipboard command (Tk's own clipboard is the only backend) there is no
+isolation: Tk may only be called from its own thread, so the clipboard is read by the
+same root.after timer on the Tk thread, backing off while it is unchanged. Only the
+hotkey listener then runs on a thread (pynput's own).
+"""
+
+import multiprocessing
+import os
+import queue
+import time
+from typing import Any, Callable, Dict, Optional
+
+from clipboard_backends import (DEFAULT_MAX_INGEST_BYTES, ClipboardBackend, ClipboardSnapshot, ClipboardWatcher,
+                                TkClipboardBackend, get_native_backend, has_native_backend)
+
+SnapshotCallback = Callable[[ClipboardSnapshot], None]
+
+
+class HotkeyListener:
+    """One global hotkey through pynput, imported when the listener first starts"""
+
+    def __init__(self, hotkey: str, on_hotkey: Callable[[], None], on_error: Callable[[str], None] = print):
+        self.hotkey = hotkey
+        self.on_hotkey = on_hotkey
+        self.on_error = on_error
+        self._listener = None
+
+    def set_enabled(self, enabled: bool):
+        if enabled and self._listener is None:
+            try:
+                from pynput import keyboard
+                self._listener = keyboard.GlobalHotKeys({self.hotkey: self.on_hotkey})
+                self._listener.start()
+            except Exception as e:
+                self._listener = None
+                self.on_error(f"Hotkey setup error: {e}")
+        elif not enabled and self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+
+
+def serve(commands, events, backend_factory: Callable[[], ClipboardBackend], max_bytes: int,
+          hotkey: Optional[str], monitoring: bool, hotkey_enabled: bool, last_digest: Optional[str]):
+    """Worker loop: watch the clipboard, answer read commands and forward hotkey presses
+
+    Runs in the worker process until a "stop" command arrives or the parent goes away.
+    """
+    backend = backend_factory()
+    state = {"monitoring": monitoring}
+    watcher = ClipboardWatcher(backend, lambda snapshot: events.put(("change", snapshot)),
+                               is_enabled=lambda: state["monitoring"], max_bytes=max_bytes)
+    watcher.last_digest = last_digest
+    watcher.start()
+    hotkeys = None
+    if hotkey:
+        hotkeys = HotkeyListener(hotkey, lambda: events.put(("hotkey",)),
+                                 on_error=lambda message: events.put(("error", message)))
+        hotkeys.set_enabled(hotkey_enabled)
+    events.put(("ready", backend.name))
+
+    parent = os.getppid()
+    while True:
+        try:
+            command, *args = commands.get(timeout=1.0)
+        except queue.Empty:
+            if os.getppid() != parent:
+                break
+            continue
+        if command == "stop":
+            break
+        if command == "read":
+            try:
+                snapshot = backend.read_snapshot(max_bytes)
+            except Exception as e:
+                events.put(("error", f"Error reading clipboard: {e}"))
+                snapshot = ClipboardSnapshot.from_text("")
+            events.put(("snapshot", args[0], snapshot))
+        elif command == "monitor":
+            state["monitoring"] = args[0]
+        elif command == "hotkey" and hotkeys is not None:
+            hotkeys.set_enabled(args[0])
+
+    watcher.stop()
+    if hotkeys is not None:
+        hotkeys.set_enabled(False)
+    backend.close()
+
+
+class ClipboardService:
+    """UI-side handle on the clipboard worker
+
+    on_change(snapshot), on_hotkey() and read() callbacks are called on the Tk thread.
+    With isolated=True backend_factory must be picklable (a module-level function or
+    class) because it is called in the worker process. With isolated=False there is no
+    worker: the backend is read on the Tk thread from the poll timer, so it may use Tk
+    (e.g. TkClipboardBackend) but every read stalls the UI for as long as it takes.
+    """
+
+    def __init__(self, root, on_change: SnapshotCallback, on_hotkey: Optional[Callable[[], None]] = None,
+                 hotkey: Optional[str] = None, max_bytes: int = DEFAULT_MAX_INGEST_BYTES,
+                 isolated: bool = True, backend_factory: Callable[[], ClipboardBackend] = get_native_backend,
+                 on_error: Callable[[str], None] = print, poll_interval: float = 0.05):
+        self.root = root
+        self.on_change = on_change
+        self.on_hotkey = on_hotkey
+        self.hotkey = hotkey
+        self.max_bytes = max_bytes
+        self.isolated = isolated
+        self.backend_factory = backend_factory
+        self.on_error = on_error
+        self.poll_interval = poll_interval
+        self.backend_name: Optional[str] = None  # Known once the worker reports ready
+        self.events_handled = 0
+        self._reads: Dict[int, SnapshotCallback] = {}
+        self._next_read = 0
+        self._commands: Any = None
+        self._events: Any = None
+        self._worker: Any = None
+        # In-process (isolated=False) state, used on the Tk thread only
+        self._watcher: Optional[ClipboardWatcher] = None
+        self._hotkeys: Optional[HotkeyListener] = None
+        self._monitoring = False
+        self._check_interval = 0.0
+        self._next_check = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._worker is not None or self._watcher is not None
+
+    def start(self, monitoring: bool = True, hotkey_enabled: bool = False, last_digest: Optional[str] = None):
+        if self.running:
+            return
+        if self.isolated:
+            context = multiprocessing.get_context("spawn")
+            self._commands, self._events = context.Queue(), context.Queue()
+            self._worker = context.Process(
+                target=serve, name="clipboard-worker", daemon=True,
+                args=(self._commands, self._events, self.backend_factory, self.max_bytes,
+                      self.hotkey if self.on_hotkey else None, monitoring, hotkey_enabled, last_digest))
+            self._worker.start()
+        else:
+            self._start_in_process(monitoring, hotkey_enabled, last_digest)
+        self.root.after(int(self.poll_interval * 1000), self._poll)
+
+    def _start_in_process(self, monitoring: bool, hotkey_enabled: bool, last_digest: Optional[str]):
+        """Set up reads on the Tk thread; the backend is created here but first read from _poll"""
+        self._commands, self._events = queue.Queue(), queue.Queue()
+        backend = self.backend_factory()
+        self._watcher = ClipboardWatcher(backend, self.on_change, is_enabled=lambda: self._monitoring,
+                                         max_bytes=self.max_bytes)
+        self._watcher.last_digest = last_digest
+        self._monitoring = monitoring
+        self._check_interval = self._watcher.min_interval
+        self._next_check = 0.0
+        if self.hotkey and self.on_hotkey:
+            # pynput calls back on its own thread, so presses are queued like the worker's events
+            self._hotkeys = HotkeyListener(self.hotkey, lambda: self._events.put(("hotkey",)),
+                                           on_error=lambda message: self._events.put(("error", message)))
+            self._hotkeys.set_enabled(hotkey_enabled)
+        self.backend_name = backend.name
+
+    def read(self, callback: SnapshotCallback):
+        """Read the clipboard in the worker (or on the next poll tick); callback(snapshot) runs on the Tk thread"""
+        self._next_read += 1
+        self._reads[self._next_read] = callback
+        self._commands.put(("read", self._next_read))
+
+    def set_monitoring(self, enabled: bool):
+        self._commands.put(("monitor", enabled))
+
+    def set_hotkey(self, enabled: bool):
+        self._commands.put(("hotkey", enabled))
+
+    def stop(self, timeout: float = 2.0):
+        if self._watcher is not None:
+            watcher, self._watcher = self._watcher, None
+            if self._hotkeys is not None:
+                self._hotkeys.set_enabled(False)
+                self._hotkeys = None
+            watcher.backend.close()
+        if self._worker is None:
+            return
+        self._commands.put(("stop",))
+        self._worker.join(timeout)
+        if self._worker.is_alive():
+            self._worker.terminate()
+        self._worker = None
+
+    def _poll(self):
+        """Handle the events queued since the last tick (never blocks), then poll again"""
+        if not self.running:
+            return
+        if self._watcher is not None:
+            self._serve_in_process(self._watcher)
+        for _ in range(100):
+            try:
+                event, *args = self._events.get_nowait()
+            except queue.Empty:
+                break
+            self.events_handled += 1
+            try:
+                self._dispatch(event, args)
+            except Exception as e:
+                self.on_error(f"Clipboard event error: {e}")
+        self.root.after(int(self.poll_interval * 1000), self._poll)
+
+    def _serve_in_process(self, watcher: ClipboardWatcher):
+        """serve() for isolated=False, one tick at a time on the Tk thread"""
+        while True:
+            try:
+                command, *args = self._commands.get_nowait()
+            except queue.Empty:
+                break
+            if command == "read":
+                try:
+                    snapshot = watcher.backend.read_snapshot(self.max_bytes)
+                except Exception as e:
+                    self.on_error(f"Error reading clipboard: {e}")
+                    snapshot = ClipboardSnapshot.from_text("")
+                self._events.put(("snapshot", args[0], snapshot))
+            elif command == "monitor":
+                self._monitoring = args[0]
+            elif command == "hotkey" and self._hotkeys is not None:
+                self._hotkeys.set_enabled(args[0])
+
+        # Like ClipboardWatcher's thread: a read only when due, backing off while nothing changes
+        now = time.monotonic()
+        if not self._monitoring or now < self._next_check:
+            return
+        if watcher.check():
+            self._check_interval = watcher.min_interval
+        elif not watcher.backend.cheap_token:
+            self._check_interval = min(self._check_interval * watcher.backoff, watcher.max_interval)
+        self._next_check = now + self._check_interval
+
+    def _dispatch(self, event: str, args: list):
+        if event == "change":
+            self.on_change(args[0])
+        elif event == "snapshot":
+            callback = self._reads.pop(args[0], None)
+            if callback is not None:
+                callback(args[1])
+        elif event == "hotkey" and self.on_hotkey is not None:
+            self.on_hotkey()
+        elif event == "ready":
+            self.backend_name = args[0]
+        elif event == "error":
+            self.on_error(args[0])
+
+
+def create_clipboard_service(root, on_change: SnapshotCallback, **kwargs) -> ClipboardService:
+    """A worker-process service when the platform has a clipboard command, else Tk's clipboard read on the Tk thread"""
+    if has_native_backend():
+        return ClipboardService(root, on_change, isolated=True, **kwargs)
+    return ClipboardService(root, on_change, isolated=False, backend_factory=lambda: TkClipboardBackend(root), **kwargs)
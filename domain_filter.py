@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Allowed-domain filter for clipboard content
+The domain list is compiled once, when it is loaded or saved. Matching then makes one
+regex pass over the content to pull out host names (from URLs, bare hosts and e-mail
+addresses) and looks each host and its parent domains up in a set. The cost depends on the
+content and the number of labels in each host, not on how many domains are allowed.
+
+List entries:
+    example.com          example.com and any subdomain of it
+    *.example.com        subdomains of example.com only
+    https://example.com/ a URL; only its host is used
+    substack             no dot: matched as a whole word anywhere in the content
+    192.168.1.10, [::1]  an IP address: matched exactly, in content as a dotted quad or a
+                         bracketed IPv6 address (as in URLs)
+
+Entries that could never match (a malformed host name, a wildcard over a TLD or an IP address)
+are not kept; they are listed in DomainFilter.rejected.
+"""
+
+import ipaddress
+import re
+from typing import Iterable, List, Optional, Set
+
+# A host name: two or more dot-separated labels ending in an alphabetic TLD
+_NAME = r"(?:[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?\.)+(?:[a-z]{2,63}|xn--[a-z0-9-]{1,59})"
+_HOST = re.compile(r"(?<![\w.-])(" + _NAME + r")(?![\w-])", re.IGNORECASE)
+# An IP address: a dotted quad, or an IPv6 address in brackets; ip_address() validates either
+_ADDRESS = re.compile(r"(?<![\w.-])(\d{1,3}(?:\.\d{1,3}){3})(?![\w-]|\.\w)|\[([0-9a-f:.]+)\]", re.IGNORECASE)
+_SCHEME = re.compile(r"^[a-z][a-z0-9+.-]*://", re.IGNORECASE)
+
+
+def parse_address(text: str) -> Optional[str]:
+    """text in canonical IP address form, or None if it is not an IP address"""
+    try:
+        return str(ipaddress.ip_address(text))
+    except ValueError:
+        return None
+
+
+def normalize_entry(entry: str) -> str:
+    """Lowercase an entry and reduce a URL to its host (keeping a leading '*.')"""
+    entry = _SCHEME.sub("", entry.strip().lower())
+    entry = re.split(r"[/?#]", entry, 1)[0]
+    entry = entry.rsplit("@", 1)[-1]
+    if entry.startswith("["):
+        return entry[1:].split("]", 1)[0]
+    if parse_address(entry):  # A bare IPv6 address, whose colons are not a port separator
+        return entry
+    return entry.split(":", 1)[0].strip(".")
+
+
+def extract_hosts(text: str) -> List[str]:
+    """Host names mentioned in text, lowercased, in order of appearance"""
+    return [match.lower() for match in _HOST.findall(text)]
+
+
+class DomainFilter:
+    """Compiled allow list; matches(text) is True when text mentions an allowed domain"""
+
+    def __init__(self, entries: Iterable[str] = ()):
+        self.entries: List[str] = []
+        self.rejected: List[str] = []       # Entries as given that could never match
+        self._domains: Set[str] = set()     # Host and its subdomains
+        self._wildcards: Set[str] = set()   # Subdomains only
+        self._addresses: Set[str] = set()   # IP addresses, canonical form
+        keywords: List[str] = []
+
+        for raw in entries:
+            entry = normalize_entry(raw)
+            if not entry or entry in self.entries:
+                continue
+            address = parse_address(entry)
+            if address:
+                self._addresses.add(address)
+            elif entry.startswith("*.") and _HOST.fullmatch(entry[2:]):
+                self._wildcards.add(entry[2:])
+            elif "." in entry and _HOST.fullmatch(entry):
+                self._domains.add(entry)
+            elif "." not in entry and ":" not in entry:
+                keywords.append(entry)
+            else:
+                self.rejected.append(raw.strip())
+                continue
+            self.entries.append(entry)
+
+        self._keywords = (re.compile(r"\b(?:" + "|".join(map(re.escape, keywords)) + r")\b", re.IGNORECASE)
+                          if keywords else None)
+        self._max_labels = max((d.count(".") + 1 for d in self._domains | self._wildcards), default=0)
+
+    @classmethod
+    def from_text(cls, text: str) -> "DomainFilter":
+        """Build a filter from a one-entry-per-line list"""
+        return cls(line for line in text.splitlines() if line.strip())
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def allows_host(self, host: str) -> bool:
+        host = host.lower().strip(".")
+        if host in self._domains:
+            return True
+        labels = host.split(".")
+        # Only parent domains short enough to be on the list need a lookup
+        for start in range(max(1, len(labels) - self._max_labels), len(labels) - 1):
+            parent = ".".join(labels[start:])
+            if parent in self._domains or parent in self._wildcards:
+                return True
+        return False
+
+    def find(self, text: str) -> Optional[str]:
+        """The first allowed host, IP address or keyword in text, or None"""
+        if self._domains or self._wildcards:
+            for match in _HOST.finditer(text):
+                if self.allows_host(match.group(1)):
+                    return match.group(1).lower()
+        if self._addresses:
+            for match in _ADDRESS.finditer(text):
+                address = parse_address(match.group(1) or match.group(2))
+                if address in self._addresses:
+                    return address
+        if self._keywords is not None:
+            match = self._keywords.search(text)
+            if match:
+                return match.group(0).lower()
+        return None
+
+    def matches(self, text: str) -> bool:
+        """True when the list is empty or text mentions an allowed domain"""
+        return not self.entries or self.find(text) is not None
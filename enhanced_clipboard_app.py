@@ -8,20 +8,36 @@ Features:
 - Popup modal for quick interactions
 """
 
-import tkinter as tk
-from tkinter import ttk, scrolledtext, messagebox, simpledialog
-import subprocess
-import requests
-import json
-import threading
-import time
-from datetime import datetime
-from typing import Optional, Dict, Any, Set
-import re
-import pynput
-from pynput import keyboard
-import tempfile
-import os
+from startup_profile import StartupProfiler
+
+profiler = StartupProfiler.from_argv()
+
+with profiler.track_imports():
+    import tkinter as tk
+    from tkinter import ttk, scrolledtext, messagebox, simpledialog
+    import time
+    from datetime import datetime
+    from typing import Optional, Dict, Any, List, Set, Tuple
+    import os
+    # requests is imported on first use, off the main thread; pynput only in the clipboard worker
+    from ollama_client import OllamaConnectionError, OllamaHTTPError, OllamaUnavailableError, collect_chat
+    from resilience import HealthProber
+    from backend_pool import get_app_client
+    from response_cache import ResponseCache
+    from request_scheduler import RequestHandle, RequestScheduler
+    from model_manager import ModelManager, split_durations
+    from history_store import HistoryStore
+    from similar_prompts import SimilarMatch, SimilarPromptIndex
+    from text_views import VirtualTextView
+    from text_diff import StreamingDiff, diff_words
+    from request_metrics import MetricsRecorder, RequestTrace, StallMonitor
+    from chat_session import ChatSession, estimate_tokens
+    from prompt_templates import RenderedPrompt, TemplateError, get_registry
+    from chunk_pipeline import DEFAULT_CHUNK_TOKENS, ChunkPipeline, ChunkProgress, split_text
+    from speculative_prefetch import SpeculativePrefetcher
+    from domain_filter import DomainFilter
+    from clipboard_backends import ClipboardSnapshot, DEFAULT_MAX_INGEST_BYTES
+    from clipboard_worker import create_clipboard_service
 
 class EnhancedClipboardOllamaApp:
     def __init__(self):
@@ -31,27 +47,68 @@ class EnhancedClipboardOllamaApp:
         self.root.minsize(700, 500)
         
         # Configuration
-        self.ollama_url = "http://localhost:11434"
+        # Gateway (probed on the first request, off the main thread) or a pool of OLLAMA_URLS hosts
+        self.client = get_app_client()
+        self.model_manager = ModelManager(self.client)
+        # Polls /api/tags every 15 s (every 3 s while Ollama is down) for the status indicator
+        self.health = HealthProber(self.client.model_names,
+                                   lambda models, error: self.root.after(0, lambda: self.on_health(models, error)))
+        self.templates = get_registry()
         self.default_model = "gemma3:1b"
         self.available_models = []
+        self.stream_responses = True
+        self.stream_flush_interval = 0.05  # Seconds between response pane updates while streaming
+        self.show_changes = True  # Rewrite actions are shown as changes to the input
+        self.use_cache = True
+        self.response_cache = ResponseCache()
+        self.scheduler = RequestScheduler(max_workers=4, per_model_limit=1)
+        self.current_request: Optional[RequestHandle] = None
+        self.history_store = HistoryStore(
+            on_flush=lambda count: self.root.after(0, self.on_history_written))
+        self.history_page_size = 50
+        # Near-duplicate prompts are offered the earlier response; rebuilt from history at startup
+        self.similar_prompts = SimilarPromptIndex(threshold=0.85)
+        self.offered_similar: Optional[str] = None  # Prompt last answered from the index; Send again to generate
+        self.metrics = MetricsRecorder()
+        self.history_offset = 0
+        self.keep_conversation = False
+        self.session = ChatSession(token_budget=4096)  # Earlier turns resent so Ollama reuses the prefix
+        self.chunk_tokens = DEFAULT_CHUNK_TOKENS  # Larger input is split and processed chunk by chunk
+        self.chunk_workers = 4
+        self.prefetch = False  # Opt-in: start generating as soon as the clipboard changes
+        self.prefetcher = SpeculativePrefetcher(self.client, max_jobs=2,
+                                                keep_alive=self.model_manager.keep_alive)
         
         # State variables
         self.last_clipboard_content = ""
-        self.monitoring_clipboard = False
+        self.last_clipboard_digest: Optional[str] = None
+        self.max_clipboard_bytes = DEFAULT_MAX_INGEST_BYTES  # Larger clipboards are truncated for display
         self.hotkey_enabled = True
-        self.allowed_domains: Set[str] = set()
+        self.domain_filter = DomainFilter()  # Compiled from allowed_domains.txt
         
-        # Global hotkey listener
-        self.hotkey_listener = None
+        # Clipboard reads, change watching and the global hotkey run in a worker process;
+        # results come back through an IPC queue drained on the Tk thread
+        self.clipboard = create_clipboard_service(
+            self.root, self.on_clipboard_change, on_hotkey=self.quick_process_clipboard,
+            hotkey='<cmd>+<shift>+o', max_bytes=self.max_clipboard_bytes,
+            on_error=lambda message: self.log_message(message, "error"))
+        self.stall_monitor = StallMonitor(self.root)  # How long the Tk thread goes unresponsive
         
-        # Initialize UI
-        self.create_ui()
-        self.check_ollama_status()
-        self.load_available_models()
-        self.setup_global_hotkey()
-        
-        # Start clipboard monitoring
-        self.start_clipboard_monitoring()
+        # Settings shared by every tab; created here because the tabs are built on first open
+        self.hotkey_enabled_var = tk.BooleanVar(value=self.hotkey_enabled)
+        self.stream_var = tk.BooleanVar(value=self.stream_responses)
+        self.changes_var = tk.BooleanVar(value=self.show_changes)
+        self.cache_var = tk.BooleanVar(value=self.use_cache)
+        self.similar_var = tk.BooleanVar(value=True)
+        self.similar_threshold_var = tk.DoubleVar(value=self.similar_prompts.threshold)
+        self.similar_threshold_var.trace_add("write", self.update_similar_threshold)
+        self.conversation_var = tk.BooleanVar(value=self.keep_conversation)
+        self.prefetch_var = tk.BooleanVar(value=self.prefetch)
+        self.history_search_var = tk.StringVar()
+        
+        # Initialize UI; clipboard, network and hotkey setup wait for the first paint (see run)
+        with profiler.phase("create_ui"):
+            self.create_ui()
         
     def create_ui(self):
         """Create the enhanced user interface"""
@@ -64,16 +121,33 @@ class EnhancedClipboardOllamaApp:
         self.notebook.add(self.main_frame, text="📋 Main")
         self.create_main_tab()
         
-        # Settings tab
+        # The other tabs are built the first time they are opened
         self.settings_frame = ttk.Frame(self.notebook)
         self.notebook.add(self.settings_frame, text="⚙️ Settings")
-        self.create_settings_tab()
-        
-        # History tab
         self.history_frame = ttk.Frame(self.notebook)
         self.notebook.add(self.history_frame, text="📜 History")
-        self.create_history_tab()
-        
+        self.stats_frame = ttk.Frame(self.notebook)
+        self.notebook.add(self.stats_frame, text="📊 Stats")
+        self.tab_builders = {
+            str(self.settings_frame): self.create_settings_tab,
+            str(self.history_frame): self.create_history_tab,
+            str(self.stats_frame): self.create_stats_tab,
+        }
+        self.built_tabs: Set[str] = set()
+        self.notebook.bind("<<NotebookTabChanged>>", lambda e: self.build_tab(self.notebook.select()))
+        
+    def build_tab(self, tab: str):
+        """Build a tab's widgets the first time it is selected"""
+        builder = self.tab_builders.get(tab)
+        if builder is None or tab in self.built_tabs:
+            return
+        self.built_tabs.add(tab)
+        with profiler.phase(builder.__name__):
+            builder()
+    
+    def tab_built(self, frame: ttk.Frame) -> bool:
+        return str(frame) in self.built_tabs
+    
     def create_main_tab(self):
         """Create the main application tab"""
         main_frame = ttk.Frame(self.main_frame, padding="10")
@@ -114,6 +188,21 @@ class EnhancedClipboardOllamaApp:
                                        state="readonly", width=15)
         self.model_combo.grid(row=0, column=3, sticky=tk.W, padx=(10, 0))
         
+        # Preload whichever model gets selected
+        self.model_var.trace_add("write", lambda *args: self.preload_model(self.model_var.get()))
+        
+        # Prompt template; each action may route to its own model
+        ttk.Label(status_frame, text="Action:").grid(row=1, column=2, sticky=tk.W, padx=(20, 0), pady=(5, 0))
+        self.action_var = tk.StringVar(value=self.templates.default_action)
+        self.action_combo = ttk.Combobox(status_frame, textvariable=self.action_var, 
+                                        values=self.templates.actions(), state="readonly", width=15)
+        self.action_combo.grid(row=1, column=3, sticky=tk.W, padx=(10, 0), pady=(5, 0))
+        self.action_var.trace_add("write", lambda *args: self.preload_model(self.routed_model()))
+        
+        # Models currently resident in Ollama's memory
+        self.resident_label = ttk.Label(status_frame, text="", foreground="gray")
+        self.resident_label.grid(row=0, column=4, sticky=tk.W, padx=(20, 0))
+        
         # Clipboard content section
         content_frame = ttk.LabelFrame(main_frame, text="📋 Clipboard Content", padding="5")
         content_frame.grid(row=2, column=0, columnspan=3, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(0, 10))
@@ -144,6 +233,9 @@ class EnhancedClipboardOllamaApp:
                                            command=self.quick_process_clipboard)
         self.quick_process_btn.pack(side=tk.LEFT, padx=(10, 0))
         
+        self.clipboard_size_label = ttk.Label(content_frame, text="", foreground="gray")
+        self.clipboard_size_label.grid(row=1, column=0, sticky=tk.E)
+        
         # Action buttons
         action_frame = ttk.Frame(main_frame)
         action_frame.grid(row=3, column=0, columnspan=3, pady=(0, 10))
@@ -152,6 +244,10 @@ class EnhancedClipboardOllamaApp:
                                   command=self.send_to_ollama, style="Accent.TButton")
         self.send_btn.pack(side=tk.LEFT, padx=(0, 10))
         
+        self.cancel_btn = ttk.Button(action_frame, text="⏹ Cancel", 
+                                    command=self.cancel_request, state=tk.DISABLED)
+        self.cancel_btn.pack(side=tk.LEFT, padx=(0, 10))
+        
         self.clear_btn = ttk.Button(action_frame, text="🗑️ Clear Response", 
                                    command=self.clear_response)
         self.clear_btn.pack(side=tk.LEFT)
@@ -162,6 +258,10 @@ class EnhancedClipboardOllamaApp:
         response_frame.columnconfigure(0, weight=1)
         response_frame.rowconfigure(0, weight=1)
         
+        # Response timing (time-to-first-token and tokens/sec)
+        self.response_time_label = ttk.Label(response_frame, text="", foreground="gray")
+        self.response_time_label.grid(row=1, column=0, sticky=tk.E, pady=(5, 0))
+        
         # Response text area
         self.response_text = scrolledtext.ScrolledText(response_frame, height=10, 
                                                       wrap=tk.WORD, state=tk.DISABLED)
@@ -171,6 +271,12 @@ class EnhancedClipboardOllamaApp:
         self.response_text.tag_configure("error", foreground="red")
         self.response_text.tag_configure("success", foreground="green")
         self.response_text.tag_configure("info", foreground="blue")
+        self.response_text.tag_configure("inserted", foreground="#1a7f37", background="#dafbe1")
+        self.response_text.tag_configure("deleted", foreground="#cf222e", overstrike=True)
+        self.diff_tags = {"insert": "inserted", "delete": "deleted"}
+        
+        # Only a bounded window of the session's responses is rendered at a time
+        self.response_view = VirtualTextView(self.response_text, self.response_text.vbar)
         
     def create_settings_tab(self):
         """Create the settings tab"""
@@ -181,7 +287,6 @@ class EnhancedClipboardOllamaApp:
         hotkey_frame = ttk.LabelFrame(settings_frame, text="⌨️ Global Hotkey", padding="10")
         hotkey_frame.pack(fill=tk.X, pady=(0, 10))
         
-        self.hotkey_enabled_var = tk.BooleanVar(value=self.hotkey_enabled)
         ttk.Checkbutton(hotkey_frame, text="Enable global hotkey (Cmd+Shift+O)", 
                        variable=self.hotkey_enabled_var,
                        command=self.toggle_hotkey).pack(anchor=tk.W)
@@ -189,6 +294,40 @@ class EnhancedClipboardOllamaApp:
         ttk.Label(hotkey_frame, text="Press the hotkey to instantly process clipboard content",
                  foreground="gray").pack(anchor=tk.W, pady=(5, 0))
         
+        # Response settings
+        response_settings = ttk.LabelFrame(settings_frame, text="🤖 Responses", padding="10")
+        response_settings.pack(fill=tk.X, pady=(0, 10))
+        
+        ttk.Checkbutton(response_settings, text="Stream responses as they are generated", 
+                       variable=self.stream_var).pack(anchor=tk.W)
+        ttk.Checkbutton(response_settings, text="Show rewrites as changes to the clipboard text", 
+                       variable=self.changes_var).pack(anchor=tk.W, pady=(5, 0))
+        
+        cache_row = ttk.Frame(response_settings)
+        cache_row.pack(fill=tk.X, pady=(5, 0))
+        ttk.Checkbutton(cache_row, text="Serve repeated requests from the response cache", 
+                       variable=self.cache_var).pack(side=tk.LEFT)
+        ttk.Button(cache_row, text="🗑️ Clear Cache", 
+                  command=self.clear_response_cache).pack(side=tk.RIGHT)
+        
+        similar_row = ttk.Frame(response_settings)
+        similar_row.pack(fill=tk.X, pady=(5, 0))
+        ttk.Checkbutton(similar_row, text="Offer the earlier response for near-identical text, similarity ≥",
+                       variable=self.similar_var).pack(side=tk.LEFT)
+        ttk.Spinbox(similar_row, from_=0.5, to=1.0, increment=0.05, width=5,
+                   textvariable=self.similar_threshold_var).pack(side=tk.LEFT, padx=(5, 0))
+        
+        conversation_row = ttk.Frame(response_settings)
+        conversation_row.pack(fill=tk.X, pady=(5, 0))
+        ttk.Checkbutton(conversation_row, text="Keep conversation context between requests", 
+                       variable=self.conversation_var).pack(side=tk.LEFT)
+        ttk.Button(conversation_row, text="💬 New Conversation", 
+                  command=self.new_conversation).pack(side=tk.RIGHT)
+        
+        ttk.Checkbutton(response_settings, text="Prefetch: start generating when the clipboard changes "
+                                               "(allowed domains only)",
+                       variable=self.prefetch_var, command=self.prefetcher.cancel_all).pack(anchor=tk.W, pady=(5, 0))
+        
         # Domain filtering
         domain_frame = ttk.LabelFrame(settings_frame, text="🌐 Domain Filtering", padding="10")
         domain_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
@@ -206,8 +345,8 @@ class EnhancedClipboardOllamaApp:
         ttk.Button(domain_buttons, text="🔄 Load Domains", 
                   command=self.load_domains).pack(side=tk.LEFT)
         
-        # Load existing domains
-        self.load_domains()
+        # Show the domains read at startup
+        self.show_domains()
         
     def create_history_tab(self):
         """Create the history tab"""
@@ -224,50 +363,106 @@ class EnhancedClipboardOllamaApp:
         ttk.Button(controls_frame, text="🗑️ Clear History", 
                   command=self.clear_history).pack(side=tk.RIGHT)
         
-        # History text area
-        self.history_text = scrolledtext.ScrolledText(history_frame, wrap=tk.WORD, 
+        # Search box (full-text search over prompts and responses)
+        search_frame = ttk.Frame(history_frame)
+        search_frame.pack(fill=tk.X, pady=(0, 10))
+        
+        ttk.Label(search_frame, text="🔍 Search:").pack(side=tk.LEFT)
+        search_entry = ttk.Entry(search_frame, textvariable=self.history_search_var)
+        search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(5, 5))
+        search_entry.bind('<Return>', lambda e: self.search_history())
+        ttk.Button(search_frame, text="Search", command=self.search_history).pack(side=tk.LEFT)
+        
+        # Paned list of interactions above the selected interaction's full text
+        panes = ttk.PanedWindow(history_frame, orient=tk.VERTICAL)
+        panes.pack(fill=tk.BOTH, expand=True)
+        
+        list_frame = ttk.Frame(panes)
+        columns = ("time", "model", "prompt", "response")
+        self.history_tree = ttk.Treeview(list_frame, columns=columns, show="headings", height=10)
+        for column, heading, width in (("time", "Time", 140), ("model", "Model", 100),
+                                       ("prompt", "Prompt", 250), ("response", "Response", 300)):
+            self.history_tree.heading(column, text=heading)
+            self.history_tree.column(column, width=width, stretch=column in ("prompt", "response"))
+        tree_scroll = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=self.history_tree.yview)
+        self.history_tree.configure(yscrollcommand=tree_scroll.set)
+        self.history_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        tree_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        self.history_tree.bind('<<TreeviewSelect>>', lambda e: self.show_history_entry())
+        panes.add(list_frame, weight=1)
+        
+        self.history_text = scrolledtext.ScrolledText(panes, wrap=tk.WORD, height=10,
                                                      state=tk.DISABLED)
-        self.history_text.pack(fill=tk.BOTH, expand=True)
+        panes.add(self.history_text, weight=1)
         
         # Configure history text tags
         self.history_text.tag_configure("timestamp", foreground="gray", font=("Arial", 9))
         self.history_text.tag_configure("user", foreground="blue", font=("Arial", 10, "bold"))
         self.history_text.tag_configure("assistant", foreground="green", font=("Arial", 10))
-        
-    def setup_global_hotkey(self):
-        """Setup global hotkey listener"""
-        def on_hotkey():
-            if self.hotkey_enabled_var.get():
-                self.root.after(0, self.quick_process_clipboard)
-        
-        def start_listener():
-            try:
-                with keyboard.GlobalHotKeys({
-                    '<cmd>+<shift>+o': on_hotkey
-                }) as listener:
-                    self.hotkey_listener = listener
-                    listener.join()
-            except Exception as e:
-                print(f"Hotkey setup error: {e}")
-        
-        if self.hotkey_enabled:
-            threading.Thread(target=start_listener, daemon=True).start()
+        self.history_view = VirtualTextView(self.history_text, self.history_text.vbar, spill_dir=None)
+        
+        # Pagination
+        page_frame = ttk.Frame(history_frame)
+        page_frame.pack(fill=tk.X, pady=(10, 0))
+        
+        ttk.Button(page_frame, text="◀ Newer", command=lambda: self.change_history_page(-1)).pack(side=tk.LEFT)
+        ttk.Button(page_frame, text="Older ▶", command=lambda: self.change_history_page(1)).pack(side=tk.LEFT, padx=(5, 0))
+        self.history_page_label = ttk.Label(page_frame, text="", foreground="gray")
+        self.history_page_label.pack(side=tk.LEFT, padx=(10, 0))
+        
+        self.refresh_history()
+        
+    def create_stats_tab(self):
+        """Create the live request statistics tab"""
+        stats_frame = ttk.Frame(self.stats_frame, padding="10")
+        stats_frame.pack(fill=tk.BOTH, expand=True)
+        
+        ttk.Label(stats_frame, text="📊 Request Statistics", 
+                 font=("Arial", 14, "bold")).pack(anchor=tk.W, pady=(0, 5))
+        ttk.Label(stats_frame, text="Rolling window of the last 200 successful requests per model "
+                                    "(full records in logs/metrics.jsonl)",
+                 foreground="gray").pack(anchor=tk.W, pady=(0, 10))
+        
+        columns = ("model", "ok", "errors", "cached", "p50", "p95", "ttft_p50", "ttft_p95",
+                   "wait_p95", "network_p50", "render_p50", "load_p50", "tok_s")
+        headings = ("Model", "OK", "Errors", "Cached", "Total p50", "Total p95", "TTFT p50", "TTFT p95",
+                    "Queue p95", "Network p50", "Render p50", "Load p50", "Tok/s")
+        self.stats_tree = ttk.Treeview(stats_frame, columns=columns, show="headings", height=8)
+        for column, heading in zip(columns, headings):
+            self.stats_tree.heading(column, text=heading)
+            self.stats_tree.column(column, width=130 if column == "model" else 75,
+                                   anchor=tk.W if column == "model" else tk.E)
+        self.stats_tree.pack(fill=tk.BOTH, expand=True)
+        
+        self.scheduler_stats_label = ttk.Label(stats_frame, text="", foreground="gray")
+        self.scheduler_stats_label.pack(anchor=tk.W, pady=(10, 0))
+        self.prefetch_stats_label = ttk.Label(stats_frame, text="", foreground="gray")
+        self.prefetch_stats_label.pack(anchor=tk.W, pady=(5, 0))
+        self.similar_stats_label = ttk.Label(stats_frame, text="", foreground="gray")
+        self.similar_stats_label.pack(anchor=tk.W, pady=(5, 0))
+        self.ui_stats_label = ttk.Label(stats_frame, text="", foreground="gray")
+        self.ui_stats_label.pack(anchor=tk.W, pady=(5, 0))
+        
+        self.refresh_stats()
     
     def toggle_hotkey(self):
         """Toggle global hotkey on/off"""
         self.hotkey_enabled = self.hotkey_enabled_var.get()
-        if not self.hotkey_enabled and self.hotkey_listener:
-            self.hotkey_listener.stop()
+        self.clipboard.set_hotkey(self.hotkey_enabled)
     
     def quick_process_clipboard(self):
+        """Read the clipboard in the worker, then offer it in the quick-process popup"""
+        self.clipboard.read(self.show_quick_process)
+    
+    def show_quick_process(self, snapshot: ClipboardSnapshot):
         """Quickly process clipboard content with a popup"""
-        content = self.get_clipboard_content()
-        if not content.strip():
+        content = snapshot.text
+        if snapshot.is_blank():
             self.show_popup_message("Clipboard is empty", "warning")
             return
         
         # Check domain filtering if enabled
-        if self.allowed_domains and not self.is_content_from_allowed_domain(content):
+        if not self.is_content_from_allowed_domain(content):
             return
         
         # Create popup window for quick processing
@@ -307,7 +502,7 @@ class EnhancedClipboardOllamaApp:
         
         def process_and_close():
             popup.destroy()
-            self.update_clipboard_display(content)
+            self.update_clipboard_display(snapshot)
             self.send_to_ollama()
         
         ttk.Button(button_frame, text="🚀 Process with Ollama", 
@@ -326,21 +521,20 @@ class EnhancedClipboardOllamaApp:
         popup.focus_set()
     
     def is_content_from_allowed_domain(self, content: str) -> bool:
-        """Check if content appears to be from an allowed domain"""
-        if not self.allowed_domains:
-            return True
-        
-        # Simple heuristic: check if any allowed domain appears in the content
-        for domain in self.allowed_domains:
-            if domain.lower() in content.lower():
-                return True
-        return False
+        """Check if content mentions an allowed domain (always True when none are set)"""
+        return self.domain_filter.matches(content)
     
     def save_domains(self):
         """Save allowed domains to file"""
         domains_text = self.domain_text.get(1.0, tk.END).strip()
         domains = [d.strip() for d in domains_text.split('\n') if d.strip()]
-        self.allowed_domains = set(domains)
+        self.domain_filter = DomainFilter(domains)
+        rejected = self.domain_filter.rejected
+        if rejected:
+            domains = [d for d in domains if d not in rejected]
+            self.show_domains()
+            messagebox.showwarning("Domains", "These entries can never match and were not saved:\n" +
+                                   "\n".join(rejected))
         
         # Save to file
         try:
@@ -351,43 +545,112 @@ class EnhancedClipboardOllamaApp:
             messagebox.showerror("Error", f"Failed to save domains: {e}")
     
     def load_domains(self):
-        """Load allowed domains from file"""
+        """Load allowed domains from file (runs on a startup thread, so the widget is filled via after)"""
         try:
             if os.path.exists('allowed_domains.txt'):
                 with open('allowed_domains.txt', 'r') as f:
-                    domains = [line.strip() for line in f.readlines() if line.strip()]
-                    self.allowed_domains = set(domains)
-                    self.domain_text.delete(1.0, tk.END)
-                    self.domain_text.insert(1.0, '\n'.join(domains))
+                    self.domain_filter = DomainFilter.from_text(f.read())
+                if self.domain_filter.rejected:
+                    print(f"Ignoring domain entries that can never match: {self.domain_filter.rejected}")
+                self.root.after(0, self.show_domains)
         except Exception as e:
             print(f"Error loading domains: {e}")
     
-    def add_to_history(self, user_content: str, assistant_response: str):
-        """Add interaction to history"""
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        self.history_text.config(state=tk.NORMAL)
-        
-        # Add timestamp
-        self.history_text.insert(tk.END, f"[{timestamp}]\n", "timestamp")
-        
-        # Add user content
-        self.history_text.insert(tk.END, "User: ", "user")
-        self.history_text.insert(tk.END, f"{user_content[:200]}...\n\n" if len(user_content) > 200 
-                                 else f"{user_content}\n\n")
-        
-        # Add assistant response
-        self.history_text.insert(tk.END, "Assistant: ", "assistant")
-        self.history_text.insert(tk.END, f"{assistant_response}\n\n" + "="*50 + "\n\n")
-        
-        self.history_text.see(tk.END)
-        self.history_text.config(state=tk.DISABLED)
+    def show_domains(self):
+        """Fill the domain list in the settings tab, if it has been built"""
+        if not self.tab_built(self.settings_frame):
+            return
+        self.domain_text.delete(1.0, tk.END)
+        self.domain_text.insert(1.0, '\n'.join(self.domain_filter.entries))
+    
+    def add_to_history(self, model: str, user_content: str, assistant_response: str,
+                       elapsed: Optional[float] = None, action: Optional[str] = None):
+        """Add interaction to history (written to disk in the background) and to the similar-prompt index
+        
+        action is None for requests whose prompt is not determined by model, action and
+        text alone (custom instructions, conversation turns); those are never offered again.
+        """
+        self.history_store.add(model, user_content, assistant_response, elapsed, action)
+        if action is not None:
+            self.similar_prompts.add(model, action, user_content, assistant_response)
+    
+    def load_similar_prompts(self):
+        """Index the most recent history so near-duplicates of earlier prompts are found after a restart"""
+        self.similar_prompts.load(self.history_store.recent(self.similar_prompts.max_entries))
+    
+    def update_similar_threshold(self, *args):
+        """Apply the similarity threshold from the settings spinbox once it holds a number"""
+        try:
+            threshold = self.similar_threshold_var.get()
+        except tk.TclError:
+            return
+        if 0.0 < threshold <= 1.0:
+            self.similar_prompts.threshold = threshold
+    
+    def on_history_written(self):
+        """Show newly written interactions if the newest page is on screen"""
+        if self.history_offset == 0 and self.tab_built(self.history_frame):
+            self.refresh_history()
+    
+    def refresh_history(self):
+        """Load the current page of history into the list"""
+        search = self.history_search_var.get().strip() or None
+        total = self.history_store.count(search)
+        rows = self.history_store.page(self.history_offset, self.history_page_size, search)
+        
+        self.history_tree.delete(*self.history_tree.get_children())
+        for row in rows:
+            timestamp = datetime.fromtimestamp(row["created_at"]).strftime("%Y-%m-%d %H:%M:%S")
+            self.history_tree.insert("", tk.END, iid=str(row["id"]), values=(
+                timestamp, row["model"],
+                " ".join(row["prompt"].split()), " ".join(row["response"].split())))
+        
+        if rows:
+            first = self.history_offset + 1
+            self.history_page_label.config(text=f"{first}-{first + len(rows) - 1} of {total}")
+        else:
+            self.history_page_label.config(text="No matching interactions" if search else "No interactions yet")
+    
+    def change_history_page(self, direction: int):
+        """Move one page newer (-1) or older (1)"""
+        search = self.history_search_var.get().strip() or None
+        offset = self.history_offset + direction * self.history_page_size
+        if offset < 0 or offset >= self.history_store.count(search):
+            return
+        self.history_offset = offset
+        self.refresh_history()
+    
+    def search_history(self):
+        """Run the search box query from the first page"""
+        self.history_offset = 0
+        self.refresh_history()
+    
+    def show_history_entry(self):
+        """Show the full prompt and response of the selected interaction"""
+        selection = self.history_tree.selection()
+        if not selection:
+            return
+        entry = self.history_store.get(int(selection[0]))
+        if entry is None:
+            return
+        timestamp = datetime.fromtimestamp(entry["created_at"]).strftime("%Y-%m-%d %H:%M:%S")
+        
+        self.history_view.clear()
+        self.history_view.add(f"[{timestamp}] {entry['model']}\n", "timestamp")
+        self.history_view.add("User: ", "user")
+        self.history_view.add(f"{entry['prompt']}\n\n")
+        self.history_view.add("Assistant: ", "assistant")
+        self.history_view.add(entry["response"])
     
     def clear_history(self):
         """Clear interaction history"""
-        self.history_text.config(state=tk.NORMAL)
-        self.history_text.delete(1.0, tk.END)
-        self.history_text.config(state=tk.DISABLED)
+        if not messagebox.askyesno("Clear History", "Delete every saved interaction?"):
+            return
+        self.history_store.clear()
+        self.similar_prompts.clear()
+        self.history_offset = 0
+        self.history_view.clear()
+        self.refresh_history()
     
     def show_popup_message(self, message: str, msg_type: str = "info"):
         """Show a temporary popup message"""
@@ -399,37 +662,52 @@ class EnhancedClipboardOllamaApp:
             messagebox.showinfo("Info", message)
     
     # Include all the original methods from the basic app
-    def check_ollama_status(self):
-        """Check if Ollama server is running"""
-        def check():
-            try:
-                response = requests.get(f"{self.ollama_url}/api/tags", timeout=5)
-                if response.status_code == 200:
-                    self.root.after(0, lambda: self.update_status("✅ Connected", "green"))
-                else:
-                    self.root.after(0, lambda: self.update_status("❌ Error", "red"))
-            except requests.exceptions.RequestException:
-                self.root.after(0, lambda: self.update_status("❌ Disconnected", "red"))
-        
-        threading.Thread(target=check, daemon=True).start()
+    def probe_ollama(self):
+        """Probe Ollama now (blocks; run off the main thread), then keep probing in the background"""
+        self.health.check()
+        self.health.start()
+    
+    def on_health(self, models: Optional[list], error: Optional[Exception]):
+        """Show the latest health probe result; the model list only changes when Ollama's does"""
+        if isinstance(error, OllamaUnavailableError):
+            self.update_status(f"❌ Unreachable (retry in {error.retry_in:.0f}s)", "red")
+        elif isinstance(error, OllamaHTTPError):
+            self.update_status("❌ Error", "red")
+        elif error is not None:
+            self.update_status("❌ Disconnected", "red")
+        else:
+            self.update_status("✅ Connected", "green")
+            if models != self.available_models:
+                self.update_model_list(models)
     
     def update_status(self, text: str, color: str):
         """Update the status label"""
         self.status_label.config(text=text, foreground=color)
     
-    def load_available_models(self):
-        """Load available models from Ollama"""
-        def load():
-            try:
-                response = requests.get(f"{self.ollama_url}/api/tags", timeout=5)
-                if response.status_code == 200:
-                    data = response.json()
-                    models = [model["name"] for model in data.get("models", [])]
-                    self.root.after(0, lambda: self.update_model_list(models))
-            except requests.exceptions.RequestException:
-                pass
+    def preload_model(self, model: str):
+        """Load the selected model in the background so the first send is warm"""
+        if not model:
+            return
+        if not self.model_manager.is_resident(model):
+            self.resident_label.config(text=f"⏳ Loading {model}...")
         
-        threading.Thread(target=load, daemon=True).start()
+        def on_done(name: str, seconds: float, error: Optional[Exception]):
+            self.root.after(0, lambda: self.on_model_loaded(name, seconds, error))
+        
+        self.model_manager.preload(model, on_done=on_done)
+    
+    def on_model_loaded(self, model: str, seconds: float, error: Optional[Exception]):
+        """Report the result of a model preload"""
+        if error:
+            self.log_message(f"Could not preload {model}: {error}", "error")
+            return
+        self.update_resident_models(self.model_manager.resident)
+        self.response_time_label.config(text=f"{model} loaded in {seconds:.1f}s")
+    
+    def update_resident_models(self, models: list):
+        """Show which models Ollama currently holds in memory"""
+        names = [model["name"] for model in models]
+        self.resident_label.config(text=f"In memory: {', '.join(names)}" if names else "No models loaded")
     
     def update_model_list(self, models: list):
         """Update the model combobox with available models"""
@@ -440,42 +718,36 @@ class EnhancedClipboardOllamaApp:
         elif models:
             self.model_var.set(models[0])
     
-    def get_clipboard_content(self) -> str:
-        """Get content from macOS clipboard using pbpaste"""
-        try:
-            result = subprocess.run(['pbpaste'], capture_output=True, text=True)
-            return result.stdout
-        except Exception as e:
-            self.log_message(f"Error reading clipboard: {e}", "error")
-            return ""
-    
     def refresh_clipboard(self):
-        """Manually refresh clipboard content"""
-        content = self.get_clipboard_content()
-        self.update_clipboard_display(content)
+        """Manually refresh clipboard content (read in the worker; the display updates when it answers)"""
+        self.clipboard.read(self.update_clipboard_display)
     
-    def update_clipboard_display(self, content: str):
-        """Update the clipboard display area"""
+    def on_clipboard_change(self, snapshot: ClipboardSnapshot):
+        """Clipboard change reported by the worker while auto-monitor is on"""
+        self.update_clipboard_display(snapshot)
+    
+    def update_clipboard_display(self, snapshot: ClipboardSnapshot):
+        """Update the clipboard display area, skipping the re-render when the content hash is unchanged"""
+        if snapshot.digest == self.last_clipboard_digest:
+            return
+        
         self.clipboard_text.config(state=tk.NORMAL)
         self.clipboard_text.delete(1.0, tk.END)
-        self.clipboard_text.insert(1.0, content)
+        self.clipboard_text.insert(1.0, snapshot.text)
         self.clipboard_text.config(state=tk.DISABLED)
-        self.last_clipboard_content = content
-    
-    def start_clipboard_monitoring(self):
-        """Start monitoring clipboard for changes"""
-        def monitor():
-            while True:
-                if self.auto_monitor_var.get():
-                    content = self.get_clipboard_content()
-                    if content != self.last_clipboard_content and content.strip():
-                        self.root.after(0, lambda c=content: self.update_clipboard_display(c))
-                time.sleep(1)
+        self.last_clipboard_content = snapshot.text
+        self.last_clipboard_digest = snapshot.digest
         
-        threading.Thread(target=monitor, daemon=True).start()
+        if snapshot.truncated:
+            self.clipboard_size_label.config(
+                text=f"Showing first {self.max_clipboard_bytes // 1024:,} KB of {snapshot.size // 1024:,} KB")
+        else:
+            self.clipboard_size_label.config(text="")
+        self.prefetch_clipboard(snapshot.text.strip())
     
     def toggle_clipboard_monitoring(self):
         """Toggle clipboard monitoring on/off"""
+        self.clipboard.set_monitoring(self.auto_monitor_var.get())
         if self.auto_monitor_var.get():
             self.refresh_clipboard()
     
@@ -491,53 +763,401 @@ class EnhancedClipboardOllamaApp:
             messagebox.showerror("Error", "No model selected.")
             return
         
-        # Disable send button during processing
-        self.send_btn.config(state=tk.DISABLED, text="⏳ Processing...")
+        prompt = self.render_prompt(content, model)
+        if prompt is None:
+            return
+        model = prompt.model
+        options = prompt.options or None
         
-        def process():
+        conversation = self.conversation_var.get()
+        if conversation:
+            self.session.system_prompt = prompt.system
+            messages = self.session.build_messages(prompt.user)
+        else:
+            messages = prompt.messages
+        request_key = ResponseCache.make_key(model, messages, options)
+        # Oversized one-off requests become concurrent per-chunk requests
+        chunked = not conversation and estimate_tokens(content) > self.chunk_tokens
+        # Rewrites are rendered as a word diff against the input
+        original = content if self.changes_var.get() and prompt.template.rewrite else None
+        # Only requests fully determined by model, action and text are indexed as similar prompts
+        similar_action = prompt.action if not conversation and not prompt.params else None
+        
+        # Serve identical requests straight from the cache
+        cache_key = None
+        if self.cache_var.get():
+            cache_key = request_key
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                self.show_cached_response(model, content, cached, original, similar_action)
+                if conversation:
+                    self.session.record(prompt.user, cached)
+                return
+        
+        # Offer the response to a near-identical earlier prompt; sending the same text again generates.
+        # A stored answer, so it is off along with the response cache.
+        if (similar_action is not None and self.cache_var.get() and self.similar_var.get()
+                and content != self.offered_similar):
+            match = self.similar_prompts.lookup(model, similar_action, content)
+            if match is not None:
+                self.offered_similar = content
+                self.prefetcher.cancel_all()  # Nothing will take over a prefetch of this request
+                self.show_similar_response(model, match, original)
+                return
+        self.offered_similar = None
+        
+        stream = self.stream_var.get()
+        
+        # A prefetch of this exact request may already be generating (other prefetches stop here)
+        speculative = self.prefetcher.take(request_key)
+        
+        def process(handle: RequestHandle):
+            trace = RequestTrace(model, stream, queue_wait=handle.wait_time or 0.0)
+            start_time = trace.started_at
+            if speculative is not None:
+                handle.on_cancel(speculative.close)
             try:
-                messages = [{"role": "user", "content": content}]
-                
-                payload = {
-                    "model": model,
-                    "messages": messages,
-                    "stream": False
-                }
+                timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                 
-                response = requests.post(
-                    f"{self.ollama_url}/api/chat",
-                    json=payload,
-                    headers={"Content-Type": "application/json"},
-                    timeout=60
-                )
+                request_messages = messages
+                if chunked:
+                    request_messages, response_content = self.map_chunks(handle, content, prompt, model, options)
                 
-                if response.status_code == 200:
-                    data = response.json()
-                    response_content = data["message"]["content"]
-                    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    
-                    # Display response
+                if request_messages is None:
+                    # Chunk results were concatenated; there is no final request
+                    trace.finish(response_chars=len(response_content))
+                    self.root.after(0, lambda: self.response_time_label.config(
+                        text=f"{time.time() - start_time:.1f}s total · processed in chunks"))
+                    self.show_response(trace, f"[{timestamp}] Response from {model}:",
+                                       response_content, original)
+                elif stream:
+                    if speculative is not None:
+                        chunks = speculative
+                    else:
+                        chunks = self.client.chat_stream(model, request_messages, options,
+                                                         keep_alive=self.model_manager.keep_alive)
+                    handle.on_cancel(chunks.close)
                     self.root.after(0, lambda: self.display_response(
-                        f"[{timestamp}] Response from {model}:\n\n{response_content}",
-                        "success"
-                    ))
+                        f"[{timestamp}] Response from {model}:", "success"))
+                    response_content, stats = self.stream_response(chunks, trace, original)
+                    self.root.after(0, trace.timed(self.append_response), "\n\n")
+                    
+                    if handle.cancelled:
+                        trace.finish(trace.ollama, len(response_content), status="cancelled")
+                        self.root.after(0, lambda: self.record_metrics(trace))
+                        self.root.after(0, lambda: self.log_message("⏹ Generation cancelled", "info"))
+                        return
                     
-                    # Add to history
-                    self.root.after(0, lambda: self.add_to_history(content, response_content))
+                    elapsed = time.time() - start_time
+                    self.root.after(0, lambda: self.response_time_label.config(
+                        text=f"{elapsed:.1f}s total · first token {stats['ttft']:.2f}s · "
+                             f"{stats['tokens_per_sec']:.1f} tok/s · load {stats['load']:.1f}s"))
                 else:
-                    error_msg = f"API Error: HTTP {response.status_code}"
-                    self.root.after(0, lambda: self.display_response(error_msg, "error"))
+                    if speculative is not None:
+                        data = speculative.result()
+                    else:
+                        # Streamed and collected, so Cancel can close the connection and stop Ollama
+                        chunks = self.client.chat_stream(model, request_messages, options,
+                                                         keep_alive=self.model_manager.keep_alive)
+                        handle.on_cancel(chunks.close)
+                        data = collect_chat(chunks)
+                    response_content = data["message"]["content"]
+                    if handle.cancelled:
+                        trace.finish(data, len(response_content), status="cancelled")
+                        self.root.after(0, lambda: self.record_metrics(trace))
+                        self.root.after(0, lambda: self.log_message("⏹ Generation cancelled", "info"))
+                        return
+                    trace.finish(data, len(response_content))
+                    
+                    timings = split_durations(data)
+                    self.root.after(0, lambda: self.response_time_label.config(
+                        text=f"{time.time() - start_time:.1f}s total · load {timings['load']:.1f}s · "
+                             f"generation {timings['generation']:.1f}s"))
                     
-            except requests.exceptions.RequestException as e:
-                error_msg = f"Network Error: {str(e)}"
-                self.root.after(0, lambda: self.display_response(error_msg, "error"))
+                    # Display response
+                    self.show_response(trace, f"[{timestamp}] Response from {model}:",
+                                       response_content, original)
+                
+                if cache_key:
+                    self.response_cache.put(cache_key, model, response_content)
+                if conversation:
+                    prompt_eval_count = trace.ollama.get("prompt_eval_count")
+                    self.root.after(0, lambda: self.session.record(prompt.user, response_content, prompt_eval_count))
+                
+                # Add to history
+                self.add_to_history(model, content, response_content, time.time() - start_time, similar_action)
+                # Queued behind the render callbacks, so render time is complete when this runs
+                self.root.after(0, lambda: self.record_metrics(trace))
+                
+            except OllamaHTTPError as e:
+                if not handle.cancelled:
+                    error_msg = f"API Error: HTTP {e.status_code}"
+                    self.fail_request(trace, error_msg)
+            except OllamaConnectionError as e:
+                self.health.poke()  # Show the outage in the status bar right away
+                if not handle.cancelled:
+                    error_msg = f"Network Error: {str(e)}"
+                    self.fail_request(trace, error_msg)
             except Exception as e:
-                error_msg = f"Unexpected Error: {str(e)}"
-                self.root.after(0, lambda: self.display_response(error_msg, "error"))
+                if not handle.cancelled:
+                    error_msg = f"Unexpected Error: {str(e)}"
+                    self.fail_request(trace, error_msg)
             finally:
                 self.root.after(0, lambda: self.send_btn.config(state=tk.NORMAL, text="🚀 Send to Ollama"))
+                self.root.after(0, lambda: self.cancel_btn.config(state=tk.DISABLED))
+                self.root.after(0, self.update_queue_status)
+        
+        handle = self.scheduler.submit(process, model, key=request_key)
+        if handle is self.current_request and handle.coalesced:
+            if speculative is not None:
+                speculative.cancel()
+            self.log_message("Already processing this content", "info")
+            return
+        self.current_request = handle
         
-        threading.Thread(target=process, daemon=True).start()
+        # Disable send button during processing
+        self.send_btn.config(state=tk.DISABLED, text="⏳ Processing...")
+        self.cancel_btn.config(state=tk.NORMAL)
+        self.update_queue_status()
+        
+        if stream:
+            self.response_time_label.config(text="Waiting for first token...")
+    
+    def routed_model(self) -> str:
+        """Model that answers the selected action (the selected model if the action has none)"""
+        return self.templates.route(self.action_var.get(), self.model_var.get(),
+                                    self.available_models or None)
+    
+    def render_prompt(self, content: str, model: str) -> Optional[RenderedPrompt]:
+        """Apply the selected action's template to content; None if the user backs out"""
+        params = {}
+        if self.action_var.get() == "custom":
+            instruction = simpledialog.askstring("Custom instruction", "What should Ollama do with the text?",
+                                                 parent=self.root)
+            if not instruction:
+                return None
+            params["instruction"] = instruction
+        try:
+            return self.templates.render(self.action_var.get(), content, model,
+                                         self.available_models or None, **params)
+        except TemplateError as e:
+            messagebox.showerror("Error", str(e))
+            return None
+    
+    def map_chunks(self, handle: RequestHandle, content: str, prompt: RenderedPrompt, model: str,
+                   options: Optional[Dict[str, Any]]):
+        """Run the action over each chunk of oversized content (called from the worker)
+        
+        Returns the messages of the final reduce request, or None and the chunk
+        results joined in order when the action has no reduce step.
+        """
+        pieces = split_text(content, self.chunk_tokens)
+        pipeline = ChunkPipeline(self.client, model, options, self.model_manager.keep_alive,
+                                 chunk_tokens=self.chunk_tokens, max_workers=self.chunk_workers)
+        handle.on_cancel(pipeline.cancel)
+        self.root.after(0, lambda: self.log_message(
+            f"Input is ~{estimate_tokens(content)} tokens; processing {len(pieces)} chunks "
+            f"({self.chunk_workers} at a time)", "info"))
+        
+        def on_progress(progress: ChunkProgress):
+            if progress.error:
+                message, tag = f"❌ Chunk {progress.index + 1}/{progress.total} failed: {progress.error}", "error"
+            else:
+                message, tag = (f"Chunk {progress.index + 1} done · {progress.completed}/{progress.total} "
+                                f"after {progress.elapsed:.1f}s"), "info"
+            self.root.after(0, lambda: self.log_message(message, tag))
+        
+        parts = pipeline.map(pieces, prompt.messages_for, on_progress)
+        if prompt.template is None or prompt.template.reduce is None:
+            return None, "\n\n".join(parts)
+        
+        self.root.after(0, lambda: self.log_message("Merging chunk results...", "info"))
+        return pipeline.reduce_messages(parts, prompt.template.reduce, prompt.system, on_progress), None
+    
+    def fail_request(self, trace: RequestTrace, error_msg: str):
+        """Show a request error and record it in the metrics (called from the worker)"""
+        trace.finish(status="error", error=error_msg)
+        self.root.after(0, lambda: self.display_response(error_msg, "error"))
+        self.root.after(0, lambda: self.record_metrics(trace))
+    
+    def record_metrics(self, trace: RequestTrace):
+        """Write a finished request's metrics and refresh the stats tab"""
+        self.metrics.record(trace)
+        self.refresh_stats()
+    
+    def refresh_stats(self):
+        """Redraw the per-model statistics table"""
+        if not self.tab_built(self.stats_frame):
+            return
+        self.stats_tree.delete(*self.stats_tree.get_children())
+        for model, s in sorted(self.metrics.summary().items()):
+            self.stats_tree.insert("", tk.END, values=(
+                model, s["ok"], s["error"], s["cached"],
+                f"{s['total_p50']:.2f}s", f"{s['total_p95']:.2f}s",
+                f"{s['ttft_p50']:.2f}s", f"{s['ttft_p95']:.2f}s",
+                f"{s['queue_wait_p95']:.2f}s", f"{s['network_p50']:.2f}s",
+                f"{s['render_p50'] * 1000:.0f}ms", f"{s['load_p50']:.2f}s",
+                f"{s['tokens_per_sec']:.1f}"))
+        
+        scheduler = self.scheduler.metrics()
+        self.scheduler_stats_label.config(
+            text=f"Queue: {scheduler['queue_depth']} waiting · {scheduler['in_flight']} running · "
+                 f"wait p95 {scheduler['wait_p95']:.2f}s · completed {scheduler['completed']}, "
+                 f"failed {scheduler['failed']}, cancelled {scheduler['cancelled']}")
+        prefetch = self.prefetcher.stats()
+        self.prefetch_stats_label.config(
+            text=f"Prefetch: {prefetch['started']} started · {prefetch['used']} used · "
+                 f"{prefetch['discarded']} discarded · {prefetch['skipped']} skipped (limit reached)")
+        similar = self.similar_prompts.stats()
+        self.similar_stats_label.config(
+            text=f"Similar prompts: {similar['entries']} indexed ({similar['bytes'] // 1024:,} KB) · "
+                 f"{similar['hits']} offered · {similar['misses']} not found")
+        stalls = self.stall_monitor.summary()
+        self.ui_stats_label.config(
+            text=f"UI thread: timer late p50 {stalls['p50_ms']:.0f}ms · p99 {stalls['p99_ms']:.0f}ms · "
+                 f"worst {stalls['max_ms']:.0f}ms · clipboard worker: {self.clipboard.backend_name or 'starting'}"
+                 f"{'' if self.clipboard.isolated else ' (in-process)'}")
+    
+    def prefetch_clipboard(self, content: str):
+        """Start generating a response for new clipboard content before Send is clicked"""
+        action = self.action_var.get()
+        if (not self.prefetch_var.get() or self.conversation_var.get() or action == "custom"
+                or not self.prefetcher.qualifies(content) or estimate_tokens(content) > self.chunk_tokens
+                or not self.is_content_from_allowed_domain(content)):
+            self.prefetcher.cancel_all()
+            return
+        
+        prompt = self.templates.render(action, content, self.model_var.get(), self.available_models or None)
+        options = prompt.options or None
+        key = ResponseCache.make_key(prompt.model, prompt.messages, options)
+        if self.cache_var.get() and self.response_cache.contains(key):
+            self.prefetcher.cancel_all()
+            return
+        self.prefetcher.start(key, prompt.model, prompt.messages, options)
+    
+    def cancel_request(self):
+        """Cancel the current generation; closing the stream makes Ollama stop computing"""
+        if self.current_request and not self.current_request.done:
+            self.current_request.cancel()
+            self.send_btn.config(state=tk.NORMAL, text="🚀 Send to Ollama")
+            self.cancel_btn.config(state=tk.DISABLED)
+    
+    def update_queue_status(self):
+        """Show scheduler queue depth and wait times next to the response"""
+        metrics = self.scheduler.metrics()
+        if metrics["queue_depth"]:
+            self.response_time_label.config(
+                text=f"Queued: {metrics['queue_depth']} waiting · {metrics['in_flight']} running · "
+                     f"wait p95 {metrics['wait_p95']:.1f}s")
+    
+    def show_cached_response(self, model: str, content: str, response_content: str,
+                             original: Optional[str] = None, action: Optional[str] = None):
+        """Display a cache hit immediately (as changes to original, if given)"""
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        stats = self.response_cache.stats()
+        
+        header = f"[{timestamp}] Cached response from {model}:"
+        if original is not None:
+            self.display_diff(header, diff_words(original, response_content))
+        else:
+            self.display_response(f"{header}\n\n{response_content}", "success")
+        self.response_time_label.config(
+            text=f"Served from cache · hits {stats['hits']} / misses {stats['misses']}")
+        trace = RequestTrace(model, stream=False, cached=True)
+        trace.finish(response_chars=len(response_content))
+        self.record_metrics(trace)
+        self.add_to_history(model, content, response_content, action=action)
+    
+    def show_similar_response(self, model: str, match: SimilarMatch, original: Optional[str] = None):
+        """Display the earlier response to a near-identical prompt (as changes to original, if given)"""
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        asked = datetime.fromtimestamp(match.created_at).strftime("%Y-%m-%d %H:%M")
+        header = f"[{timestamp}] Earlier response from {model} to similar text ({asked}):"
+        if original is not None:
+            self.display_diff(header, diff_words(original, match.response))
+        else:
+            self.display_response(f"{header}\n\n{match.response}", "success")
+        self.response_time_label.config(
+            text=f"{match.similarity:.0%} similar to an earlier prompt · Send again for a fresh response")
+        trace = RequestTrace(model, stream=False, cached=True)
+        trace.finish(response_chars=len(match.response))
+        self.record_metrics(trace)
+    
+    def new_conversation(self):
+        """Forget the earlier turns of the conversation"""
+        self.session.reset()
+        self.log_message("Started a new conversation", "info")
+    
+    def clear_response_cache(self):
+        """Remove every cached response"""
+        self.response_cache.clear()
+        messagebox.showinfo("Success", "Response cache cleared")
+    
+    def stream_response(self, chunks, trace: RequestTrace, original: Optional[str] = None):
+        """Append streamed chat chunks to the response area in batches
+        
+        With original, each batch is diffed against it here on the worker thread and only
+        the settled changes are handed to the UI.
+        """
+        start_time = trace.started_at
+        parts = []
+        pending = []
+        token_count = 0
+        first_token_time = None
+        last_flush = start_time
+        final_chunk: Dict[str, Any] = {}
+        differ = StreamingDiff(original) if original is not None else None
+        
+        def flush(now: float):
+            text = "".join(pending)
+            pending.clear()
+            ttft = first_token_time - start_time
+            tokens_per_sec = token_count / max(now - first_token_time, 1e-6)
+            if differ is not None:
+                self.root.after(0, trace.timed(self.append_diff), differ.feed(text))
+            else:
+                self.root.after(0, trace.timed(self.append_response), text)
+            self.root.after(0, lambda: self.response_time_label.config(
+                text=f"First token {ttft:.2f}s · {tokens_per_sec:.1f} tok/s"))
+        
+        for chunk in chunks:
+            token = chunk.get("message", {}).get("content", "")
+            if token:
+                now = time.time()
+                if first_token_time is None:
+                    first_token_time = now
+                    trace.mark_first_token()
+                parts.append(token)
+                pending.append(token)
+                token_count += 1
+                if now - last_flush >= self.stream_flush_interval:
+                    flush(now)
+                    last_flush = now
+            
+            if chunk.get("done"):
+                final_chunk = chunk
+                break
+        
+        if first_token_time is None:
+            first_token_time = time.time()
+        if pending:
+            flush(time.time())
+        if differ is not None:
+            self.root.after(0, trace.timed(self.append_diff), differ.finish())
+        trace.finish(final_chunk, sum(len(part) for part in parts))
+        
+        # Prefer Ollama's own generation counters over our chunk count
+        if final_chunk.get("eval_count") and final_chunk.get("eval_duration"):
+            tokens_per_sec = final_chunk["eval_count"] / (final_chunk["eval_duration"] / 1e9)
+        else:
+            tokens_per_sec = token_count / max(time.time() - first_token_time, 1e-6)
+        
+        stats = {
+            "ttft": first_token_time - start_time,
+            "tokens_per_sec": tokens_per_sec,
+            **split_durations(final_chunk),
+        }
+        return "".join(parts), stats
     
     def get_current_clipboard_content(self) -> str:
         """Get current content from clipboard display"""
@@ -548,22 +1168,62 @@ class EnhancedClipboardOllamaApp:
     
     def display_response(self, message: str, tag: str = "info"):
         """Display response in the response text area"""
-        self.response_text.config(state=tk.NORMAL)
-        self.response_text.insert(tk.END, message + "\n\n")
-        self.response_text.see(tk.END)
-        self.response_text.config(state=tk.DISABLED)
+        self.response_view.add(message + "\n\n", tag)
+    
+    def append_response(self, text: str):
+        """Append a streamed chunk to the response text area"""
+        self.response_view.append(text)
+    
+    def show_response(self, trace: RequestTrace, header: str, response_content: str, original: Optional[str]):
+        """Queue a complete response for display (from a worker thread); rewrites are diffed here"""
+        if original is not None:
+            self.root.after(0, trace.timed(self.display_diff), header, diff_words(original, response_content))
+        else:
+            self.root.after(0, trace.timed(self.display_response), f"{header}\n\n{response_content}", "success")
+    
+    def display_diff(self, header: str, segments: List[Tuple[str, str]]):
+        """Display a response as changes to its input"""
+        self.response_view.add(header + "\n\n", "success")
+        self.append_diff(segments)
+        self.response_view.append("\n\n")
+    
+    def append_diff(self, segments: List[Tuple[str, str]]):
+        """Append diff segments; only the changed spans get a tag"""
+        for tag, text in segments:
+            self.response_view.append(text, self.diff_tags.get(tag))
     
     def clear_response(self):
         """Clear the response text area"""
-        self.response_text.config(state=tk.NORMAL)
-        self.response_text.delete(1.0, tk.END)
-        self.response_text.config(state=tk.DISABLED)
+        self.response_view.clear()
+        self.response_time_label.config(text="")
     
     def log_message(self, message: str, tag: str = "info"):
         """Log a message to the response area"""
         timestamp = datetime.now().strftime("%H:%M:%S")
         self.display_response(f"[{timestamp}] {message}", tag)
     
+    def start_clipboard_service(self):
+        """Start the clipboard worker and show the current clipboard once it has been read"""
+        self.clipboard.start(monitoring=self.auto_monitor_var.get(), hotkey_enabled=self.hotkey_enabled)
+        self.clipboard.read(self.update_clipboard_display)
+    
+    def start_background_init(self):
+        """Run the slow parts of startup concurrently once the window is on screen"""
+        self.model_manager.start_polling(
+            lambda models: self.root.after(0, lambda: self.update_resident_models(models)))
+        self.start_clipboard_service()
+        profiler.run_concurrently({
+            "probe_ollama": self.probe_ollama,
+            "load_domains": self.load_domains,
+            "load_similar_prompts": self.load_similar_prompts,
+        }, on_done=lambda: self.root.after(0, self.on_startup_done))
+    
+    def on_startup_done(self):
+        """Print the --profile-startup report once every startup task has finished"""
+        profiler.mark("background init done")
+        if profiler.enabled:
+            print(profiler.report())
+    
     def run(self):
         """Start the application"""
         # Center the window
@@ -574,16 +1234,26 @@ class EnhancedClipboardOllamaApp:
         y = (self.root.winfo_screenheight() // 2) - (height // 2)
         self.root.geometry(f'{width}x{height}+{x}+{y}')
         
-        # Initial clipboard refresh
-        self.refresh_clipboard()
+        # Paint the window before anything touches the clipboard, network or hotkeys
+        self.root.update()
+        profiler.mark("first paint")
+        self.start_background_init()
+        self.stall_monitor.start()
+        self.root.after(0, lambda: profiler.mark("interactive"))
         
         # Start the main loop
         self.root.mainloop()
+        
+        self.clipboard.stop()
+        
+        # Write out any interactions still queued for the history database
+        self.history_store.close()
 
 def main():
     """Main entry point"""
     try:
-        app = EnhancedClipboardOllamaApp()
+        with profiler.phase("construct app"):
+            app = EnhancedClipboardOllamaApp()
         app.run()
     except KeyboardInterrupt:
         print("\nApplication terminated by user")
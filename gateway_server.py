@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+Local FastAPI gateway in front of Ollama
+Speaks the Ollama API (/api/chat, /api/tags, /api/ps) so the desktop apps and the
+browser extension can point at it instead of localhost:11434, and adds:
+- One warm pooled connection to Ollama shared by every client
+- A shared response cache
+- Bounded concurrency per model and de-duplication of identical in-flight requests
+- Prompt templates with per-action model routing (send "action" instead of a full prompt)
+- /metrics and /health endpoints
+
+    python3 gateway_server.py            # serves on http://127.0.0.1:11435
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import uvicorn
+from fastapi import FastAPI, HTTPException
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+from pydantic import BaseModel, ConfigDict
+
+from backend_pool import BackendPool, configured_urls, get_backend
+from ollama_client import OllamaError, OllamaHTTPError, OllamaUnavailableError
+from prompt_templates import TemplateError, get_registry
+from request_scheduler import RequestCancelled, RequestHandle, RequestScheduler
+from response_cache import ResponseCache
+
+GATEWAY_HOST = os.environ.get("GATEWAY_HOST", "127.0.0.1")
+GATEWAY_PORT = int(os.environ.get("GATEWAY_PORT", "11435"))
+UPSTREAM_URLS = configured_urls()  # OLLAMA_URLS=url1,url2 balances over several hosts
+# Browser origins allowed to call the gateway: Substack pages (where the extension's content
+# script runs) and, when GATEWAY_EXTENSION_ID is set, the extension's own pages
+EXTENSION_ID = os.environ.get("GATEWAY_EXTENSION_ID", "")
+ALLOWED_ORIGINS = [f"chrome-extension://{EXTENSION_ID}"] if EXTENSION_ID else []
+ALLOWED_ORIGIN_REGEX = r"https://([a-z0-9-]+\.)*substack\.com"
+
+DEFAULT_MODEL = "gemma3:1b"  # Answers action requests without a model whose own model is not installed
+MODEL_LIST_TTL = 60.0  # Seconds the installed model list is reused for routing
+
+# Request body fields that do not change the generated text
+NON_SEMANTIC_FIELDS = ("model", "messages", "stream", "keep_alive")
+
+
+class ChatRequest(BaseModel):
+    """Ollama /api/chat request body; unknown fields are passed through"""
+
+    model_config = ConfigDict(extra="allow")
+
+    model: Optional[str] = None  # Optional when action routes to a model
+    messages: List[Dict[str, Any]]
+    stream: bool = True
+    options: Optional[Dict[str, Any]] = None
+    keep_alive: Optional[Any] = None
+    # Gateway extensions: render the last user message through a prompt template
+    action: Optional[str] = None
+    instruction: Optional[str] = None
+
+
+class StreamFanout:
+    """Buffers the chunks of one upstream stream and replays them to every subscriber"""
+
+    def __init__(self):
+        self.chunks: List[Dict[str, Any]] = []
+        self.finished = False
+        self.subscribers = 0
+        self.handle: Optional[RequestHandle] = None
+        self._cond = threading.Condition()
+
+    def publish(self, chunk: Dict[str, Any]):
+        with self._cond:
+            self.chunks.append(chunk)
+            self._cond.notify_all()
+
+    def finish(self, error: Optional[str] = None):
+        with self._cond:
+            if error is not None:
+                self.chunks.append({"error": error})
+            self.finished = True
+            self._cond.notify_all()
+
+    def subscribe(self) -> Iterator[Dict[str, Any]]:
+        index = 0
+        while True:
+            with self._cond:
+                while index >= len(self.chunks) and not self.finished:
+                    self._cond.wait(1.0)
+                if index >= len(self.chunks):
+                    return
+                pending = self.chunks[index:]
+            index += len(pending)
+            yield from pending
+
+
+class Gateway:
+    """Shared state behind the HTTP endpoints"""
+
+    def __init__(self, upstream_urls: List[str] = UPSTREAM_URLS, max_workers: int = 8, per_model_limit: int = 2):
+        self.client = get_backend(upstream_urls)
+        self.templates = get_registry()
+        self.cache = ResponseCache()
+        self.scheduler = RequestScheduler(max_workers=max_workers, per_model_limit=per_model_limit)
+        self.started_at = time.time()
+        self.requests = {"chat": 0, "chat_stream": 0, "cache_hits": 0, "deduplicated": 0, "templated": 0,
+                         "preloads": 0}
+        self._fanouts: Dict[str, StreamFanout] = {}
+        self._models: Optional[List[str]] = None
+        self._models_at = 0.0
+        self._lock = threading.Lock()
+
+    def installed_models(self) -> Optional[List[str]]:
+        """Model names from /api/tags, cached for MODEL_LIST_TTL; the last known list (or None) if Ollama is down"""
+        with self._lock:
+            if self._models is not None and time.time() - self._models_at < MODEL_LIST_TTL:
+                return self._models
+        try:
+            models = self.client.model_names()
+        except OllamaError:
+            return self._models
+        self.remember_models(models)
+        return models
+
+    def remember_models(self, models: List[str]):
+        with self._lock:
+            self._models, self._models_at = models, time.time()
+
+    def apply_template(self, request: ChatRequest) -> ChatRequest:
+        """Turn an action request into a plain Ollama request (template, model and options)"""
+        if request.action is None:
+            if not request.model:
+                raise TemplateError("model is required when no action is given")
+            return request
+        if not request.messages or request.messages[-1].get("role") != "user":
+            raise TemplateError("action requests need the text as the last user message")
+
+        params = {"instruction": request.instruction} if request.instruction else {}
+        # The action's model unless it is not installed; then the request's model or DEFAULT_MODEL
+        prompt = self.templates.render(request.action, request.messages[-1]["content"],
+                                       request.model or DEFAULT_MODEL, self.installed_models(), **params)
+        history = request.messages[:-1]
+        messages = history + [{"role": "user", "content": prompt.user}] if history else prompt.messages
+        self.requests["templated"] += 1
+        return request.model_copy(update={
+            "model": prompt.model,
+            "messages": messages,
+            "options": {**prompt.options, **(request.options or {})} or None,
+            "action": None,
+            "instruction": None,
+        })
+
+    @staticmethod
+    def request_key(request: ChatRequest) -> str:
+        body = request.model_dump(exclude_none=True)
+        extra = {k: v for k, v in body.items() if k not in NON_SEMANTIC_FIELDS}
+        return ResponseCache.make_key(request.model, request.messages, extra)
+
+    @staticmethod
+    def upstream_extra(request: ChatRequest) -> Dict[str, Any]:
+        body = request.model_dump(exclude_none=True)
+        return {k: v for k, v in body.items() if k not in ("model", "messages", "stream", "options")}
+
+    def preload(self, request: ChatRequest) -> Dict[str, Any]:
+        """A request with no messages loads the model or refreshes its keep_alive: always sent upstream
+
+        Never cached or merged with other requests, or only the first warm-up would reach Ollama.
+        """
+        self.requests["preloads"] += 1
+        return self.client.load(request.model, keep_alive=request.keep_alive)
+
+    def chat(self, request: ChatRequest) -> Dict[str, Any]:
+        """Non-streaming chat: cache, then a de-duplicated scheduled request"""
+        self.requests["chat"] += 1
+        key = self.request_key(request)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.requests["cache_hits"] += 1
+            return self.cached_reply(request.model, cached)
+
+        def job(handle: RequestHandle) -> Dict[str, Any]:
+            data = self.client.chat(request.model, request.messages, request.options,
+                                    **self.upstream_extra(request))
+            self.cache.put(key, request.model, data["message"]["content"])
+            return data
+
+        handle = self.scheduler.submit(job, request.model, key=key)
+        if handle.coalesced:
+            self.requests["deduplicated"] += 1
+        return handle.result()
+
+    def open_stream(self, request: ChatRequest) -> Tuple[Iterator[Dict[str, Any]], Callable[[], None]]:
+        """Streaming chat: identical concurrent streams share one upstream generation
+
+        Returns the chunk iterator and a release callback to run when the client goes away.
+        """
+        self.requests["chat_stream"] += 1
+        key = self.request_key(request)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.requests["cache_hits"] += 1
+            reply = self.cached_reply(request.model, cached)
+            chunks = [
+                {"model": request.model, "created_at": reply["created_at"],
+                 "message": reply["message"], "done": False},
+                {**reply, "message": {"role": "assistant", "content": ""}},
+            ]
+            return iter(chunks), lambda: None
+
+        with self._lock:
+            fanout = self._fanouts.get(key)
+            if fanout is None or fanout.finished:
+                fanout = self._fanouts[key] = StreamFanout()
+                fanout.handle = self.scheduler.submit(self.stream_job(request, key, fanout), request.model)
+            else:
+                self.requests["deduplicated"] += 1
+            fanout.subscribers += 1
+
+        def release():
+            # The last subscriber to disconnect stops the upstream generation
+            with self._lock:
+                fanout.subscribers -= 1
+                abandoned = fanout.subscribers == 0 and not fanout.finished
+            if abandoned:
+                fanout.handle.cancel()
+                fanout.finish()
+
+        return fanout.subscribe(), release
+
+    def stream_job(self, request: ChatRequest, key: str, fanout: StreamFanout):
+        """Build the scheduler job that feeds one upstream stream into fanout"""
+        def job(handle: RequestHandle):
+            parts = []
+            try:
+                stream = self.client.chat_stream(request.model, request.messages, request.options,
+                                                 **self.upstream_extra(request))
+                handle.on_cancel(stream.close)
+                for chunk in stream:
+                    parts.append(chunk.get("message", {}).get("content", ""))
+                    fanout.publish(chunk)
+                if not handle.cancelled:
+                    self.cache.put(key, request.model, "".join(parts))
+                fanout.finish()
+            except Exception as e:
+                fanout.finish(str(e))
+            finally:
+                with self._lock:
+                    if self._fanouts.get(key) is fanout:
+                        del self._fanouts[key]
+        return job
+
+    @staticmethod
+    def cached_reply(model: str, content: str) -> Dict[str, Any]:
+        return {
+            "model": model,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "message": {"role": "assistant", "content": content},
+            "done": True,
+            "done_reason": "stop",
+            "cached": True,
+        }
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "uptime": round(time.time() - self.started_at, 1),
+            "requests": dict(self.requests),
+            "scheduler": self.scheduler.metrics(),
+            "cache": self.cache.stats(),
+            **({"backends": self.client.stats()} if isinstance(self.client, BackendPool) else {}),
+        }
+
+
+app = FastAPI(title="Ollama Gateway")
+# Browsers may call the gateway only from Substack pages (where the extension's content script runs) and
+# the extension itself; other sites must not drive the model or read /metrics
+app.add_middleware(CORSMiddleware, allow_origins=ALLOWED_ORIGINS, allow_origin_regex=ALLOWED_ORIGIN_REGEX,
+                   allow_methods=["GET", "POST"], allow_headers=["Content-Type"])
+gateway = Gateway()
+
+
+def upstream_error(e: OllamaError) -> HTTPException:
+    if isinstance(e, OllamaHTTPError):
+        return HTTPException(status_code=e.status_code, detail=e.body or str(e))
+    if isinstance(e, OllamaUnavailableError):
+        return HTTPException(status_code=503, detail=str(e),
+                             headers={"Retry-After": str(max(1, round(e.retry_in)))})
+    return HTTPException(status_code=502, detail=str(e))
+
+
+@app.get("/health")
+def health():
+    return {"status": "ok"}
+
+
+@app.get("/metrics")
+def metrics():
+    return gateway.metrics()
+
+
+@app.get("/api/tags")
+def tags():
+    try:
+        models = gateway.client.tags()
+        gateway.remember_models([model["name"] for model in models])
+        return {"models": models}
+    except OllamaError as e:
+        raise upstream_error(e)
+
+
+@app.get("/api/ps")
+def ps():
+    try:
+        return {"models": gateway.client.ps()}
+    except OllamaError as e:
+        raise upstream_error(e)
+
+
+@app.get("/api/templates")
+def templates():
+    return {
+        "default_action": gateway.templates.default_action,
+        "actions": {name: {"label": t.label, "model": t.model, "options": t.options}
+                    for name, t in gateway.templates.templates.items()},
+    }
+
+
+@app.post("/api/chat")
+async def chat(request: ChatRequest):
+    try:
+        request = await run_in_threadpool(gateway.apply_template, request)
+    except TemplateError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Gateway calls block (cache lookups, upstream requests), so they run off the event loop;
+    # the stream is opened before the response starts so its errors get a proper status
+    try:
+        if not request.messages:
+            # Model preload or keep_alive refresh: answered with the one upstream reply, streamed or not
+            return await run_in_threadpool(gateway.preload, request)
+        if not request.stream:
+            return await run_in_threadpool(gateway.chat, request)
+        chunks, release = await run_in_threadpool(gateway.open_stream, request)
+    except RequestCancelled:
+        raise HTTPException(status_code=499, detail="Request cancelled")
+    except OllamaError as e:
+        raise upstream_error(e)
+
+    async def ndjson():
+        try:
+            async for chunk in iterate_in_threadpool(chunks):
+                yield json.dumps(chunk) + "\n"
+        finally:
+            release()
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
+def main():
+    print(f"🚀 Ollama gateway on http://{GATEWAY_HOST}:{GATEWAY_PORT} -> {', '.join(UPSTREAM_URLS)}")
+    uvicorn.run(app, host=GATEWAY_HOST, port=GATEWAY_PORT)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Persistent interaction history
+Prompts and responses are stored in SQLite with an FTS5 index over both, so the
+history survives restarts and can be searched. Writes are queued and committed in
+batches by a background thread; reads fetch one page of rows at a time. Each row also
+records the action that produced it, so recent() can rebuild the similar-prompt index.
+"""
+
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+DEFAULT_HISTORY_PATH = os.path.join("data", "history.db")
+
+# Characters of prompt/response returned with each page row
+PREVIEW_CHARS = 200
+
+HistoryRow = Dict[str, Any]
+
+
+def fts_query(text: str) -> str:
+    """Turn free text into an FTS5 query matching rows that contain every word (as a prefix)"""
+    return " ".join(f'"{word}"*' for word in re.findall(r"\w+", text))
+
+
+class HistoryStore:
+    """SQLite-backed interaction history with batched background writes"""
+
+    def __init__(self, path: str = DEFAULT_HISTORY_PATH, batch_size: int = 50,
+                 flush_interval: float = 0.5,
+                 on_flush: Optional[Callable[[int], None]] = None):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.on_flush = on_flush  # Called from the writer thread with the number of rows written
+
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS interactions (
+                id INTEGER PRIMARY KEY,
+                created_at REAL NOT NULL,
+                model TEXT NOT NULL,
+                prompt TEXT NOT NULL,
+                response TEXT NOT NULL,
+                elapsed REAL,
+                action TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_interactions_created ON interactions(created_at);
+        """)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(interactions)")}
+        if "action" not in columns:  # Databases written before actions were recorded
+            self._conn.execute("ALTER TABLE interactions ADD COLUMN action TEXT")
+        self.has_fts = self._create_fts()
+        self._conn.commit()
+
+        self._queue: "queue.Queue[Optional[Tuple]]" = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="history-writer", daemon=True)
+        self._writer.start()
+
+    def _create_fts(self) -> bool:
+        """Create the FTS5 index and its sync triggers; False if SQLite lacks FTS5"""
+        try:
+            self._conn.executescript("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS interactions_fts USING fts5(
+                    prompt, response, content='interactions', content_rowid='id'
+                );
+                CREATE TRIGGER IF NOT EXISTS interactions_ai AFTER INSERT ON interactions BEGIN
+                    INSERT INTO interactions_fts(rowid, prompt, response)
+                    VALUES (new.id, new.prompt, new.response);
+                END;
+                CREATE TRIGGER IF NOT EXISTS interactions_ad AFTER DELETE ON interactions BEGIN
+                    INSERT INTO interactions_fts(interactions_fts, rowid, prompt, response)
+                    VALUES ('delete', old.id, old.prompt, old.response);
+                END;
+            """)
+            return True
+        except sqlite3.OperationalError:
+            return False
+
+    def add(self, model: str, prompt: str, response: str, elapsed: Optional[float] = None,
+            action: Optional[str] = None):
+        """Queue an interaction for writing; never blocks on disk"""
+        self._queue.put((time.time(), model, prompt, response, elapsed, action))
+
+    def _write_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                return
+            batch = [item]
+            deadline = time.time() + self.flush_interval
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.time()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+
+            try:
+                with self._lock:
+                    self._conn.executemany(
+                        "INSERT INTO interactions (created_at, model, prompt, response, elapsed, action) "
+                        "VALUES (?, ?, ?, ?, ?, ?)", batch)
+                    self._conn.commit()
+                if self.on_flush:
+                    self.on_flush(len(batch))
+            except sqlite3.Error as e:
+                print(f"❌ History write error: {e}")
+            finally:
+                for _ in range(len(batch) + stop):
+                    self._queue.task_done()
+            if stop:
+                return
+
+    def flush(self):
+        """Block until every queued interaction has been written"""
+        self._queue.join()
+
+    def _where(self, search: Optional[str]) -> Tuple[str, Tuple]:
+        if not search or not fts_query(search):
+            return "", ()
+        if self.has_fts:
+            return ("WHERE id IN (SELECT rowid FROM interactions_fts WHERE interactions_fts MATCH ?)",
+                    (fts_query(search),))
+        pattern = f"%{search}%"
+        return "WHERE prompt LIKE ? OR response LIKE ?", (pattern, pattern)
+
+    def count(self, search: Optional[str] = None) -> int:
+        """Number of interactions, or of those matching search"""
+        where, params = self._where(search)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM interactions {where}", params).fetchone()[0]
+
+    def page(self, offset: int = 0, limit: int = 50, search: Optional[str] = None) -> List[HistoryRow]:
+        """One page of interactions, newest first, with truncated prompt/response previews"""
+        where, params = self._where(search)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, created_at, model, substr(prompt, 1, {PREVIEW_CHARS}), "
+                f"substr(response, 1, {PREVIEW_CHARS}), elapsed FROM interactions {where} "
+                f"ORDER BY id DESC LIMIT ? OFFSET ?", params + (limit, offset)
+            ).fetchall()
+        return [
+            {"id": r[0], "created_at": r[1], "model": r[2], "prompt": r[3], "response": r[4], "elapsed": r[5]}
+            for r in rows
+        ]
+
+    def get(self, interaction_id: int) -> Optional[HistoryRow]:
+        """Full prompt and response of one interaction"""
+        with self._lock:
+            r = self._conn.execute(
+                "SELECT id, created_at, model, prompt, response, elapsed FROM interactions WHERE id = ?",
+                (interaction_id,)
+            ).fetchone()
+        if r is None:
+            return None
+        return {"id": r[0], "created_at": r[1], "model": r[2], "prompt": r[3], "response": r[4], "elapsed": r[5]}
+
+    def recent(self, limit: int) -> List[HistoryRow]:
+        """Full rows of the newest limit interactions that have an action, oldest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, created_at, model, action, prompt, response FROM interactions "
+                "WHERE action IS NOT NULL ORDER BY id DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [
+            {"id": r[0], "created_at": r[1], "model": r[2], "action": r[3], "prompt": r[4], "response": r[5]}
+            for r in reversed(rows)
+        ]
+
+    def clear(self):
+        """Delete every stored interaction"""
+        self.flush()
+        with self._lock:
+            self._conn.execute("DELETE FROM interactions")
+            self._conn.commit()
+
+    def close(self):
+        """Write out pending interactions and close the database"""
+        self._queue.put(None)
+        self._writer.join()
+        with self._lock:
+            self._conn.close()
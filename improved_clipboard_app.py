@@ -4,15 +4,32 @@ Improved UI version of clipboard to Ollama app
 Better styling, layout, and user experience
 """
 
-import tkinter as tk
-from tkinter import messagebox, font
-import subprocess
-import requests
-import threading
-import time
-import logging
-import os
-from datetime import datetime
+from startup_profile import StartupProfiler
+
+profiler = StartupProfiler.from_argv()
+
+with profiler.track_imports():
+    import tkinter as tk
+    from tkinter import messagebox, simpledialog, font
+    import time
+    import logging
+    from datetime import datetime
+    from ollama_client import OllamaConnectionError, OllamaHTTPError, OllamaUnavailableError, collect_chat
+    from resilience import HealthProber
+    from backend_pool import get_app_client
+    from response_cache import ResponseCache
+    from request_scheduler import RequestScheduler
+    from model_manager import ModelManager, split_durations
+    from log_pipeline import LogPipeline
+    from text_views import VirtualTextView
+    from text_diff import StreamingDiff, diff_words
+    from request_metrics import MetricsRecorder, RequestTrace, StallMonitor, format_summary
+    from chat_session import ChatSession, estimate_tokens
+    from prompt_templates import TemplateError, get_registry
+    from chunk_pipeline import DEFAULT_CHUNK_TOKENS, ChunkPipeline, split_text
+    from speculative_prefetch import SpeculativePrefetcher
+    from clipboard_backends import DEFAULT_MAX_INGEST_BYTES
+    from clipboard_worker import create_clipboard_service
 
 class ImprovedClipboardApp:
     def __init__(self):
@@ -45,52 +62,61 @@ class ImprovedClipboardApp:
         }
         
         # Configuration
-        self.ollama_url = "http://localhost:11434"
+        # Gateway (probed on the first request, off the main thread) or a pool of OLLAMA_URLS hosts
+        self.client = get_app_client()
+        self.model_manager = ModelManager(self.client)
+        # Polls /api/tags every 15 s (every 3 s while Ollama is down) for the status line
+        self.ollama_healthy = False
+        self.health = HealthProber(self.client.model_names,
+                                   lambda models, error: self.root.after(0, lambda: self.on_health(models, error)))
+        self.templates = get_registry()
         self.default_model = "gemma3:1b"
         self.last_clipboard_content = ""
+        self.last_clipboard_digest = None
+        self.clipboard_snapshot = None
+        self.max_clipboard_bytes = DEFAULT_MAX_INGEST_BYTES  # Larger clipboards are truncated for display
+        # Clipboard reads and change watching run in a worker process, answered through an IPC queue
+        self.clipboard = create_clipboard_service(self.root, self.update_clipboard_display,
+                                                  max_bytes=self.max_clipboard_bytes,
+                                                  on_error=lambda message: print(f"❌ {message}"))
+        self.stall_monitor = StallMonitor(self.root)  # How long the Tk thread goes unresponsive
         self.available_models = []
         self.auto_monitor = True
+        self.stream_responses = True
+        self.stream_flush_interval = 0.05  # Seconds between response pane updates while streaming
+        self.show_changes = True  # Rewrite actions are shown as changes to the input
+        self.use_cache = True
+        self.response_cache = ResponseCache()
+        self.scheduler = RequestScheduler(max_workers=4, per_model_limit=1)
+        self.current_request = None
+        self.metrics = MetricsRecorder()
+        self.stats_window = None
+        self.keep_conversation = False
+        self.session = ChatSession(token_budget=4096)  # Earlier turns resent so Ollama reuses the prefix
+        self.chunk_tokens = DEFAULT_CHUNK_TOKENS  # Larger input is split and processed chunk by chunk
+        self.chunk_workers = 4
+        self.prefetch = False  # Opt-in: start generating as soon as the clipboard changes
+        self.prefetcher = SpeculativePrefetcher(self.client, max_jobs=2,
+                                                keep_alive=self.model_manager.keep_alive)
         
         # Setup logging
-        self.setup_logging()
-        
-        # Create UI
-        self.create_modern_ui()
+        with profiler.phase("setup_logging"):
+            self.setup_logging()
         
-        # Initial setup
-        self.check_ollama_status()
-        self.load_models()
-        self.refresh_clipboard()
-        
-        # Start monitoring
-        if self.auto_monitor:
-            self.start_monitoring()
+        # Create UI; the clipboard read and network checks wait for the first paint (see run)
+        with profiler.phase("create_modern_ui"):
+            self.create_modern_ui()
         
         print("✅ App ready!")
         
     def setup_logging(self):
-        """Setup comprehensive logging for responses and interactions"""
-        # Create logs directory if it doesn't exist
-        logs_dir = "logs"
-        if not os.path.exists(logs_dir):
-            os.makedirs(logs_dir)
-        
-        # Setup main logger
-        self.logger = logging.getLogger('ClipboardOllama')
-        self.logger.setLevel(logging.INFO)
+        """Setup comprehensive logging for responses and interactions
         
-        # Clear any existing handlers
-        self.logger.handlers.clear()
-        
-        # Create file handler for all logs
-        log_file = os.path.join(logs_dir, f"clipboard_ollama_{datetime.now().strftime('%Y%m%d')}.log")
-        file_handler = logging.FileHandler(log_file)
-        file_handler.setLevel(logging.INFO)
-        
-        # Create response-specific handler
-        response_file = os.path.join(logs_dir, f"ollama_responses_{datetime.now().strftime('%Y%m%d')}.log")
-        self.response_handler = logging.FileHandler(response_file)
-        self.response_handler.setLevel(logging.INFO)
+        Records are queued and written by a background listener, so the request path never
+        waits on disk. Files rotate daily or at 5 MB and old segments are gzipped.
+        """
+        logs_dir = "logs"
+        self.log_pipeline = LogPipeline(logs_dir)
         
         # Create formatters
         detailed_formatter = logging.Formatter(
@@ -103,21 +129,14 @@ class ImprovedClipboardApp:
             datefmt='%Y-%m-%d %H:%M:%S'
         )
         
-        # Set formatters
-        file_handler.setFormatter(detailed_formatter)
-        self.response_handler.setFormatter(response_formatter)
-        
-        # Add handlers
-        self.logger.addHandler(file_handler)
-        
-        # Create separate logger for responses
-        self.response_logger = logging.getLogger('OllamaResponses')
-        self.response_logger.setLevel(logging.INFO)
-        self.response_logger.handlers.clear()
-        self.response_logger.addHandler(self.response_handler)
+        # Main log, plus a separate log holding full prompts and responses
+        self.logger = self.log_pipeline.add_logger('ClipboardOllama', "clipboard_ollama.log", detailed_formatter)
+        self.response_logger = self.log_pipeline.add_logger('OllamaResponses', "ollama_responses.log", response_formatter)
+        self.log_pipeline.start()
         
         self.logger.info("=== Clipboard to Ollama App Started ===")
-        self.logger.info(f"Ollama URL: {self.ollama_url}")
+        self.logger.info(f"Ollama URL: {self.client.base_url}" + (
+            f" (falls back to {self.client.fallback_url})" if getattr(self.client, "fallback_url", None) else ""))
         self.logger.info(f"Default Model: {self.default_model}")
         print(f"📝 Logging enabled - logs saved to {logs_dir}/")
         
@@ -159,6 +178,19 @@ class ImprovedClipboardApp:
         model_frame = tk.Frame(header_frame, bg=self.colors['bg'])
         model_frame.pack(side=tk.RIGHT)
         
+        # Prompt template; each action may route to its own model
+        tk.Label(model_frame, text="Action:", font=self.header_font, 
+                fg=self.colors['text'], bg=self.colors['bg']).pack(side=tk.LEFT, padx=(0, 8))
+        
+        self.action_var = tk.StringVar(value=self.templates.default_action)
+        self.action_menu = tk.OptionMenu(model_frame, self.action_var, *self.templates.actions())
+        self.action_menu.config(
+            bg=self.colors['button'], fg=self.colors['text'], 
+            activebackground=self.colors['accent'], activeforeground='white',
+            highlightthickness=0, relief=tk.FLAT, font=self.body_font
+        )
+        self.action_menu.pack(side=tk.LEFT, padx=(0, 15))
+        
         tk.Label(model_frame, text="Model:", font=self.header_font, 
                 fg=self.colors['text'], bg=self.colors['bg']).pack(side=tk.LEFT, padx=(0, 8))
         
@@ -171,6 +203,10 @@ class ImprovedClipboardApp:
         )
         self.model_menu.pack(side=tk.LEFT)
         
+        # Preload whichever model gets selected
+        self.model_var.trace_add("write", lambda *args: self.preload_model(self.model_var.get()))
+        self.action_var.trace_add("write", lambda *args: self.preload_model(self.routed_model()))
+        
     def create_status_bar(self, parent):
         """Create status bar"""
         status_frame = tk.Frame(parent, bg=self.colors['card'], relief=tk.FLAT, bd=1)
@@ -188,6 +224,11 @@ class ImprovedClipboardApp:
                                    bg=self.colors['card'])
         self.status_label.pack(side=tk.LEFT, padx=(5, 0))
         
+        # Models currently resident in Ollama's memory
+        self.resident_label = tk.Label(status_container, text="", font=self.body_font,
+                                     fg=self.colors['text_secondary'], bg=self.colors['card'])
+        self.resident_label.pack(side=tk.LEFT, padx=(15, 0))
+        
         # Auto-monitor toggle on the right
         self.auto_var = tk.BooleanVar(value=self.auto_monitor)
         self.auto_check = tk.Checkbutton(status_container, text="Auto-monitor clipboard", 
@@ -199,6 +240,57 @@ class ImprovedClipboardApp:
                                        command=self.toggle_monitoring)
         self.auto_check.pack(side=tk.RIGHT)
         
+        # Streaming toggle next to auto-monitor
+        self.stream_var = tk.BooleanVar(value=self.stream_responses)
+        self.stream_check = tk.Checkbutton(status_container, text="Stream responses", 
+                                         variable=self.stream_var, font=self.body_font,
+                                         fg=self.colors['text'], bg=self.colors['card'],
+                                         selectcolor=self.colors['button'],
+                                         activebackground=self.colors['card'],
+                                         activeforeground=self.colors['text'])
+        self.stream_check.pack(side=tk.RIGHT, padx=(0, 15))
+        
+        # Diff toggle: rewrites are shown as insertions and deletions against the input
+        self.changes_var = tk.BooleanVar(value=self.show_changes)
+        self.changes_check = tk.Checkbutton(status_container, text="Show changes", 
+                                          variable=self.changes_var, font=self.body_font,
+                                          fg=self.colors['text'], bg=self.colors['card'],
+                                          selectcolor=self.colors['button'],
+                                          activebackground=self.colors['card'],
+                                          activeforeground=self.colors['text'])
+        self.changes_check.pack(side=tk.RIGHT, padx=(0, 15))
+        
+        # Response cache toggle (uncheck to bypass the cache)
+        self.cache_var = tk.BooleanVar(value=self.use_cache)
+        self.cache_check = tk.Checkbutton(status_container, text="Use cache", 
+                                        variable=self.cache_var, font=self.body_font,
+                                        fg=self.colors['text'], bg=self.colors['card'],
+                                        selectcolor=self.colors['button'],
+                                        activebackground=self.colors['card'],
+                                        activeforeground=self.colors['text'])
+        self.cache_check.pack(side=tk.RIGHT, padx=(0, 15))
+        
+        # Conversation toggle: follow-ups include the earlier turns
+        self.conversation_var = tk.BooleanVar(value=self.keep_conversation)
+        self.conversation_check = tk.Checkbutton(status_container, text="Keep conversation", 
+                                               variable=self.conversation_var, font=self.body_font,
+                                               fg=self.colors['text'], bg=self.colors['card'],
+                                               selectcolor=self.colors['button'],
+                                               activebackground=self.colors['card'],
+                                               activeforeground=self.colors['text'])
+        self.conversation_check.pack(side=tk.RIGHT, padx=(0, 15))
+        
+        # Speculative prefetch toggle: generate before Send is clicked
+        self.prefetch_var = tk.BooleanVar(value=self.prefetch)
+        self.prefetch_check = tk.Checkbutton(status_container, text="Prefetch", 
+                                           variable=self.prefetch_var, font=self.body_font,
+                                           fg=self.colors['text'], bg=self.colors['card'],
+                                           selectcolor=self.colors['button'],
+                                           activebackground=self.colors['card'],
+                                           activeforeground=self.colors['text'],
+                                           command=self.prefetcher.cancel_all)
+        self.prefetch_check.pack(side=tk.RIGHT, padx=(0, 15))
+        
     def create_clipboard_section(self, parent):
         """Create clipboard content section"""
         clipboard_frame = tk.Frame(parent, bg=self.colors['bg'])
@@ -255,6 +347,12 @@ class ImprovedClipboardApp:
                                          primary=True)
         self.send_btn.pack(side=tk.LEFT, padx=(0, 10))
         
+        self.cancel_btn = self.create_button(button_frame, "⏹ Cancel", 
+                                           self.cancel_request,
+                                           bg=self.colors['button'])
+        self.cancel_btn.config(state=tk.DISABLED)
+        self.cancel_btn.pack(side=tk.LEFT, padx=(0, 10))
+        
         # Secondary buttons
         self.refresh_btn = self.create_button(button_frame, "🔄 Refresh", 
                                             self.refresh_clipboard,
@@ -264,7 +362,17 @@ class ImprovedClipboardApp:
         self.clear_btn = self.create_button(button_frame, "🗑️ Clear Response", 
                                           self.clear_response,
                                           bg=self.colors['button'])
-        self.clear_btn.pack(side=tk.LEFT)
+        self.clear_btn.pack(side=tk.LEFT, padx=(0, 10))
+        
+        self.new_chat_btn = self.create_button(button_frame, "💬 New Chat", 
+                                             self.new_conversation,
+                                             bg=self.colors['button'])
+        self.new_chat_btn.pack(side=tk.LEFT, padx=(0, 10))
+        
+        self.stats_btn = self.create_button(button_frame, "📊 Stats", 
+                                          self.show_stats,
+                                          bg=self.colors['button'])
+        self.stats_btn.pack(side=tk.LEFT)
         
     def create_button(self, parent, text, command, bg=None, fg=None, primary=False):
         """Create styled button"""
@@ -326,44 +434,45 @@ class ImprovedClipboardApp:
                                         command=self.response_text.yview,
                                         bg=self.colors['button'], 
                                         troughcolor=self.colors['input_bg'])
-        self.response_text.configure(yscrollcommand=response_scrollbar.set)
+        self.diff_tags = {"insert": "inserted", "delete": "deleted"}
+        self.response_text.tag_configure("inserted", foreground=self.colors['success'], underline=True)
+        self.response_text.tag_configure("deleted", foreground=self.colors['error'], overstrike=True)
+        # Renders at most a bounded amount of text; very long responses spill to a file
+        self.response_view = VirtualTextView(self.response_text, response_scrollbar)
         
         self.response_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         response_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
     def update_char_count(self, event=None):
         """Update character count"""
-        content = self.clipboard_text.get(1.0, tk.END + '-1c')  # -1c to exclude final newline
-        char_count = len(content)
-        self.char_count_label.config(text=f"{char_count:,} characters")
-        
-    def check_ollama_status(self):
-        """Check Ollama connection"""
-        def check():
-            try:
-                response = requests.get(f"{self.ollama_url}/api/tags", timeout=5)
-                if response.status_code == 200:
-                    self.root.after(0, lambda: self.update_status("Connected to Ollama", "success"))
-                else:
-                    self.root.after(0, lambda: self.update_status("Ollama Error", "error"))
-            except:
-                self.root.after(0, lambda: self.update_status("Ollama Disconnected", "error"))
-        
-        threading.Thread(target=check, daemon=True).start()
-        
-    def load_models(self):
-        """Load available models"""
-        def load():
-            try:
-                response = requests.get(f"{self.ollama_url}/api/tags", timeout=5)
-                if response.status_code == 200:
-                    data = response.json()
-                    models = [model["name"] for model in data.get("models", [])]
-                    self.root.after(0, lambda: self.update_models(models))
-            except:
-                pass
-        
-        threading.Thread(target=load, daemon=True).start()
+        # Let Tk count the characters instead of copying the text out; -1c excludes the final newline
+        count = self.clipboard_text.count(1.0, tk.END + '-1c', 'chars')
+        char_count = count[0] if count else 0
+        label = f"{char_count:,} characters"
+        
+        snapshot = self.clipboard_snapshot
+        if snapshot and snapshot.truncated and not self.clipboard_text.edit_modified():
+            label += f" (first {self.max_clipboard_bytes // 1024:,} KB of {snapshot.size // 1024:,} KB)"
+        self.char_count_label.config(text=label)
+        
+    def probe_ollama(self):
+        """Probe Ollama now (blocks; run off the main thread), then keep probing in the background"""
+        self.health.check()
+        self.health.start()
+        
+    def on_health(self, models, error):
+        """Show a health probe result; the shared status line is only touched when the state changes or while down"""
+        was_healthy, self.ollama_healthy = self.ollama_healthy, error is None
+        if isinstance(error, OllamaUnavailableError):
+            self.update_status(f"Ollama unreachable (retry in {error.retry_in:.0f}s)", "error")
+        elif isinstance(error, OllamaHTTPError):
+            self.update_status("Ollama Error", "error")
+        elif error is not None:
+            self.update_status("Ollama Disconnected", "error")
+        elif not was_healthy:
+            self.update_status("Connected to Ollama", "success")
+        if error is None and models != self.available_models:
+            self.update_models(models)
         
     def update_models(self, models):
         """Update model dropdown"""
@@ -386,6 +495,33 @@ class ImprovedClipboardApp:
                 self.model_var.set(models[0])
         print(f"✅ Models loaded: {models}")
         
+    def preload_model(self, model):
+        """Load the selected model in the background so the first send is warm"""
+        if not model:
+            return
+        if not self.model_manager.is_resident(model):
+            self.update_status(f"Loading {model}...", "info")
+        
+        def on_done(name, seconds, error):
+            self.root.after(0, lambda: self.on_model_loaded(name, seconds, error))
+        
+        self.model_manager.preload(model, on_done=on_done)
+        
+    def on_model_loaded(self, model, seconds, error):
+        """Report the result of a model preload"""
+        if error:
+            self.logger.warning(f"Could not preload {model}: {error}")
+            self.update_status(f"Could not preload {model}", "warning")
+            return
+        self.logger.info(f"Model {model} ready after {seconds:.2f}s (keep_alive {self.model_manager.keep_alive})")
+        self.update_status(f"{model} ready ({seconds:.1f}s load)", "success")
+        self.update_resident_models(self.model_manager.resident)
+        
+    def update_resident_models(self, models):
+        """Show which models Ollama currently holds in memory"""
+        names = [model["name"] for model in models]
+        self.resident_label.config(text=f"In memory: {', '.join(names)}" if names else "No models loaded")
+        
     def update_status(self, text, status_type="info"):
         """Update status with color coding"""
         color_map = {
@@ -398,49 +534,39 @@ class ImprovedClipboardApp:
         self.status_label.config(text=text, fg=color_map.get(status_type, self.colors['text']))
         print(f"📊 Status: {text}")
         
-    def get_clipboard(self):
-        """Get clipboard content using pbpaste"""
-        try:
-            result = subprocess.run(['pbpaste'], capture_output=True, text=True)
-            return result.stdout
-        except Exception as e:
-            print(f"❌ Clipboard error: {e}")
-            return ""
-            
     def refresh_clipboard(self):
-        """Manually refresh clipboard"""
-        content = self.get_clipboard()
-        self.update_clipboard_display(content)
-        self.logger.info(f"Clipboard manually refreshed - {len(content)} characters")
-        print(f"🔄 Clipboard refreshed: '{content[:50]}...'")
-        
-    def update_clipboard_display(self, content):
-        """Update clipboard text area"""
+        """Manually refresh clipboard (read in the worker; the display updates when it answers)"""
+        self.clipboard.read(self.on_clipboard_refreshed)
+        
+    def on_clipboard_refreshed(self, snapshot):
+        """Show a manually requested clipboard read"""
+        self.update_clipboard_display(snapshot)
+        self.logger.info(f"Clipboard manually refreshed - {snapshot.size} bytes")
+        print(f"🔄 Clipboard refreshed: '{snapshot.text[:50]}...'")
+        
+    def update_clipboard_display(self, snapshot):
+        """Update clipboard text area, skipping the re-render when the content hash is unchanged"""
+        if snapshot.digest == self.last_clipboard_digest and not self.clipboard_text.edit_modified():
+            return
+        
+        content = snapshot.text
         self.clipboard_text.delete(1.0, tk.END)
         self.clipboard_text.insert(1.0, content)
+        self.clipboard_text.edit_modified(False)
         self.last_clipboard_content = content
+        self.last_clipboard_digest = snapshot.digest
+        self.clipboard_snapshot = snapshot
         self.update_char_count()
+        self.prefetch_clipboard(content.strip())
         
         # Log significant clipboard changes
         if len(content) > 10:  # Only log meaningful content
-            self.logger.info(f"Clipboard updated - {len(content)} characters: '{content[:100]}{'...' if len(content) > 100 else ''}'")
-        
-    def start_monitoring(self):
-        """Start clipboard monitoring"""
-        def monitor():
-            while True:
-                if self.auto_var.get():
-                    content = self.get_clipboard()
-                    if content != self.last_clipboard_content and content.strip():
-                        self.root.after(0, lambda c=content: self.update_clipboard_display(c))
-                        print(f"📋 Clipboard changed: '{content[:30]}...'")
-                time.sleep(1)
-        
-        threading.Thread(target=monitor, daemon=True).start()
-        print("👁️ Clipboard monitoring started")
+            truncated = f" (truncated from {snapshot.size} bytes)" if snapshot.truncated else ""
+            self.logger.info(f"Clipboard updated - {len(content)} characters{truncated}: '{content[:100]}{'...' if len(content) > 100 else ''}'")
         
     def toggle_monitoring(self):
         """Toggle clipboard monitoring"""
+        self.clipboard.set_monitoring(self.auto_var.get())
         if self.auto_var.get():
             print("👁️ Monitoring enabled")
             self.refresh_clipboard()
@@ -454,102 +580,458 @@ class ImprovedClipboardApp:
             messagebox.showwarning("Warning", "No content to send!")
             return
             
-        model = self.model_var.get()
-        print(f"🚀 Sending to Ollama: {len(content)} chars with {model}")
+        prompt = self.render_prompt(content)
+        if prompt is None:
+            return
+        model = prompt.model
+        options = prompt.options or None
+        print(f"🚀 Sending to Ollama: {len(content)} chars with {model} ({prompt.action})")
         
         # Log the request
-        self.logger.info(f"=== NEW OLLAMA REQUEST ===")
-        self.logger.info(f"Model: {model}")
+        self.logger.info("=== NEW OLLAMA REQUEST ===")
+        self.logger.info(f"Action: {prompt.action}, model: {model}, options: {options}")
         self.logger.info(f"Content length: {len(content)} characters")
         self.logger.info(f"Content preview: '{content[:200]}{'...' if len(content) > 200 else ''}'")
         
-        self.send_btn.config(state=tk.DISABLED, text="⏳ Processing...")
-        self.update_status("Sending to Ollama...", "info")
-        
-        def send():
+        conversation = self.conversation_var.get()
+        if conversation:
+            self.session.system_prompt = prompt.system
+            messages = self.session.build_messages(prompt.user)
+            session_stats = self.session.stats()
+            self.logger.info(f"Conversation: {session_stats['turns']} earlier turns, "
+                             f"~{session_stats['history_tokens']} tokens of history")
+        else:
+            messages = prompt.messages
+        request_key = ResponseCache.make_key(model, messages, options)
+        # Oversized one-off requests become concurrent per-chunk requests
+        chunked = not conversation and estimate_tokens(content) > self.chunk_tokens
+        # Rewrites are rendered as a word diff against the input
+        original = content if self.changes_var.get() and prompt.template.rewrite else None
+        
+        # Serve identical requests straight from the cache
+        cache_key = None
+        if self.cache_var.get():
+            cache_key = request_key
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                self.show_cached_response(cached, original)
+                if conversation:
+                    self.session.record(prompt.user, cached)
+                trace = RequestTrace(model, stream=False, cached=True)
+                trace.finish(response_chars=len(cached))
+                self.record_metrics(trace)
+                return
+        
+        stream = self.stream_var.get()
+        
+        # A prefetch of this exact request may already be generating (other prefetches stop here)
+        speculative = self.prefetcher.take(request_key)
+        if speculative is not None:
+            self.logger.info(f"⚡ Using prefetch started {time.time() - speculative.started_at:.1f}s ago "
+                             f"({len(speculative.chunks)} chunks ready)")
+        
+        def send(handle):
+            trace = RequestTrace(model, stream, queue_wait=handle.wait_time or 0.0)
+            start_time = trace.started_at
+            self.logger.info(f"Request started after {handle.wait_time:.2f}s in queue")
+            if speculative is not None:
+                handle.on_cancel(speculative.close)
             try:
-                payload = {
-                    "model": model,
-                    "messages": [{"role": "user", "content": content}],
-                    "stream": False
-                }
+                self.logger.info(f"Sending request to {self.client.base_url}/api/chat (stream={stream})")
                 
-                start_time = time.time()
-                self.logger.info(f"Sending request to {self.ollama_url}/api/chat")
+                request_messages = messages
+                if chunked:
+                    request_messages, ai_response = self.map_chunks(handle, content, prompt, model, options)
                 
-                response = requests.post(
-                    f"{self.ollama_url}/api/chat",
-                    json=payload,
-                    headers={"Content-Type": "application/json"},
-                    timeout=60
-                )
+                if request_messages is None:
+                    # Chunk results were concatenated; there is no final request
+                    trace.finish(response_chars=len(ai_response))
+                    stats = split_durations({})
+                elif stream:
+                    if speculative is not None:
+                        chunks = speculative
+                    else:
+                        chunks = self.client.chat_stream(model, request_messages, options,
+                                                         keep_alive=self.model_manager.keep_alive)
+                    handle.on_cancel(chunks.close)
+                    ai_response, stats = self.stream_response(chunks, trace, original)
+                else:
+                    if speculative is not None:
+                        data = speculative.result()
+                    else:
+                        # Streamed and collected, so Cancel can close the connection and stop Ollama
+                        chunks = self.client.chat_stream(model, request_messages, options,
+                                                         keep_alive=self.model_manager.keep_alive)
+                        handle.on_cancel(chunks.close)
+                        data = collect_chat(chunks)
+                    ai_response = data["message"]["content"]
+                    trace.finish(data, len(ai_response))
+                    stats = split_durations(data)
+                
+                if handle.cancelled:
+                    self.logger.info(f"⏹ Request cancelled after {time.time() - start_time:.1f}s "
+                                     f"({len(ai_response)} characters received)")
+                    trace.finish(trace.ollama, len(ai_response), status="cancelled")
+                    self.root.after(0, lambda: self.record_metrics(trace))
+                    self.root.after(0, lambda: self.update_status("Request cancelled", "warning"))
+                    return
                 
                 elapsed = time.time() - start_time
+                timestamp = datetime.now().strftime("%H:%M:%S")
                 
-                if response.status_code == 200:
-                    data = response.json()
-                    ai_response = data["message"]["content"]
-                    timestamp = datetime.now().strftime("%H:%M:%S")
-                    
-                    # Log successful response
-                    self.logger.info(f"✅ Response received in {elapsed:.1f}s")
-                    self.logger.info(f"Response length: {len(ai_response)} characters")
-                    
-                    # Log full response in separate file
-                    self.response_logger.info(f"=== REQUEST ===")
-                    self.response_logger.info(f"Model: {model}")
-                    self.response_logger.info(f"User Input ({len(content)} chars): {content}")
-                    self.response_logger.info(f"=== RESPONSE ({elapsed:.1f}s) ===")
-                    self.response_logger.info(f"Assistant ({len(ai_response)} chars): {ai_response}")
-                    self.response_logger.info(f"{'='*50}")
-                    
-                    self.root.after(0, lambda: self.display_response(ai_response))
-                    self.root.after(0, lambda: self.response_time_label.config(
-                        text=f"Response at {timestamp} ({elapsed:.1f}s)"))
-                    self.root.after(0, lambda: self.update_status("Response received", "success"))
-                    print(f"✅ Got response: {len(ai_response)} chars in {elapsed:.1f}s")
-                    print(f"🤖 Ollama Response Content:")
-                    print(f"{'='*60}")
-                    print(ai_response)
-                    print(f"{'='*60}")
+                if cache_key:
+                    self.response_cache.put(cache_key, model, ai_response)
+                if conversation:
+                    prompt_eval_count = trace.ollama.get("prompt_eval_count")
+                    self.root.after(0, lambda: self.session.record(prompt.user, ai_response, prompt_eval_count))
+                    self.logger.info(f"Prompt tokens evaluated: {prompt_eval_count} "
+                                     f"(the rest of the prefix came from Ollama's cache)")
+                
+                # Log successful response
+                self.logger.info(f"✅ Response received in {elapsed:.1f}s")
+                if "ttft" in stats:
+                    self.logger.info(f"First token after {stats['ttft']:.2f}s, {stats['tokens_per_sec']:.1f} tokens/sec")
+                self.logger.info(f"Model load {stats['load']:.2f}s, generation {stats['generation']:.2f}s")
+                self.logger.info(f"Response length: {len(ai_response)} characters")
+                
+                # Log full response in separate file
+                self.response_logger.info(
+                    f"=== REQUEST ===\n"
+                    f"Model: {model}\n"
+                    f"User Input ({len(content)} chars): {content}\n"
+                    f"=== RESPONSE ({elapsed:.1f}s) ===\n"
+                    f"Assistant ({len(ai_response)} chars): {ai_response}\n"
+                    f"{'='*50}")
+                
+                if "ttft" in stats:
+                    label = (f"Response at {timestamp} ({elapsed:.1f}s, first token "
+                             f"{stats['ttft']:.2f}s, {stats['tokens_per_sec']:.1f} tok/s, "
+                             f"load {stats['load']:.1f}s)")
                 else:
-                    error = f"HTTP {response.status_code}"
-                    self.logger.error(f"❌ Ollama request failed: {error}")
-                    self.logger.error(f"Response content: {response.text}")
-                    
-                    self.root.after(0, lambda: self.display_response(f"Error: {error}"))
-                    self.root.after(0, lambda: self.update_status(error, "error"))
-                    
+                    label = (f"Response at {timestamp} ({elapsed:.1f}s, load {stats['load']:.1f}s, "
+                             f"generation {stats['generation']:.1f}s)")
+                    if original is not None:
+                        self.root.after(0, trace.timed(self.display_diff), diff_words(original, ai_response))
+                    else:
+                        self.root.after(0, trace.timed(self.display_response), ai_response)
+                self.root.after(0, lambda: self.response_time_label.config(text=label))
+                # Queued behind the render callbacks, so render time is complete when this runs
+                self.root.after(0, lambda: self.record_metrics(trace))
+                self.root.after(0, lambda: self.update_status("Response received", "success"))
+                print(f"✅ Got response: {len(ai_response)} chars in {elapsed:.1f}s")
+                print("🤖 Ollama Response Content:")
+                print(f"{'='*60}")
+                print(ai_response)
+                print(f"{'='*60}")
+                
+            except OllamaHTTPError as e:
+                if handle.cancelled:
+                    return
+                error = f"HTTP {e.status_code}"
+                trace.finish(status="error", error=error)
+                self.root.after(0, lambda: self.record_metrics(trace))
+                self.logger.error(f"❌ Ollama request failed: {error}")
+                self.logger.error(f"Response content: {e.body}")
+                
+                self.root.after(0, lambda: self.display_response(f"Error: {error}"))
+                self.root.after(0, lambda: self.update_status(error, "error"))
+                
             except Exception as e:
-                error = f"Error: {str(e)}"
-                self.logger.error(f"❌ Request exception: {str(e)}")
+                if isinstance(e, OllamaConnectionError):
+                    self.health.poke()  # Show the outage in the status line right away
+                if handle.cancelled:
+                    return
+                # e is unbound once this block ends, so the Tk callbacks capture the message instead
+                message = str(e)
+                error = f"Error: {message}"
+                trace.finish(status="error", error=message)
+                self.root.after(0, lambda: self.record_metrics(trace))
+                self.logger.error(f"❌ Request exception: {message}")
                 self.logger.error(f"Elapsed time: {time.time() - start_time:.1f}s")
                 
                 self.root.after(0, lambda: self.display_response(error))
-                self.root.after(0, lambda: self.update_status(str(e), "error"))
+                self.root.after(0, lambda: self.update_status(message, "error"))
                 print(f"❌ Send failed: {e}")
             finally:
                 self.root.after(0, lambda: self.send_btn.config(
                     state=tk.NORMAL, text="🚀 Send to Ollama"))
+                self.root.after(0, lambda: self.cancel_btn.config(state=tk.DISABLED))
+        
+        handle = self.scheduler.submit(send, model, key=request_key)
+        if handle is self.current_request and handle.coalesced:
+            if speculative is not None:
+                speculative.cancel()
+            self.update_status("Already processing this content", "warning")
+            return
+        self.current_request = handle
+        
+        self.send_btn.config(state=tk.DISABLED, text="⏳ Processing...")
+        self.cancel_btn.config(state=tk.NORMAL)
         
-        threading.Thread(target=send, daemon=True).start()
+        metrics = self.scheduler.metrics()
+        if handle.started_at is None and metrics["queue_depth"]:
+            self.update_status(f"Queued ({metrics['queue_depth']} waiting)...", "info")
+        else:
+            self.update_status("Sending to Ollama...", "info")
+        self.logger.info(f"Scheduler: queue depth {metrics['queue_depth']}, in flight {metrics['in_flight']}, "
+                         f"wait p95 {metrics['wait_p95']:.2f}s")
+        
+        if stream:
+            self.display_response("")
+            self.response_time_label.config(text="Waiting for first token...")
+        
+    def routed_model(self):
+        """Model that answers the selected action (the selected model if the action has none)"""
+        return self.templates.route(self.action_var.get(), self.model_var.get(),
+                                    self.available_models or None)
+        
+    def render_prompt(self, content):
+        """Apply the selected action's template to content; None if the user backs out"""
+        params = {}
+        if self.action_var.get() == "custom":
+            instruction = simpledialog.askstring("Custom instruction", "What should Ollama do with the text?",
+                                                 parent=self.root)
+            if not instruction:
+                return None
+            params["instruction"] = instruction
+        try:
+            return self.templates.render(self.action_var.get(), content, self.model_var.get(),
+                                         self.available_models or None, **params)
+        except TemplateError as e:
+            messagebox.showerror("Template Error", str(e))
+            return None
+        
+    def map_chunks(self, handle, content, prompt, model, options):
+        """Run the action over each chunk of oversized content (called from the worker)
+        
+        Returns the messages of the final reduce request, or None and the chunk
+        results joined in order when the action has no reduce step.
+        """
+        pieces = split_text(content, self.chunk_tokens)
+        pipeline = ChunkPipeline(self.client, model, options, self.model_manager.keep_alive,
+                                 chunk_tokens=self.chunk_tokens, max_workers=self.chunk_workers)
+        handle.on_cancel(pipeline.cancel)
+        self.logger.info(f"Splitting {len(content)} characters into {len(pieces)} chunks "
+                         f"(~{self.chunk_tokens} tokens each, {self.chunk_workers} at a time)")
+        
+        def on_progress(progress):
+            if progress.error:
+                text, status_type = f"Chunk {progress.index + 1}/{progress.total} failed: {progress.error}", "error"
+            else:
+                text, status_type = (f"Processed {progress.completed}/{progress.total} chunks "
+                                     f"({progress.elapsed:.1f}s)"), "info"
+            self.logger.info(text)
+            self.root.after(0, lambda: self.update_status(text, status_type))
+        
+        self.root.after(0, lambda: self.update_status(f"Processing {len(pieces)} chunks...", "info"))
+        parts = pipeline.map(pieces, prompt.messages_for, on_progress)
+        if prompt.template is None or prompt.template.reduce is None:
+            return None, "\n\n".join(parts)
+        
+        self.root.after(0, lambda: self.update_status("Merging chunk results...", "info"))
+        return pipeline.reduce_messages(parts, prompt.template.reduce, prompt.system, on_progress), None
+        
+    def prefetch_clipboard(self, content):
+        """Start generating a response for new clipboard content before Send is clicked"""
+        action = self.action_var.get()
+        if (not self.prefetch_var.get() or self.conversation_var.get() or action == "custom"
+                or not self.prefetcher.qualifies(content) or estimate_tokens(content) > self.chunk_tokens):
+            self.prefetcher.cancel_all()
+            return
+        
+        prompt = self.templates.render(action, content, self.model_var.get(), self.available_models or None)
+        options = prompt.options or None
+        key = ResponseCache.make_key(prompt.model, prompt.messages, options)
+        if self.cache_var.get() and self.response_cache.contains(key):
+            self.prefetcher.cancel_all()
+            return
+        if self.prefetcher.start(key, prompt.model, prompt.messages, options):
+            self.logger.info(f"⚡ Prefetching {len(content)} characters with {prompt.model} ({action})")
+        
+    def cancel_request(self):
+        """Cancel the current generation; closing the stream makes Ollama stop computing"""
+        if self.current_request and not self.current_request.done:
+            self.current_request.cancel()
+            self.send_btn.config(state=tk.NORMAL, text="🚀 Send to Ollama")
+            self.cancel_btn.config(state=tk.DISABLED)
+            self.update_status("Request cancelled", "warning")
+            print("⏹ Request cancelled")
+        
+    def show_cached_response(self, text, original=None):
+        """Display a cache hit immediately (as changes to original, if given)"""
+        timestamp = datetime.now().strftime("%H:%M:%S")
+        stats = self.response_cache.stats()
+        
+        if original is not None:
+            self.display_diff(diff_words(original, text))
+        else:
+            self.display_response(text)
+        self.response_time_label.config(
+            text=f"Cached response at {timestamp} (hits {stats['hits']} / misses {stats['misses']})")
+        self.update_status("Response served from cache", "success")
+        self.logger.info(f"✅ Cache hit - {len(text)} characters "
+                         f"(hits {stats['hits']}, misses {stats['misses']}, entries {stats['entries']})")
+        
+    def record_metrics(self, trace):
+        """Write a finished request's metrics and refresh the stats window"""
+        record = self.metrics.record(trace)
+        if record["status"] == "ok" and not record["cached"]:
+            self.logger.info(f"Timing: queue {record['queue_wait']:.2f}s, request {record['request']:.2f}s, "
+                             f"render {record['render']:.3f}s, total {record['total']:.2f}s")
+        self.refresh_stats()
+        
+    def show_stats(self):
+        """Open (or raise) the live per-model request statistics window"""
+        if self.stats_window is not None and self.stats_window.winfo_exists():
+            self.stats_window.lift()
+            return
+        
+        self.stats_window = tk.Toplevel(self.root)
+        self.stats_window.title("Request Statistics")
+        self.stats_window.configure(bg=self.colors['bg'])
+        
+        tk.Label(self.stats_window, text="📊 Rolling request statistics (last 200 per model)",
+                font=self.header_font, fg=self.colors['text'],
+                bg=self.colors['bg']).pack(anchor=tk.W, padx=15, pady=(15, 5))
+        self.stats_label = tk.Label(self.stats_window, text="", font=self.mono_font, justify=tk.LEFT,
+                                  fg=self.colors['text'], bg=self.colors['card'], padx=15, pady=15)
+        self.stats_label.pack(fill=tk.BOTH, expand=True, padx=15, pady=(0, 15))
+        self.refresh_stats()
+        
+    def refresh_stats(self):
+        """Redraw the stats window if it is open"""
+        if self.stats_window is None or not self.stats_window.winfo_exists():
+            return
+        scheduler = self.scheduler.metrics()
+        prefetch = self.prefetcher.stats()
+        stalls = self.stall_monitor.summary()
+        self.stats_label.config(
+            text=f"{format_summary(self.metrics.summary())}\n\n"
+                 f"Queue: {scheduler['queue_depth']} waiting · {scheduler['in_flight']} running\n"
+                 f"Prefetch: {prefetch['started']} started · {prefetch['used']} used · "
+                 f"{prefetch['discarded']} discarded · {prefetch['skipped']} skipped\n"
+                 f"UI thread: timer late p50 {stalls['p50_ms']:.0f}ms · p99 {stalls['p99_ms']:.0f}ms · "
+                 f"worst {stalls['max_ms']:.0f}ms")
+        
+    def stream_response(self, chunks, trace, original=None):
+        """Append streamed chat chunks to the response pane in batches
+        
+        With original, each batch is diffed against it here on the worker thread and only
+        the settled changes are handed to the UI.
+        """
+        start_time = trace.started_at
+        parts = []
+        pending = []
+        token_count = 0
+        first_token_time = None
+        last_flush = start_time
+        final_chunk = {}
+        differ = StreamingDiff(original) if original is not None else None
+        
+        def flush(now):
+            text = "".join(pending)
+            pending.clear()
+            ttft = first_token_time - start_time
+            tokens_per_sec = token_count / max(now - first_token_time, 1e-6)
+            if differ is not None:
+                self.root.after(0, trace.timed(self.append_diff), differ.feed(text))
+            else:
+                self.root.after(0, trace.timed(self.append_response), text)
+            self.root.after(0, lambda: self.response_time_label.config(
+                text=f"First token {ttft:.2f}s · {tokens_per_sec:.1f} tok/s"))
+        
+        for chunk in chunks:
+            token = chunk.get("message", {}).get("content", "")
+            if token:
+                now = time.time()
+                if first_token_time is None:
+                    first_token_time = now
+                    trace.mark_first_token()
+                    self.logger.info(f"First token after {now - start_time:.2f}s")
+                parts.append(token)
+                pending.append(token)
+                token_count += 1
+                if now - last_flush >= self.stream_flush_interval:
+                    flush(now)
+                    last_flush = now
+            
+            if chunk.get("done"):
+                final_chunk = chunk
+                break
+        
+        if first_token_time is None:
+            first_token_time = time.time()
+        if pending:
+            flush(time.time())
+        if differ is not None:
+            self.root.after(0, trace.timed(self.append_diff), differ.finish())
+        trace.finish(final_chunk, sum(len(part) for part in parts))
+        
+        # Prefer Ollama's own generation counters over our chunk count
+        if final_chunk.get("eval_count") and final_chunk.get("eval_duration"):
+            tokens_per_sec = final_chunk["eval_count"] / (final_chunk["eval_duration"] / 1e9)
+        else:
+            tokens_per_sec = token_count / max(time.time() - first_token_time, 1e-6)
+        
+        stats = {
+            "ttft": first_token_time - start_time,
+            "tokens_per_sec": tokens_per_sec,
+            **split_durations(final_chunk),
+        }
+        return "".join(parts), stats
         
     def display_response(self, text):
         """Display response in response area"""
-        self.response_text.config(state=tk.NORMAL)
-        self.response_text.delete(1.0, tk.END)
-        self.response_text.insert(1.0, text)
-        self.response_text.see(tk.END)
-        self.response_text.config(state=tk.DISABLED)
+        self.response_view.clear()
+        self.response_view.add(text)
+        
+    def append_response(self, text):
+        """Append a streamed chunk to the response area"""
+        self.response_view.append(text)
+        
+    def display_diff(self, segments):
+        """Display a response as changes to its input"""
+        self.response_view.clear()
+        self.append_diff(segments)
+        
+    def append_diff(self, segments):
+        """Append diff segments; only the changed spans get a tag"""
+        for tag, text in segments:
+            self.response_view.append(text, self.diff_tags.get(tag))
         
     def clear_response(self):
         """Clear response area"""
-        self.response_text.config(state=tk.NORMAL)
-        self.response_text.delete(1.0, tk.END)
-        self.response_text.config(state=tk.DISABLED)
+        self.response_view.clear()
         self.response_time_label.config(text="")
         print("🗑️ Response cleared")
         
+    def new_conversation(self):
+        """Forget the earlier turns of the conversation"""
+        self.session.reset()
+        self.update_status("Started a new conversation", "info")
+        self.logger.info("Conversation reset")
+        
+    def start_clipboard_service(self):
+        """Start the clipboard worker and show the current clipboard once it has been read"""
+        self.clipboard.start(monitoring=self.auto_monitor)
+        self.clipboard.read(self.update_clipboard_display)
+        print(f"👁️ Clipboard worker started ({'process' if self.clipboard.isolated else 'in-process, on the Tk thread'})")
+        
+    def start_background_init(self):
+        """Run the slow parts of startup concurrently once the window is on screen"""
+        self.model_manager.start_polling(
+            lambda models: self.root.after(0, lambda: self.update_resident_models(models)))
+        self.start_clipboard_service()
+        profiler.run_concurrently({
+            "probe_ollama": self.probe_ollama,
+        }, on_done=lambda: self.root.after(0, self.on_startup_done))
+        
+    def on_startup_done(self):
+        """Print the --profile-startup report once every startup task has finished"""
+        profiler.mark("background init done")
+        if profiler.enabled:
+            print(profiler.report())
+        
     def run(self):
         """Start the app"""
         # Center window
@@ -560,13 +1042,22 @@ class ImprovedClipboardApp:
         y = (self.root.winfo_screenheight() // 2) - (height // 2)
         self.root.geometry(f'{width}x{height}+{x}+{y}')
         
+        # Paint the window before anything touches the clipboard or the network
+        self.root.update()
+        profiler.mark("first paint")
+        self.start_background_init()
+        self.stall_monitor.start()
+        self.root.after(0, lambda: profiler.mark("interactive"))
+        
         print("🎯 App window centered and ready")
         self.root.mainloop()
+        self.clipboard.stop()
 
 def main():
     print("🎬 Starting Improved Clipboard to Ollama App...")
     try:
-        app = ImprovedClipboardApp()
+        with profiler.phase("construct app"):
+            app = ImprovedClipboardApp()
         app.run()
     except Exception as e:
         print(f"❌ Fatal error: {e}")
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Non-blocking log pipeline
+- Loggers only enqueue records (QueueHandler); a QueueListener thread does the disk writes
+- Log files roll over at midnight or when they reach max_bytes, whichever comes first
+- Rolled-over segments are gzip-compressed and only backup_count of them are kept
+"""
+
+import atexit
+import gzip
+import logging
+import os
+import queue
+import shutil
+import time
+from datetime import datetime, timedelta
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import List, Optional
+
+DEFAULT_MAX_BYTES = 5 * 1024 * 1024
+DEFAULT_BACKUP_COUNT = 10
+
+
+def _gzip_namer(name: str) -> str:
+    return name + ".gz"
+
+
+def _gzip_rotator(source: str, dest: str):
+    """Compress a closed log segment into dest and remove the original"""
+    with open(source, 'rb') as f_in, gzip.open(dest, 'wb') as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
+
+
+class CompressingRotatingFileHandler(RotatingFileHandler):
+    """RotatingFileHandler that also rolls over at midnight and gzips old segments
+
+    Segments are named <file>.1.gz (newest) to <file>.<backup_count>.gz (oldest).
+    """
+
+    def __init__(self, filename: str, max_bytes: int = DEFAULT_MAX_BYTES,
+                 backup_count: int = DEFAULT_BACKUP_COUNT, encoding: str = "utf-8"):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count,
+                         encoding=encoding, delay=True)
+        self.namer = _gzip_namer
+        self.rotator = _gzip_rotator
+        self.rollover_at = self._next_midnight(self._opened_at(filename))
+
+    @staticmethod
+    def _opened_at(filename: str) -> float:
+        # A file left over from an earlier day rolls over on the first write
+        return os.path.getmtime(filename) if os.path.exists(filename) else time.time()
+
+    @staticmethod
+    def _next_midnight(now: float) -> float:
+        tomorrow = datetime.fromtimestamp(now).date() + timedelta(days=1)
+        return datetime.combine(tomorrow, datetime.min.time()).timestamp()
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if record.created >= self.rollover_at and os.path.exists(self.baseFilename):
+            return True
+        return bool(super().shouldRollover(record))
+
+    def doRollover(self):
+        super().doRollover()
+        self.rollover_at = self._next_midnight(time.time())
+
+
+class LogPipeline:
+    """Routes named loggers through one queue to their rotating file handlers"""
+
+    def __init__(self, logs_dir: str = "logs", max_bytes: int = DEFAULT_MAX_BYTES,
+                 backup_count: int = DEFAULT_BACKUP_COUNT):
+        self.logs_dir = logs_dir
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.queue: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+        self.handlers: List[logging.Handler] = []
+        self.listener: Optional[QueueListener] = None
+        os.makedirs(logs_dir, exist_ok=True)
+
+    def add_logger(self, name: str, filename: str, formatter: logging.Formatter,
+                   level: int = logging.INFO) -> logging.Logger:
+        """Create (or reset) logger name so its records end up in logs_dir/filename"""
+        handler = CompressingRotatingFileHandler(
+            os.path.join(self.logs_dir, filename), self.max_bytes, self.backup_count)
+        handler.setFormatter(formatter)
+        handler.setLevel(level)
+        handler.addFilter(lambda record, name=name: record.name == name)
+        self.handlers.append(handler)
+
+        logger = logging.getLogger(name)
+        logger.setLevel(level)
+        logger.handlers.clear()
+        logger.addHandler(QueueHandler(self.queue))
+        logger.propagate = False
+        return logger
+
+    def start(self):
+        """Start the writer thread; it is flushed and stopped at interpreter exit"""
+        if self.listener is not None:
+            return
+        self.listener = QueueListener(self.queue, *self.handlers, respect_handler_level=True)
+        self.listener.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        """Write out everything still queued and close the files"""
+        if self.listener is None:
+            return
+        self.listener.stop()
+        self.listener = None
+        for handler in self.handlers:
+            handler.close()
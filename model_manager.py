@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Model lifecycle management
+- Preloads the selected model so the first request does not pay the load cost
+- Supplies the keep_alive value sent with every request
+- Polls /api/ps to track which models are resident in memory
+"""
+
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from ollama_client import OllamaClient, OllamaError
+
+DEFAULT_KEEP_ALIVE = "30m"
+
+
+def split_durations(data: Dict[str, Any]) -> Dict[str, float]:
+    """Seconds spent loading, evaluating the prompt and generating, from Ollama's final chunk"""
+    return {
+        "load": data.get("load_duration", 0) / 1e9,
+        "prompt_eval": data.get("prompt_eval_duration", 0) / 1e9,
+        "generation": data.get("eval_duration", 0) / 1e9,
+        "total": data.get("total_duration", 0) / 1e9,
+    }
+
+
+class ModelManager:
+    """Keeps the selected model warm and reports what is loaded"""
+
+    def __init__(self, client: OllamaClient, keep_alive: str = DEFAULT_KEEP_ALIVE,
+                 poll_interval: float = 15.0):
+        self.client = client
+        self.keep_alive = keep_alive
+        self.poll_interval = poll_interval
+        self.resident: List[Dict[str, Any]] = []
+        self.load_times: Dict[str, float] = {}
+        self._loading: Dict[str, threading.Thread] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def resident_names(self) -> List[str]:
+        return [model["name"] for model in self.resident]
+
+    def is_resident(self, model: str) -> bool:
+        return model in self.resident_names()
+
+    def preload(self, model: str,
+                on_done: Optional[Callable[[str, float, Optional[Exception]], None]] = None):
+        """Load model in the background (no-op while a preload of it is already running)"""
+        with self._lock:
+            if model in self._loading:
+                return
+
+            def load():
+                start = time.time()
+                error = None
+                try:
+                    self.client.load(model, keep_alive=self.keep_alive)
+                    self.load_times[model] = time.time() - start
+                    self.refresh()
+                except OllamaError as e:
+                    error = e
+                finally:
+                    with self._lock:
+                        self._loading.pop(model, None)
+                if on_done:
+                    on_done(model, time.time() - start, error)
+
+            thread = threading.Thread(target=load, daemon=True)
+            self._loading[model] = thread
+        thread.start()
+
+    def refresh(self) -> List[Dict[str, Any]]:
+        """Fetch the resident model list from /api/ps"""
+        self.resident = self.client.ps()
+        return self.resident
+
+    def start_polling(self, on_update: Callable[[List[Dict[str, Any]]], None]):
+        """Poll /api/ps every poll_interval seconds and report the resident models"""
+        def poll():
+            while not self._stop.is_set():
+                try:
+                    on_update(self.refresh())
+                except OllamaError:
+                    pass
+                self._stop.wait(self.poll_interval)
+
+        threading.Thread(target=poll, daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
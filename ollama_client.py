@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Shared Ollama client for the clipboard apps
+- One pooled keep-alive requests.Session per Ollama URL
+- Per-endpoint (connect, read) timeouts
+- Concurrent /api/tags callers share a single in-flight request
+- Idempotent calls (tags, ps, show) retry with jittered backoff; a circuit breaker makes
+  every call fail at once while Ollama is unreachable instead of waiting on timeouts
+- requests is imported, and the gateway probed, on the first request rather than at
+  construction, so creating a client at app startup costs nothing
+"""
+
+import json
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from resilience import CircuitBreaker, NO_RETRY, RetryPolicy
+
+if TYPE_CHECKING:
+    import requests
+
+DEFAULT_OLLAMA_URL = "http://localhost:11434"
+# Local gateway (gateway_server.py) that shares one connection pool and cache between clients
+GATEWAY_URL = "http://localhost:11435"
+
+# (connect, read) timeouts in seconds for each endpoint
+DEFAULT_TIMEOUTS: Dict[str, Tuple[float, float]] = {
+    "tags": (3, 5),
+    "ps": (3, 5),
+    "show": (3, 10),
+    "chat": (5, 60),
+    "load": (5, 120),
+}
+
+# Endpoints that are safe to send again after a connection failure or a 502/503/504
+IDEMPOTENT_ENDPOINTS = ("tags", "ps", "show")
+RETRYABLE_STATUS = (502, 503, 504)
+# Endpoints whose read timeout means a long generation, not an unreachable host
+GENERATION_ENDPOINTS = ("chat", "load")
+
+Message = Dict[str, str]
+ChatChunk = Dict[str, Any]
+ModelInfo = Dict[str, Any]
+
+
+def _requests():
+    """Import requests on first use (it is the slowest import of the apps)"""
+    global requests
+    import requests
+    return requests
+
+
+class OllamaError(Exception):
+    """Base error for failed Ollama requests"""
+
+
+class OllamaConnectionError(OllamaError):
+    """Ollama could not be reached or did not answer in time"""
+
+
+class OllamaUnavailableError(OllamaConnectionError):
+    """The circuit breaker is open: recent requests failed, so this one was not sent"""
+
+    def __init__(self, retry_in: float):
+        super().__init__(f"Ollama is unreachable; retrying in {retry_in:.0f}s")
+        self.retry_in = retry_in
+
+
+class OllamaHTTPError(OllamaError):
+    """Ollama answered with a non-200 status"""
+
+    def __init__(self, status_code: int, body: str = ""):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.body = body
+
+
+class _SharedCall:
+    """Result slot shared by every caller waiting on the same request"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class OllamaClient:
+    """Thin typed wrapper around the Ollama HTTP API"""
+
+    def __init__(self, base_url: str = DEFAULT_OLLAMA_URL,
+                 timeouts: Optional[Dict[str, Tuple[float, float]]] = None,
+                 pool_size: int = 8, fallback_url: Optional[str] = None,
+                 retry: Optional[RetryPolicy] = None, breaker: Optional[CircuitBreaker] = None):
+        self.base_url = base_url.rstrip("/")
+        # base_url is only used if its /health answers; otherwise fallback_url (checked on first request)
+        self.fallback_url = fallback_url.rstrip("/") if fallback_url else None
+        self.timeouts = dict(DEFAULT_TIMEOUTS)
+        if timeouts:
+            self.timeouts.update(timeouts)
+        self.pool_size = pool_size
+        self.retry = retry or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker()
+
+        self._session: Optional["requests.Session"] = None
+        self._session_lock = threading.Lock()
+        self._tags_lock = threading.Lock()
+        self._tags_call: Optional[_SharedCall] = None
+
+    @property
+    def session(self) -> "requests.Session":
+        """The pooled session, created (and the base URL resolved) on first use"""
+        with self._session_lock:
+            if self._session is None:
+                requests = _requests()
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.headers.update({"Content-Type": "application/json"})
+                if self.fallback_url:
+                    self.base_url = resolve_ollama_url(self.base_url, self.fallback_url)
+                self._session = session
+            return self._session
+
+    def _request(self, method: str, endpoint: str, path: str,
+                 stream: bool = False, **kwargs) -> "requests.Response":
+        """Send a request with the endpoint's timeout, retrying idempotent endpoints
+
+        The circuit breaker sees one outcome per call, after its retries.
+        """
+        if not self.breaker.allow():
+            raise OllamaUnavailableError(self.breaker.retry_in())
+        policy = self.retry if endpoint in IDEMPOTENT_ENDPOINTS else NO_RETRY
+        attempt = 0
+        while True:
+            try:
+                response = self._send(method, endpoint, path, stream, **kwargs)
+            except (OllamaConnectionError, OllamaHTTPError) as e:
+                attempt += 1
+                retryable = not isinstance(e, OllamaHTTPError) or e.status_code in RETRYABLE_STATUS
+                if not retryable or attempt >= policy.attempts:
+                    self._record_outcome(endpoint, e)
+                    raise
+                time.sleep(policy.delay(attempt))
+                continue
+            self.breaker.record_success()
+            return response
+
+    def _record_outcome(self, endpoint: str, error: OllamaError):
+        """Count a failed call against the breaker only if Ollama looks unreachable
+
+        Connection errors and 502/503/504 count; so do timeouts of the short endpoints. A
+        read timeout on chat or load is a slow generation, and any other answer means the
+        host is up.
+        """
+        if isinstance(error, OllamaHTTPError):
+            unreachable = error.status_code in RETRYABLE_STATUS
+        else:
+            cause = error.__cause__
+            unreachable = isinstance(cause, requests.exceptions.ConnectionError) or (
+                endpoint not in GENERATION_ENDPOINTS and isinstance(cause, requests.exceptions.Timeout))
+        if unreachable:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+    def _send(self, method: str, endpoint: str, path: str,
+              stream: bool = False, **kwargs) -> "requests.Response":
+        """One attempt; transport errors are mapped to OllamaError"""
+        session = self.session
+        try:
+            response = session.request(
+                method, f"{self.base_url}{path}",
+                timeout=self.timeouts[endpoint], stream=stream, **kwargs
+            )
+        except requests.exceptions.RequestException as e:
+            raise OllamaConnectionError(str(e)) from e
+
+        if response.status_code != 200:
+            body = response.text
+            response.close()
+            raise OllamaHTTPError(response.status_code, body)
+        return response
+
+    def tags(self) -> List[ModelInfo]:
+        """List local models; concurrent callers share one /api/tags request"""
+        with self._tags_lock:
+            call = self._tags_call
+            leader = call is None
+            if leader:
+                call = self._tags_call = _SharedCall()
+
+        if leader:
+            try:
+                call.result = self._request("GET", "tags", "/api/tags").json().get("models", [])
+            except BaseException as e:
+                call.error = e
+            finally:
+                with self._tags_lock:
+                    self._tags_call = None
+                call.done.set()
+        else:
+            call.done.wait()
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def model_names(self) -> List[str]:
+        """Names of the local models"""
+        return [model["name"] for model in self.tags()]
+
+    def ps(self) -> List[ModelInfo]:
+        """List models currently loaded in memory"""
+        return self._request("GET", "ps", "/api/ps").json().get("models", [])
+
+    def show(self, model: str) -> Dict[str, Any]:
+        """Show model details (parameters, template, modelfile)"""
+        return self._request("POST", "show", "/api/show", json={"model": model}).json()
+
+    def load(self, model: str, keep_alive: Optional[str] = None) -> Dict[str, Any]:
+        """Load model into memory without generating (chat request with no messages)"""
+        payload: Dict[str, Any] = {"model": model, "messages": [], "stream": False}
+        if keep_alive is not None:
+            payload["keep_alive"] = keep_alive
+        return self._request("POST", "load", "/api/chat", json=payload).json()
+
+    def chat(self, model: str, messages: List[Message],
+             options: Optional[Dict[str, Any]] = None, **extra) -> Dict[str, Any]:
+        """Send a non-streaming chat request and return the full reply"""
+        payload = self._chat_payload(model, messages, options, False, extra)
+        return self._request("POST", "chat", "/api/chat", json=payload).json()
+
+    def chat_stream(self, model: str, messages: List[Message],
+                    options: Optional[Dict[str, Any]] = None, **extra) -> "ChatStream":
+        """Send a streaming chat request; iterate the result for NDJSON chunks as they arrive"""
+        payload = self._chat_payload(model, messages, options, True, extra)
+        return ChatStream(self._request("POST", "chat", "/api/chat", stream=True, json=payload))
+
+    @staticmethod
+    def _chat_payload(model: str, messages: List[Message], options: Optional[Dict[str, Any]],
+                      stream: bool, extra: Dict[str, Any]) -> Dict[str, Any]:
+        payload: Dict[str, Any] = {"model": model, "messages": messages, "stream": stream}
+        if options:
+            payload["options"] = options
+        payload.update(extra)
+        return payload
+
+    def close(self):
+        """Close pooled connections"""
+        if self._session is not None:
+            self._session.close()
+
+
+class ChatStream:
+    """Iterator over a streaming /api/chat response
+
+    close() may be called from another thread; it drops the connection, which makes
+    Ollama stop generating, and ends the iteration quietly.
+    """
+
+    def __init__(self, response: "requests.Response"):
+        self.response = response
+        self.closed = False
+
+    def __iter__(self) -> Iterator[ChatChunk]:
+        try:
+            for line in self.response.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if "error" in chunk:
+                    raise OllamaError(chunk["error"])
+                yield chunk
+                if chunk.get("done"):
+                    break
+        except Exception as e:
+            if self.closed:
+                return
+            if isinstance(e, requests.exceptions.RequestException):
+                raise OllamaConnectionError(str(e)) from e
+            raise
+        finally:
+            self.response.close()
+
+    def close(self):
+        self.closed = True
+        self.response.close()
+
+
+def collect_chat(chunks: Iterable[ChatChunk]) -> Dict[str, Any]:
+    """Join a streamed reply into the shape of OllamaClient.chat() (the final chunk's stats, the whole message)
+
+    Non-streaming sends go through chat_stream() and this, so there is a stream that
+    Cancel can close; whatever arrived before the close is returned.
+    """
+    chunks = list(chunks)
+    final = dict(chunks[-1]) if chunks else {}
+    final["message"] = {"role": "assistant",
+                        "content": "".join(c.get("message", {}).get("content", "") for c in chunks)}
+    return final
+
+
+def resolve_ollama_url(preferred: str = GATEWAY_URL, fallback: str = DEFAULT_OLLAMA_URL) -> str:
+    """Use the gateway when it is running, otherwise talk to Ollama directly"""
+    requests = _requests()
+    try:
+        requests.get(f"{preferred}/health", timeout=0.3).raise_for_status()
+        return preferred
+    except requests.exceptions.RequestException:
+        return fallback
+
+
+_clients: Dict[Tuple[str, Optional[str]], OllamaClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(base_url: str = DEFAULT_OLLAMA_URL, fallback_url: Optional[str] = None) -> OllamaClient:
+    """Return the process-wide client for base_url, creating it on first use
+
+    With fallback_url, base_url (usually the gateway) is probed on the first request
+    and fallback_url is used when it does not answer.
+    """
+    key = (base_url.rstrip("/"), fallback_url.rstrip("/") if fallback_url else None)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = OllamaClient(key[0], fallback_url=key[1])
+        return client
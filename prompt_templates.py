@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Prompt template registry and per-action model routing
+prompt_templates.json maps each action (improve, summarize, ...) to a prompt template,
+an optional system prompt, a model and generation options. The file is read and the
+templates compiled once per process; rendering an action is then a string substitution.
+Short rewrite actions route to a small fast model, long-form ones to a larger model.
+Actions marked "rewrite" return an edited copy of the input, which the apps show as a diff.
+"""
+
+import json
+import os
+import threading
+from dataclasses import dataclass, field
+from string import Template
+from typing import Any, Dict, List, Optional
+
+from ollama_client import Message
+
+DEFAULT_TEMPLATES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "prompt_templates.json")
+
+
+class TemplateError(ValueError):
+    """Unknown action, bad template file or a missing template parameter"""
+
+
+@dataclass
+class PromptTemplate:
+    """One action: how to build its messages and which model answers it"""
+
+    action: str
+    label: str
+    template: Template
+    system: Optional[str] = None
+    model: Optional[str] = None  # None keeps the caller's model
+    options: Dict[str, Any] = field(default_factory=dict)
+    reduce: Optional[Template] = None  # Merges per-chunk results; None concatenates them
+    rewrite: bool = False  # The reply is an edited copy of the input, so it can be shown as changes
+
+    def render(self, text: str, **params: str) -> str:
+        try:
+            return self.template.substitute(params, text=text)
+        except KeyError as e:
+            raise TemplateError(f"Template '{self.action}' needs parameter {e.args[0]!r}") from None
+
+
+@dataclass
+class RenderedPrompt:
+    """A rendered action, ready to send"""
+
+    action: str
+    model: str
+    user: str
+    system: Optional[str] = None
+    options: Dict[str, Any] = field(default_factory=dict)
+    template: Optional[PromptTemplate] = None
+    params: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def messages(self) -> List[Message]:
+        system = [{"role": "system", "content": self.system}] if self.system else []
+        return system + [{"role": "user", "content": self.user}]
+
+    def messages_for(self, text: str) -> List[Message]:
+        """Messages for another input (e.g. one chunk of it) rendered the same way"""
+        user = self.template.render(text, **self.params) if self.template else text
+        system = [{"role": "system", "content": self.system}] if self.system else []
+        return system + [{"role": "user", "content": user}]
+
+
+class TemplateRegistry:
+    """Compiled prompt templates keyed by action"""
+
+    def __init__(self, templates: Dict[str, PromptTemplate], default_action: str):
+        if default_action not in templates:
+            raise TemplateError(f"Default action '{default_action}' has no template")
+        self.templates = templates
+        self.default_action = default_action
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_TEMPLATES_PATH) -> "TemplateRegistry":
+        try:
+            with open(path, encoding="utf-8") as f:
+                config = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            raise TemplateError(f"Could not load prompt templates from {path}: {e}") from e
+
+        templates = {
+            action: PromptTemplate(
+                action=action,
+                label=spec.get("label", action),
+                template=Template(spec["template"]),
+                system=spec.get("system"),
+                model=spec.get("model"),
+                options=dict(spec.get("options") or {}),
+                reduce=Template(spec["reduce"]) if spec.get("reduce") else None,
+                rewrite=bool(spec.get("rewrite", False)),
+            )
+            for action, spec in config.get("actions", {}).items()
+        }
+        return cls(templates, config.get("default_action", "raw"))
+
+    def actions(self) -> List[str]:
+        return list(self.templates)
+
+    def get(self, action: Optional[str]) -> PromptTemplate:
+        template = self.templates.get(action or self.default_action)
+        if template is None:
+            raise TemplateError(f"Unknown action '{action}'")
+        return template
+
+    def route(self, action: Optional[str], default_model: str,
+              available_models: Optional[List[str]] = None) -> str:
+        """Model that should answer action"""
+        model = self.get(action).model or default_model
+        if available_models is not None and model not in available_models:
+            return default_model
+        return model
+
+    def render(self, action: Optional[str], text: str, default_model: str,
+               available_models: Optional[List[str]] = None, **params: str) -> RenderedPrompt:
+        """Build the prompt for action and pick its model
+
+        The action's own model is used unless it has none or it is not in
+        available_models (when given), in which case default_model answers.
+        """
+        template = self.get(action)
+        return RenderedPrompt(
+            action=template.action,
+            model=self.route(action, default_model, available_models),
+            user=template.render(text, **params),
+            system=template.system,
+            options=dict(template.options),
+            template=template,
+            params=params,
+        )
+
+
+_registry: Optional[TemplateRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> TemplateRegistry:
+    """The process-wide registry, loaded on first use"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = TemplateRegistry.load(os.environ.get("PROMPT_TEMPLATES", DEFAULT_TEMPLATES_PATH))
+        return _registry
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Structured per-request metrics
+Every Ollama request gets a RequestTrace that collects where its time went:
+- queue_wait: time in the scheduler queue before a worker picked it up
+- ttft / request: time to first token and to the last byte of the HTTP response
+- load, prompt_eval, generation, ollama_total: Ollama's own durations (seconds)
+- network: request time not accounted for by Ollama (transport and serialisation)
+- render: time spent in the UI inserting the response
+Finished traces are appended to logs/metrics.jsonl (one JSON object per line, through
+the rotating log pipeline) and summarised per model over a rolling window.
+StallMonitor measures how responsive the Tk main loop itself stays.
+"""
+
+import json
+import logging
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, Optional
+
+from log_pipeline import LogPipeline
+from request_scheduler import percentile
+
+MetricsRecord = Dict[str, Any]
+
+
+class RequestTrace:
+    """Timings of one request, filled in as it moves through the queue, network and UI"""
+
+    def __init__(self, model: str, stream: bool, queue_wait: float = 0.0, cached: bool = False):
+        self.model = model
+        self.stream = stream
+        self.queue_wait = queue_wait
+        self.cached = cached
+        self.started_at = time.time()
+        self.first_token_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.render = 0.0
+        self.status = "ok"
+        self.error: Optional[str] = None
+        self.response_chars = 0
+        self.ollama: Dict[str, Any] = {}
+
+    def mark_first_token(self):
+        if self.first_token_at is None:
+            self.first_token_at = time.time()
+
+    def finish(self, final_chunk: Optional[Dict[str, Any]] = None, response_chars: int = 0,
+               status: str = "ok", error: Optional[str] = None):
+        """Stop the request clock and keep Ollama's counters from the final chunk"""
+        self.finished_at = time.time()
+        self.ollama = dict(final_chunk or {})
+        self.response_chars = response_chars
+        self.status = status
+        self.error = error
+
+    def timed(self, fn: Callable[..., Any]) -> Callable[..., Any]:
+        """Wrap a UI callback so the time it takes is counted as render time"""
+        def run(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.render += time.perf_counter() - start
+        return run
+
+    def to_record(self) -> MetricsRecord:
+        finished = self.finished_at or time.time()
+        request_time = finished - self.started_at
+        ollama_total = self.ollama.get("total_duration", 0) / 1e9
+        eval_count = self.ollama.get("eval_count")
+        eval_duration = self.ollama.get("eval_duration", 0) / 1e9
+        return {
+            "ts": datetime.fromtimestamp(self.started_at).isoformat(timespec="milliseconds"),
+            "model": self.model,
+            "stream": self.stream,
+            "cached": self.cached,
+            "status": self.status,
+            "error": self.error,
+            "queue_wait": round(self.queue_wait, 4),
+            "ttft": round(self.first_token_at - self.started_at, 4) if self.first_token_at else None,
+            "request": round(request_time, 4),
+            "network": round(max(request_time - ollama_total, 0.0), 4) if ollama_total else None,
+            "render": round(self.render, 4),
+            "total": round(self.queue_wait + request_time + self.render, 4),
+            "load": self.ollama.get("load_duration", 0) / 1e9,
+            "prompt_eval": self.ollama.get("prompt_eval_duration", 0) / 1e9,
+            "generation": eval_duration,
+            "ollama_total": ollama_total,
+            "prompt_eval_count": self.ollama.get("prompt_eval_count"),
+            "eval_count": eval_count,
+            "tokens_per_sec": round(eval_count / eval_duration, 2) if eval_count and eval_duration else None,
+            "response_chars": self.response_chars,
+        }
+
+
+class MetricsRecorder:
+    """Writes metrics records to a JSONL log and keeps a rolling window per model"""
+
+    def __init__(self, logs_dir: str = "logs", filename: str = "metrics.jsonl", window: int = 200):
+        self.window = window
+        self.records: Dict[str, Deque[MetricsRecord]] = {}
+        self.counts: Dict[str, Dict[str, int]] = {}
+
+        self._pipeline = LogPipeline(logs_dir)
+        self._logger = self._pipeline.add_logger("OllamaMetrics", filename, logging.Formatter("%(message)s"))
+        self._pipeline.start()
+
+    def record(self, trace: RequestTrace) -> MetricsRecord:
+        """Log a finished trace and add it to its model's rolling window"""
+        record = trace.to_record()
+        self._logger.info(json.dumps(record, ensure_ascii=False))
+
+        counts = self.counts.setdefault(trace.model, {"ok": 0, "error": 0, "cancelled": 0, "cached": 0})
+        if trace.cached:
+            counts["cached"] += 1
+        else:
+            counts[trace.status] = counts.get(trace.status, 0) + 1
+            if trace.status == "ok":
+                self.records.setdefault(trace.model, deque(maxlen=self.window)).append(record)
+        return record
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Rolling p50/p95 timings and tokens/sec for each model"""
+        result = {}
+        for model, counts in self.counts.items():
+            records = list(self.records.get(model, ()))
+
+            def values(field):
+                return [r[field] for r in records if r.get(field) is not None]
+
+            rates = values("tokens_per_sec")
+            result[model] = {
+                **counts,
+                "total_p50": percentile(values("total"), 50),
+                "total_p95": percentile(values("total"), 95),
+                "ttft_p50": percentile(values("ttft"), 50),
+                "ttft_p95": percentile(values("ttft"), 95),
+                "queue_wait_p95": percentile(values("queue_wait"), 95),
+                "network_p50": percentile(values("network"), 50),
+                "render_p50": percentile(values("render"), 50),
+                "load_p50": percentile(values("load"), 50),
+                "tokens_per_sec": sum(rates) / len(rates) if rates else 0.0,
+            }
+        return result
+
+    def close(self):
+        self._pipeline.stop()
+
+
+class StallMonitor:
+    """Measures how late the Tk main loop runs a timer due every interval seconds
+
+    Lateness is time the UI thread spent blocked (or waiting for the GIL) instead of
+    handling events; a few milliseconds is normal scheduling noise.
+    """
+
+    def __init__(self, root, interval: float = 0.05, window: int = 1200):
+        self.root = root
+        self.interval = interval
+        self.lateness: Deque[float] = deque(maxlen=window)
+        self.worst = 0.0
+        self._due = 0.0
+
+    def start(self):
+        self._due = time.perf_counter() + self.interval
+        self.root.after(int(self.interval * 1000), self._tick)
+
+    def _tick(self):
+        now = time.perf_counter()
+        late = max(0.0, now - self._due)
+        self.lateness.append(late)
+        self.worst = max(self.worst, late)
+        self._due = now + self.interval
+        self.root.after(int(self.interval * 1000), self._tick)
+
+    def summary(self) -> Dict[str, float]:
+        """p50/p99 lateness over the window and the worst seen, in milliseconds"""
+        values = list(self.lateness)
+        return {"p50_ms": percentile(values, 50) * 1000, "p99_ms": percentile(values, 99) * 1000,
+                "max_ms": self.worst * 1000}
+
+
+def format_summary(summary: Dict[str, Dict[str, Any]]) -> str:
+    """Plain-text table of MetricsRecorder.summary() for display in a fixed-width font"""
+    if not summary:
+        return "No requests yet"
+    lines = [f"{'model':<20} {'ok':>4} {'err':>4} {'p50':>7} {'p95':>7} {'ttft50':>7} "
+             f"{'ttft95':>7} {'wait95':>7} {'net50':>7} {'rend50':>7} {'tok/s':>7}"]
+    for model, s in sorted(summary.items()):
+        lines.append(
+            f"{model[:20]:<20} {s['ok']:>4} {s['error']:>4} {s['total_p50']:>6.2f}s {s['total_p95']:>6.2f}s "
+            f"{s['ttft_p50']:>6.2f}s {s['ttft_p95']:>6.2f}s {s['queue_wait_p95']:>6.2f}s "
+            f"{s['network_p50']:>6.2f}s {s['render_p50']:>6.3f}s {s['tokens_per_sec']:>7.1f}")
+    return "\n".join(lines)
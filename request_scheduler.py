@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Bounded request scheduler for Ollama calls
+- Fixed pool of worker threads with a per-model in-flight limit
+- Cancellable handles (cancel hooks close the HTTP stream so Ollama stops generating)
+- Coalescing of identical requests that are still queued or running
+- Queue depth and wait-time metrics
+"""
+
+import math
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Set
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of values (0 for an empty list)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = math.ceil(pct / 100 * len(ordered))
+    return ordered[min(len(ordered), max(rank, 1)) - 1]
+
+
+class RequestCancelled(Exception):
+    """Raised by RequestHandle.result() when the request was cancelled"""
+
+
+class RequestHandle:
+    """A queued or running request"""
+
+    def __init__(self, fn: Callable[["RequestHandle"], Any], model: str, key: Optional[str]):
+        self.fn = fn
+        self.model = model
+        self.key = key
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.coalesced = 0  # Number of later submits merged into this one
+
+        self._result: Any = None
+        self._error: Optional[BaseException] = None
+        self._cancelled = threading.Event()
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+        self._cancel_hooks: List[Callable[[], Any]] = []
+        self._done_callbacks: List[Callable[["RequestHandle"], Any]] = []
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    @property
+    def wait_time(self) -> Optional[float]:
+        """Seconds spent queued before a worker picked the request up"""
+        if self.started_at is None:
+            return None
+        return self.started_at - self.submitted_at
+
+    def on_cancel(self, hook: Callable[[], Any]):
+        """Register a hook (e.g. closing a stream) to run when the request is cancelled"""
+        with self._lock:
+            if not self._cancelled.is_set():
+                self._cancel_hooks.append(hook)
+                return
+        hook()
+
+    def cancel(self):
+        """Cancel the request; queued requests never start, running ones have their hooks fired"""
+        with self._lock:
+            if self._cancelled.is_set() or self._done.is_set():
+                return
+            self._cancelled.set()
+            hooks, self._cancel_hooks = self._cancel_hooks, []
+        for hook in hooks:
+            try:
+                hook()
+            except Exception as e:
+                print(f"❌ Cancel hook error: {e}")
+
+    def add_done_callback(self, callback: Callable[["RequestHandle"], Any]):
+        with self._lock:
+            if not self._done.is_set():
+                self._done_callbacks.append(callback)
+                return
+        callback(self)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+    def result(self, timeout: Optional[float] = None) -> Any:
+        """Block until finished and return the result (raises the request's error)"""
+        if not self._done.wait(timeout):
+            raise TimeoutError("Request still running")
+        if self._error is not None:
+            raise self._error
+        if self.cancelled:
+            raise RequestCancelled()
+        return self._result
+
+    def _finish(self, result: Any = None, error: Optional[BaseException] = None):
+        self.finished_at = time.time()
+        self._result = result
+        self._error = error
+        with self._lock:
+            self._done.set()
+            callbacks, self._done_callbacks = self._done_callbacks, []
+        for callback in callbacks:
+            try:
+                callback(self)
+            except Exception as e:
+                print(f"❌ Done callback error: {e}")
+
+
+class RequestScheduler:
+    """Worker pool that runs request functions with a per-model concurrency cap"""
+
+    def __init__(self, max_workers: int = 4, per_model_limit: int = 1, history_size: int = 500):
+        self.max_workers = max_workers
+        self.per_model_limit = per_model_limit
+
+        self._queue: Deque[RequestHandle] = deque()
+        self._running: Dict[str, int] = {}
+        self._by_key: Dict[str, RequestHandle] = {}
+        self._active: Set[RequestHandle] = set()
+        self._cond = threading.Condition()
+        self._shutdown = False
+
+        self._wait_times: Deque[float] = deque(maxlen=history_size)
+        self._counters = {"submitted": 0, "completed": 0, "failed": 0, "cancelled": 0, "coalesced": 0}
+
+        for i in range(max_workers):
+            threading.Thread(target=self._worker, name=f"ollama-worker-{i}", daemon=True).start()
+
+    def submit(self, fn: Callable[[RequestHandle], Any], model: str,
+               key: Optional[str] = None) -> RequestHandle:
+        """Queue fn(handle); identical keys still queued or running share one handle"""
+        with self._cond:
+            if key is not None:
+                existing = self._by_key.get(key)
+                if existing is not None and not existing.cancelled and not existing.done:
+                    existing.coalesced += 1
+                    self._counters["coalesced"] += 1
+                    return existing
+
+            handle = RequestHandle(fn, model, key)
+            if key is not None:
+                self._by_key[key] = handle
+            self._queue.append(handle)
+            self._counters["submitted"] += 1
+            self._cond.notify_all()
+        return handle
+
+    def _next_runnable(self) -> Optional[RequestHandle]:
+        """Pop the oldest queued request whose model is under its limit (caller holds the lock)"""
+        for handle in list(self._queue):
+            if handle.cancelled:
+                self._queue.remove(handle)
+                self._forget(handle)
+                self._counters["cancelled"] += 1
+                handle._finish()
+                continue
+            if self._running.get(handle.model, 0) < self.per_model_limit:
+                self._queue.remove(handle)
+                return handle
+        return None
+
+    def _forget(self, handle: RequestHandle):
+        if handle.key is not None and self._by_key.get(handle.key) is handle:
+            del self._by_key[handle.key]
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                handle = self._next_runnable()
+                while handle is None and not self._shutdown:
+                    self._cond.wait(0.5)
+                    handle = self._next_runnable()
+                if self._shutdown:
+                    return
+                self._running[handle.model] = self._running.get(handle.model, 0) + 1
+                self._active.add(handle)
+                handle.started_at = time.time()
+                self._wait_times.append(handle.wait_time)
+
+            result, error = None, None
+            try:
+                result = handle.fn(handle)
+            except BaseException as e:
+                error = e
+
+            with self._cond:
+                self._running[handle.model] -= 1
+                self._active.discard(handle)
+                self._forget(handle)
+                if handle.cancelled:
+                    self._counters["cancelled"] += 1
+                elif error is not None:
+                    self._counters["failed"] += 1
+                else:
+                    self._counters["completed"] += 1
+                self._cond.notify_all()
+
+            # A cancelled request's error is just the closed stream
+            handle._finish(result, None if handle.cancelled else error)
+
+    def cancel_all(self):
+        """Cancel every queued and running request"""
+        with self._cond:
+            handles = list(self._active) + list(self._queue)
+        for handle in handles:
+            handle.cancel()
+
+    def metrics(self) -> Dict[str, Any]:
+        """Queue depth, in-flight count and wait-time statistics"""
+        with self._cond:
+            waits = list(self._wait_times)
+            return {
+                "queue_depth": len(self._queue),
+                "in_flight": sum(self._running.values()),
+                "in_flight_by_model": {m: n for m, n in self._running.items() if n},
+                "wait_avg": sum(waits) / len(waits) if waits else 0.0,
+                "wait_p95": percentile(waits, 95),
+                "wait_max": max(waits) if waits else 0.0,
+                **self._counters,
+            }
+
+    def shutdown(self, cancel: bool = True):
+        if cancel:
+            self.cancel_all()
+        with self._cond:
+            self._shutdown = True
+            self._cond.notify_all()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Failure handling for the Ollama transport
+- RetryPolicy: jittered exponential backoff for idempotent calls (tags, ps, show)
+- CircuitBreaker: after a few consecutive connection failures every call fails at once
+  instead of waiting on timeouts; after a cool-down one trial call is let through
+- HealthProber: background probe that reports reachability to the status indicator,
+  polling faster while the server is down so recovery shows up quickly
+"""
+
+import random
+import threading
+import time
+from typing import Callable, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class RetryPolicy:
+    """How often and how long to wait before retrying a failed idempotent call"""
+
+    def __init__(self, attempts: int = 3, base_delay: float = 0.2, max_delay: float = 2.0):
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int) -> float:
+        """Full jitter: uniform between 0 and the exponential backoff for this attempt"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+NO_RETRY = RetryPolicy(attempts=1)
+
+
+class CircuitBreaker:
+    """Closed -> open after failure_threshold consecutive failures -> half-open after reset_timeout
+
+    While open, allow() is False. Once reset_timeout has passed a single caller is let
+    through; its success closes the circuit, its failure opens it for another reset_timeout.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 10.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            now = time.monotonic()
+            if now - self.opened_at >= self.reset_timeout:
+                # This caller is the trial; another one is allowed if it never reports back
+                self.state = self.HALF_OPEN
+                self.opened_at = now
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    @property
+    def is_open(self) -> bool:
+        return self.state != self.CLOSED and self.retry_in() > 0
+
+    def retry_in(self) -> float:
+        """Seconds until the next trial call is allowed (0 when calls go through)"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+
+class HealthProber(Generic[T]):
+    """Runs probe() every interval seconds (down_interval while it fails) on a daemon thread
+
+    on_result(result, error) is called from the prober thread after every probe.
+    poke() makes the next probe run right away, e.g. after a request failed.
+    """
+
+    def __init__(self, probe: Callable[[], T], on_result: Callable[[Optional[T], Optional[Exception]], None],
+                 interval: float = 15.0, down_interval: float = 3.0):
+        self.probe = probe
+        self.on_result = on_result
+        self.interval = interval
+        self.down_interval = down_interval
+        self.healthy: Optional[bool] = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def check(self) -> bool:
+        """Probe once on the calling thread and report the result"""
+        try:
+            result = self.probe()
+        except Exception as e:
+            self.healthy = False
+            self.on_result(None, e)
+        else:
+            self.healthy = True
+            self.on_result(result, None)
+        return self.healthy
+
+    def start(self):
+        if self._thread is not None:
+            return
+
+        def run():
+            while not self._stop.is_set():
+                self._wake.wait(self.interval if self.healthy else self.down_interval)
+                self._wake.clear()
+                if not self._stop.is_set():
+                    self.check()
+
+        self._thread = threading.Thread(target=run, name="health-prober", daemon=True)
+        self._thread.start()
+
+    def poke(self):
+        self._wake.set()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate index over past prompts
+Each prompt is reduced to a MinHash signature of its lowercased word 3-shingles, and
+signatures are bucketed by band (LSH), so a prompt that differs from an earlier one by
+whitespace, case, a fixed typo or a changed word finds it without comparing against
+every entry. Candidates from the buckets are kept only if their estimated Jaccard
+similarity reaches the threshold. Entries are scoped by model and action and evicted
+least recently used first by count and total response size.
+"""
+
+import hashlib
+import random
+import re
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+_WORD = re.compile(r"\w+")
+_PRIME = (1 << 61) - 1  # Mersenne prime modulus of the hash permutations
+
+SHINGLE_WORDS = 3
+NUM_PERM = 64
+BANDS = 16  # NUM_PERM / BANDS rows per band: pairs above ~0.5 similarity share a bucket
+
+
+def shingles(text: str, size: int = SHINGLE_WORDS) -> Set[str]:
+    """Lowercased runs of size consecutive words (the whole text if it is shorter)"""
+    words = _WORD.findall(text.lower())
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _permutations(count: int, seed: int = 1) -> List[Tuple[int, int]]:
+    rng = random.Random(seed)
+    return [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(count)]
+
+
+_PERMUTATIONS = _permutations(NUM_PERM)
+
+
+def signature(text: str) -> Optional[array]:
+    """MinHash signature of text's shingles, or None if it has no words"""
+    hashes = [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little")
+              for s in shingles(text)]
+    if not hashes:
+        return None
+    return array("Q", [min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS])
+
+
+def similarity(a: array, b: array) -> float:
+    """Estimated Jaccard similarity of the shingle sets behind two signatures"""
+    return sum(1 for x, y in zip(a, b) if x == y) / len(a)
+
+
+@dataclass
+class SimilarMatch:
+    """An earlier response offered for a near-duplicate prompt"""
+
+    response: str
+    similarity: float
+    created_at: float
+
+
+@dataclass
+class _Entry:
+    scope: Tuple[str, str]
+    signature: array
+    response: str
+    size: int
+    created_at: float
+
+
+class SimilarPromptIndex:
+    """In-memory MinHash LSH index from prompts to their responses"""
+
+    def __init__(self, threshold: float = 0.85, max_entries: int = 2000,
+                 max_bytes: int = 16 * 1024 * 1024, min_words: int = 8, max_chars: int = 20_000):
+        self.threshold = threshold  # Minimum estimated similarity for lookup() to return a match
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes  # Bound on the stored responses' total size
+        self.min_words = min_words  # Shorter prompts change meaning with one word, so they are not matched
+        self.max_chars = max_chars  # Longer prompts are not indexed (signature cost grows with length)
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()  # Least recently used first
+        self._buckets: Dict[int, Set[int]] = {}
+        self._bytes = 0
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def _signature(self, text: str) -> Optional[array]:
+        if len(text) > self.max_chars or len(_WORD.findall(text)) < self.min_words:
+            return None
+        return signature(text)
+
+    @staticmethod
+    def _band_keys(scope: Tuple[str, str], sig: array) -> List[int]:
+        rows = NUM_PERM // BANDS
+        return [hash((scope, band, tuple(sig[band * rows:(band + 1) * rows]))) for band in range(BANDS)]
+
+    def add(self, model: str, action: str, prompt: str, response: str, created_at: Optional[float] = None):
+        """Index a prompt's response; replaces an entry whose prompt has the same shingles"""
+        sig = self._signature(prompt)
+        size = len(response.encode("utf-8"))
+        if sig is None or size > self.max_bytes:
+            return
+        scope = (model, action)
+        keys = self._band_keys(scope, sig)
+        with self._lock:
+            for entry_id in set().union(*(self._buckets.get(key, ()) for key in keys)):
+                entry = self._entries[entry_id]
+                if entry.scope == scope and entry.signature == sig:
+                    self._remove(entry_id)
+            self._next_id += 1
+            self._entries[self._next_id] = _Entry(scope, sig, response, size,
+                                                  time.time() if created_at is None else created_at)
+            for key in keys:
+                self._buckets.setdefault(key, set()).add(self._next_id)
+            self._bytes += size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, entry_id: int):
+        entry = self._entries.pop(entry_id)
+        self._bytes -= entry.size
+        for key in self._band_keys(entry.scope, entry.signature):
+            bucket = self._buckets[key]
+            bucket.discard(entry_id)
+            if not bucket:
+                del self._buckets[key]
+
+    def lookup(self, model: str, action: str, prompt: str) -> Optional[SimilarMatch]:
+        """The most similar earlier response at or above the threshold, newest on a tie"""
+        sig = self._signature(prompt)
+        if sig is None:
+            return None
+        scope = (model, action)
+        keys = self._band_keys(scope, sig)
+        with self._lock:
+            best_id, best = None, (self.threshold, 0.0)
+            for entry_id in set().union(*(self._buckets.get(key, ()) for key in keys)):
+                entry = self._entries[entry_id]
+                if entry.scope != scope:
+                    continue
+                score = (similarity(sig, entry.signature), entry.created_at)
+                if score >= best:
+                    best_id, best = entry_id, score
+            if best_id is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best_id)
+            self.hits += 1
+            return SimilarMatch(self._entries[best_id].response, best[0], best[1])
+
+    def load(self, rows: Iterable[Dict[str, Any]]):
+        """Index history rows (oldest first) that have model, action, prompt, response and created_at"""
+        for row in rows:
+            self.add(row["model"], row["action"], row["prompt"], row["response"], row["created_at"])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "hits": self.hits, "misses": self.misses}
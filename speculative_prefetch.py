@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Speculative prefetch of responses for new clipboard content
+When the clipboard changes the apps can start generating right away, before Send is
+clicked. A prefetch job streams into a buffer; Send with the same request key takes the
+job over and replays what was already generated, then continues live. A newer clipboard
+value cancels the previous job (closing the stream stops Ollama generating), and at most
+max_jobs prefetches run at once.
+"""
+
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+from ollama_client import ChatChunk, ChatStream, Message, OllamaClient, OllamaError, collect_chat
+
+
+class PrefetchJob:
+    """One speculative generation; iterable like a ChatStream once taken over"""
+
+    def __init__(self, key: str, model: str):
+        self.key = key
+        self.model = model
+        self.started_at = time.time()
+        self.chunks: List[ChatChunk] = []
+        self.finished = False
+        self.error: Optional[BaseException] = None
+        self._stream: Optional[ChatStream] = None
+        self._cancelled = threading.Event()
+        self._cond = threading.Condition()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    @property
+    def usable(self) -> bool:
+        return not self.cancelled and self.error is None
+
+    def run(self, client: OllamaClient, messages: List[Message], options: Optional[Dict[str, Any]],
+            keep_alive: Optional[str]):
+        try:
+            stream = client.chat_stream(self.model, messages, options, keep_alive=keep_alive)
+            with self._cond:
+                self._stream = stream
+            if self.cancelled:
+                stream.close()
+            for chunk in stream:
+                with self._cond:
+                    self.chunks.append(chunk)
+                    self._cond.notify_all()
+        except Exception as e:
+            self.error = e
+        finally:
+            with self._cond:
+                self.finished = True
+                self._cond.notify_all()
+
+    def cancel(self):
+        self._cancelled.set()
+        with self._cond:
+            stream = self._stream
+            self._cond.notify_all()
+        if stream is not None:
+            stream.close()
+
+    close = cancel  # So a taken job can be cancelled like a ChatStream
+
+    def __iter__(self) -> Iterator[ChatChunk]:
+        """Replay the buffered chunks, then follow the live stream"""
+        index = 0
+        while True:
+            with self._cond:
+                while index >= len(self.chunks) and not self.finished and not self.cancelled:
+                    self._cond.wait(1.0)
+                pending = self.chunks[index:]
+                ended = self.finished or self.cancelled
+            index += len(pending)
+            yield from pending
+            if ended and index >= len(self.chunks):
+                break
+        if self.error is not None and not self.cancelled:
+            raise self.error
+
+    def result(self) -> Dict[str, Any]:
+        """Wait for the whole reply and return it in the shape of OllamaClient.chat()"""
+        data = collect_chat(self)
+        if self.cancelled:
+            raise OllamaError("Prefetch cancelled")
+        return data
+
+
+class SpeculativePrefetcher:
+    """Starts, replaces and hands over prefetch jobs"""
+
+    def __init__(self, client: OllamaClient, max_jobs: int = 2, min_chars: int = 20,
+                 max_chars: int = 6000, keep_alive: Optional[str] = None):
+        self.client = client
+        self.max_jobs = max_jobs
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self.keep_alive = keep_alive
+        self.counts = {"started": 0, "used": 0, "discarded": 0, "skipped": 0}
+        self._jobs: Dict[str, PrefetchJob] = {}
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+
+    def qualifies(self, text: str) -> bool:
+        return self.min_chars <= len(text.strip()) <= self.max_chars
+
+    def start(self, key: str, model: str, messages: List[Message],
+              options: Optional[Dict[str, Any]] = None) -> Optional[PrefetchJob]:
+        """Prefetch a request, cancelling prefetches of older content
+
+        Returns None when the same request is already being prefetched or the
+        concurrency limit is reached (cancelled jobs count until their stream closes).
+        """
+        with self._lock:
+            existing = self._jobs.get(key)
+            if existing is not None and existing.usable:
+                return None
+            self._cancel_except(key)
+            self._threads = [t for t in self._threads if t.is_alive()]
+            if len(self._threads) >= self.max_jobs:
+                self.counts["skipped"] += 1
+                return None
+
+            job = self._jobs[key] = PrefetchJob(key, model)
+            thread = threading.Thread(target=job.run, args=(self.client, messages, options, self.keep_alive),
+                                      name="prefetch", daemon=True)
+            self._threads.append(thread)
+            self.counts["started"] += 1
+        thread.start()
+        return job
+
+    def take(self, key: str) -> Optional[PrefetchJob]:
+        """Hand over the prefetch for key (other prefetches are cancelled), or None"""
+        with self._lock:
+            job = self._jobs.pop(key, None)
+            self._cancel_except(None)
+            if job is None or not job.usable:
+                return None
+            self.counts["used"] += 1
+            return job
+
+    def cancel_all(self):
+        with self._lock:
+            self._cancel_except(None)
+
+    def _cancel_except(self, key: Optional[str]):
+        for other in [k for k in self._jobs if k != key]:
+            self._jobs.pop(other).cancel()
+            self.counts["discarded"] += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self.counts, "running": sum(t.is_alive() for t in self._threads)}
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Startup timing for the desktop apps
+Run an app with --profile-startup to print where its startup time goes: each top-level
+import, each construction phase on the main thread, the background init tasks that run
+after the first paint, and the time until the window is interactive.
+"""
+
+import builtins
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+PROFILE_FLAG = "--profile-startup"
+
+
+class StartupProfiler:
+    """Collects (name, start, end, thread) spans; does nothing unless enabled"""
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.started_at = time.perf_counter()
+        self.imports: List[Tuple[str, float]] = []
+        self.phases: List[Tuple[str, float, float, str]] = []
+        self.marks: List[Tuple[str, float]] = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_argv(cls, argv: Optional[List[str]] = None) -> "StartupProfiler":
+        return cls(enabled=PROFILE_FLAG in (sys.argv if argv is None else argv))
+
+    @contextmanager
+    def track_imports(self) -> Iterator[None]:
+        """Time each import statement inside the block that loads new modules"""
+        if not self.enabled:
+            yield
+            return
+        original = builtins.__import__
+        depth = 0
+
+        def timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+            nonlocal depth
+            if level or depth:
+                return original(name, globals, locals, fromlist, level)
+            depth += 1
+            loaded = len(sys.modules)
+            start = time.perf_counter()
+            try:
+                return original(name, globals, locals, fromlist, level)
+            finally:
+                depth -= 1
+                if len(sys.modules) > loaded:  # Only imports that actually loaded something
+                    label = f"from {name} import {', '.join(fromlist)}" if fromlist else f"import {name}"
+                    label = label if len(label) <= 60 else label[:57] + "..."
+                    self.imports.append((label, time.perf_counter() - start))
+
+        builtins.__import__ = timed_import
+        try:
+            yield
+        finally:
+            builtins.__import__ = original
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            if self.enabled:
+                with self._lock:
+                    self.phases.append((name, start, time.perf_counter(), threading.current_thread().name))
+
+    def mark(self, name: str):
+        if self.enabled:
+            with self._lock:
+                self.marks.append((name, time.perf_counter()))
+
+    def run_concurrently(self, tasks: Dict[str, Callable[[], None]],
+                         on_done: Optional[Callable[[], None]] = None):
+        """Run each task on its own daemon thread, timed as a phase; on_done runs after the last one
+
+        A failing task is printed and counted as finished so it cannot hold up the others.
+        """
+        remaining = len(tasks)
+        lock = threading.Lock()
+
+        def run(name: str, task: Callable[[], None]):
+            nonlocal remaining
+            try:
+                with self.phase(name):
+                    task()
+            except Exception as e:
+                print(f"Startup task {name} failed: {e}")
+            with lock:
+                remaining -= 1
+                last = remaining == 0
+            if last and on_done:
+                on_done()
+
+        if not tasks and on_done:
+            on_done()
+        for name, task in tasks.items():
+            threading.Thread(target=run, args=(name, task), name=f"init-{name}", daemon=True).start()
+
+    def report(self) -> str:
+        """Import, phase and milestone breakdown, in milliseconds since the profiler started"""
+        def ms(seconds: float) -> str:
+            return f"{seconds * 1000:8.1f} ms"
+
+        lines = ["⏱️  Startup profile", "Imports:"]
+        for name, elapsed in sorted(self.imports, key=lambda item: -item[1]):
+            lines.append(f"  {ms(elapsed)}  {name}")
+        lines.append(f"  {ms(sum(elapsed for _, elapsed in self.imports))}  total")
+        lines.append("Phases (start → duration, thread):")
+        with self._lock:
+            phases = sorted(self.phases, key=lambda phase: phase[1])
+            marks = list(self.marks)
+        for name, start, end, thread in phases:
+            lines.append(f"  {ms(start - self.started_at)} → {ms(end - start)}  {name} [{thread}]")
+        lines.append("Milestones:")
+        for name, at in marks:
+            lines.append(f"  {ms(at - self.started_at)}  {name}")
+        return "\n".join(lines)
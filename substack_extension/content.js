@@ -468,10 +468,12 @@ class SubstackAIIntegration {
         }
         
         const prompt = this.generatePrompt(action, textToProcess);
-        await this.callOllamaAPI(prompt, action);
+        await this.callOllamaAPI(prompt, action, textToProcess);
     }
     
     generatePrompt(action, text) {
+        // Fallback for when the gateway is not running; the gateway renders these from
+        // prompt_templates.json and routes each action to its own model
         const prompts = {
             improve: `Improve the following text to make it more engaging, clear, and well-written while maintaining the original meaning and tone:\n\n${text}`,
             summarize: `Provide a concise summary of the following text:\n\n${text}`,
@@ -483,23 +485,39 @@ class SubstackAIIntegration {
         return prompts[action] || prompts.improve;
     }
     
-    async callOllamaAPI(prompt, action) {
+    async callOllamaAPI(prompt, action, text) {
         try {
             console.log('🤖 Calling Ollama API for:', action);
             
-            const response = await fetch('http://localhost:11434/api/chat', {
+            const chatRequest = (body) => ({
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
                 },
                 body: JSON.stringify({
-                    model: 'gemma3:1b',
-                    messages: [{ role: 'user', content: prompt }],
-                    stream: false
+                    ...body,
+                    stream: false,
+                    keep_alive: '30m' // Keep the model loaded between selections
                 }),
                 signal: AbortSignal.timeout(30000) // 30 second timeout
             });
             
+            // Prefer the local gateway (shared connection pool, cache and prompt templates), fall back to Ollama
+            let response;
+            try {
+                const gatewayBody = { action, messages: [{ role: 'user', content: text }] };
+                if (action === 'custom') {
+                    gatewayBody.instruction = this.aiPanel.querySelector('.custom-prompt').value;
+                }
+                response = await fetch('http://localhost:11435/api/chat', chatRequest(gatewayBody));
+            } catch (gatewayError) {
+                console.log('⚠️ Gateway unavailable, calling Ollama directly');
+                response = await fetch('http://localhost:11434/api/chat', chatRequest({
+                    model: 'gemma3:1b',
+                    messages: [{ role: 'user', content: prompt }]
+                }));
+            }
+            
             if (!response.ok) {
                 throw new Error(`HTTP ${response.status}`);
             }
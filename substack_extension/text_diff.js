@@ -0,0 +1,187 @@
+// Word-level diff between the selected text and the AI suggestion
+// Same algorithm as text_diff.py in the desktop app: Myers' O(ND) diff over word,
+// whitespace and punctuation tokens after trimming the common prefix and suffix.
+// StreamingDiff re-diffs only the unsettled tail of a streamed reply, so the overlay can
+// append each settled span instead of re-rendering the whole suggestion.
+
+const TextDiff = (() => {
+    const TOKEN = /\s+|[\p{L}\p{N}_]+|[^\p{L}\p{N}_\s]/gu;
+    const MAX_EDIT_COST = 2000; // Beyond this many edits the middle is reported as one replacement
+
+    function tokenize(text) {
+        return text.match(TOKEN) || [];
+    }
+
+    // Shortest edit script of a into b as [tag, i1, i2, j1, j2] opcodes, or null if it costs more than maxCost
+    function myers(a, b, maxCost) {
+        const n = a.length, m = b.length;
+        let v = new Map([[1, 0]]);
+        const trace = [];
+        for (let d = 0; d <= Math.min(n + m, maxCost); d++) {
+            trace.push(new Map(v));
+            for (let k = -d; k <= d; k += 2) {
+                let x = (k === -d || (k !== d && v.get(k - 1) < v.get(k + 1))) ? v.get(k + 1) : v.get(k - 1) + 1;
+                let y = x - k;
+                while (x < n && y < m && a[x] === b[y]) {
+                    x++;
+                    y++;
+                }
+                v.set(k, x);
+                if (x >= n && y >= m) {
+                    return backtrack(trace, n, m);
+                }
+            }
+        }
+        return null;
+    }
+
+    function backtrack(trace, n, m) {
+        const steps = [];
+        let x = n, y = m;
+        for (let d = trace.length - 1; d >= 0; d--) {
+            const v = trace[d];
+            const k = x - y;
+            const get = key => (v.has(key) ? v.get(key) : -1);
+            const prevK = (k === -d || (k !== d && get(k - 1) < get(k + 1))) ? k + 1 : k - 1;
+            const prevX = v.has(prevK) ? v.get(prevK) : 0;
+            const prevY = prevX - prevK;
+            while (x > prevX && y > prevY) {
+                x--;
+                y--;
+                steps.push(['equal', x, y]);
+            }
+            if (d > 0) {
+                steps.push(x === prevX ? ['insert', x, prevY] : ['delete', prevX, y]);
+            }
+            x = prevX;
+            y = prevY;
+        }
+
+        const opcodes = [];
+        for (const [tag, sx, sy] of steps.reverse()) {
+            const i2 = sx + (tag !== 'insert' ? 1 : 0);
+            const j2 = sy + (tag !== 'delete' ? 1 : 0);
+            const last = opcodes[opcodes.length - 1];
+            if (last && last[0] === tag) {
+                last[2] = i2;
+                last[4] = j2;
+            } else {
+                opcodes.push([tag, sx, i2, sy, j2]);
+            }
+        }
+        return opcodes;
+    }
+
+    function mergeReplaces(opcodes) {
+        const merged = [];
+        for (const op of opcodes) {
+            const last = merged[merged.length - 1];
+            if (last && op[0] !== 'equal' && last[0] !== 'equal') {
+                merged[merged.length - 1] = ['replace', last[1], op[2], last[3], op[4]];
+            } else {
+                merged.push(op);
+            }
+        }
+        return merged;
+    }
+
+    function diffTokens(a, b) {
+        const n = a.length, m = b.length;
+        let start = 0;
+        while (start < n && start < m && a[start] === b[start]) start++;
+        let end = 0;
+        while (end < n - start && end < m - start && a[n - 1 - end] === b[m - 1 - end]) end++;
+
+        const aMid = a.slice(start, n - end), bMid = b.slice(start, m - end);
+        // Pure insertion or deletion needs no search
+        const middle = (aMid.length && bMid.length && myers(aMid, bMid, MAX_EDIT_COST))
+            || [['replace', 0, aMid.length, 0, bMid.length]];
+        const opcodes = start ? [['equal', 0, start, 0, start]] : [];
+        for (const [tag, i1, i2, j1, j2] of middle) {
+            if (i1 !== i2 || j1 !== j2) {
+                opcodes.push([tag, i1 + start, i2 + start, j1 + start, j2 + start]);
+            }
+        }
+        if (end) {
+            opcodes.push(['equal', n - end, n, m - end, m]);
+        }
+        return mergeReplaces(opcodes);
+    }
+
+    // [tag, text] segments: equal, delete or insert
+    function segments(a, b, opcodes) {
+        const result = [];
+        for (const [tag, i1, i2, j1, j2] of opcodes) {
+            if (tag === 'equal') {
+                result.push(['equal', b.slice(j1, j2).join('')]);
+                continue;
+            }
+            if (i1 !== i2) result.push(['delete', a.slice(i1, i2).join('')]);
+            if (j1 !== j2) result.push(['insert', b.slice(j1, j2).join('')]);
+        }
+        return result;
+    }
+
+    function diffWords(oldText, newText) {
+        const a = tokenize(oldText), b = tokenize(newText);
+        return segments(a, b, diffTokens(a, b));
+    }
+
+    // [start, end, replacement] character edits of oldText, last first so offsets stay valid while applying
+    function charEdits(oldText, newText) {
+        const edits = [];
+        let offset = 0;
+        for (const [tag, text] of diffWords(oldText, newText)) {
+            const last = edits[edits.length - 1];
+            if (tag === 'equal') {
+                offset += text.length;
+            } else if (tag === 'delete') {
+                edits.push([offset, offset + text.length, '']);
+                offset += text.length;
+            } else if (last && last[1] === offset) {
+                last[2] = text; // Insert right after a delete: one replacement
+            } else {
+                edits.push([offset, offset, text]);
+            }
+        }
+        return edits.reverse();
+    }
+
+    class StreamingDiff {
+        // feed() returns only the segments settled since the last call; finish() returns the rest
+        constructor(original, holdback = 2, window = 16) {
+            this.original = tokenize(original);
+            this.holdback = holdback; // The last tokens may be a partial word
+            this.window = window;
+            this.tail = '';
+            this.a = 0;
+        }
+
+        feed(text) {
+            this.tail += text;
+            const b = tokenize(this.tail);
+            const ready = b.length - this.holdback;
+            if (ready <= 0) return [];
+            const a = this.original.slice(this.a, this.a + b.length + this.window);
+            const opcodes = diffTokens(a, b);
+            let settled = -1;
+            opcodes.forEach(([tag, , , , j2], index) => {
+                if (tag === 'equal' && j2 <= ready) settled = index;
+            });
+            if (settled < 0) return [];
+            const [, , i2, , j2] = opcodes[settled];
+            this.a += i2;
+            this.tail = b.slice(j2).join('');
+            return segments(a, b, opcodes.slice(0, settled + 1));
+        }
+
+        finish() {
+            const a = this.original.slice(this.a), b = tokenize(this.tail);
+            this.a = this.original.length;
+            this.tail = '';
+            return segments(a, b, diffTokens(a, b));
+        }
+    }
+
+    return { tokenize, diffWords, charEdits, StreamingDiff };
+})();
@@ -1,6 +1,24 @@
 // Substack AI Extension - UI Overlay Version
 console.log('🚀 SUBSTACK AI EXTENSION: Starting UI Overlay Version...');
 
+// System prompt - defines the AI's role and behavior. It is built once and sent unchanged
+// with every selection, so Ollama can reuse the already evaluated prompt prefix.
+const SYSTEM_PROMPT = `ROLE: You are a subtle writing assistant who enhances text naturally.
+TASK: Improve the selected text while preserving its original structure and tone.
+INSTRUCTIONS:
+- If the sentence is INCOMPLETE: Keep the original sentence exactly as written, only ADD words to complete it naturally. Do not rewrite or change existing words except to remove unnecessary prepositions if needed.
+- If the sentence is already COMPLETE: Make minor improvements for clarity and flow.
+- For incomplete sentences: preserve every original word and just extend the thought.
+- Maintain a natural, professional tone.
+- Keep output to 1-2 sentences maximum.
+- Focus on completion by addition, not transformation.
+EXAMPLES:
+- "this man is eating" → "this man is eating lunch at his desk"
+- "the car is fast" → "the car is fast enough to handle highway speeds"
+- "she was walking to" → "she was walking to the nearby coffee shop"
+- "I think that that" → "I think that this approach will work" (removing redundant preposition)
+OUTPUT_FORMAT: Return only the enhanced text, no explanations.`;
+
 class SubstackAIOverlay {
     constructor() {
         this.selectedText = '';
@@ -8,7 +26,9 @@ class SubstackAIOverlay {
         this.overlayTimeout = null;
         this.overlay = null;
         this.ollamaUrl = 'http://localhost:11434';
+        this.gatewayUrl = 'http://localhost:11435'; // Shared gateway (gateway_server.py), falls back to Ollama
         this.model = 'gemma3:1b';
+        this.keepAlive = '30m'; // Keep the model (and its cached prompt prefix) loaded between selections
         this.isActive = false;
         this.overlayDismissed = false; // Flag to prevent re-showing until new selection
         
@@ -217,6 +237,16 @@ class SubstackAIOverlay {
                 overflow-y: auto;
             }
             
+            .ai-suggestion ins {
+                background: #dcfce7;
+                color: #166534;
+                text-decoration: none;
+            }
+            
+            .ai-suggestion del {
+                color: #b91c1c;
+            }
+            
             .ai-loading {
                 display: flex;
                 align-items: center;
@@ -335,52 +365,37 @@ class SubstackAIOverlay {
     
     async processWithAI() {
         try {
-            // System prompt - defines the AI's role and behavior
-            const systemPrompt = `ROLE: You are a subtle writing assistant who enhances text naturally.
-TASK: Improve the selected text while preserving its original structure and tone.
-INSTRUCTIONS:
-- If the sentence is INCOMPLETE: Keep the original sentence exactly as written, only ADD words to complete it naturally. Do not rewrite or change existing words except to remove unnecessary prepositions if needed.
-- If the sentence is already COMPLETE: Make minor improvements for clarity and flow.
-- For incomplete sentences: preserve every original word and just extend the thought.
-- Maintain a natural, professional tone.
-- Keep output to 1-2 sentences maximum.
-- Focus on completion by addition, not transformation.
-EXAMPLES:
-- "this man is eating" → "this man is eating lunch at his desk"
-- "the car is fast" → "the car is fast enough to handle highway speeds"
-- "she was walking to" → "she was walking to the nearby coffee shop"
-- "I think that that" → "I think that this approach will work" (removing redundant preposition)
-OUTPUT_FORMAT: Return only the enhanced text, no explanations.`;
-
             // User prompt with the selected text
             const userPrompt = `[Input text: ${this.selectedText}]`;
             
-            const response = await fetch(`${this.ollamaUrl}/api/chat?t=${Date.now()}`, {
-                method: 'POST',
-                headers: { 
-                    'Content-Type': 'application/json'
-                },
-                body: JSON.stringify({
-                    model: this.model,
-                    messages: [
-                        { role: 'system', content: systemPrompt },
-                        { role: 'user', content: userPrompt }
-                    ],
-                    stream: false
-                }),
-                mode: 'cors'
+            const response = await this.postChat({
+                model: this.model,
+                messages: [
+                    { role: 'system', content: SYSTEM_PROMPT },
+                    { role: 'user', content: userPrompt }
+                ],
+                stream: true,
+                keep_alive: this.keepAlive
             });
             
             if (!response.ok) {
                 throw new Error(`HTTP ${response.status}`);
             }
             
-            const data = await response.json();
-            const improvedText = data.message.content;
+            // Render the suggestion as changes to the selection while it streams in
+            const differ = new TextDiff.StreamingDiff(this.selectedText);
+            let improvedText = '';
+            let diffView = null;
+            for await (const token of this.readTokens(response)) {
+                improvedText += token;
+                diffView = diffView || this.startSuggestion();
+                this.appendSegments(diffView, differ.feed(token));
+            }
+            this.appendSegments(diffView || this.startSuggestion(), differ.finish());
             
             console.log('✅ AI response received:', improvedText.substring(0, 100));
             
-            // Update overlay with suggestion
+            // Enable Copy and Apply
             this.showSuggestion(improvedText);
             
         } catch (error) {
@@ -389,15 +404,79 @@ OUTPUT_FORMAT: Return only the enhanced text, no explanations.`;
         }
     }
     
+    async postChat(body) {
+        // Prefer the local gateway (shared connection pool and cache); use Ollama directly if it is not running
+        const request = {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify(body),
+            mode: 'cors'
+        };
+        
+        if (this.gatewayUrl) {
+            try {
+                return await fetch(`${this.gatewayUrl}/api/chat`, request);
+            } catch (error) {
+                console.log('⚠️ Gateway unavailable, calling Ollama directly');
+                this.gatewayUrl = null;
+            }
+        }
+        return fetch(`${this.ollamaUrl}/api/chat`, request);
+    }
+    
+    async *readTokens(response) {
+        // Yield message content from an NDJSON /api/chat stream as it arrives
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffered = '';
+        while (true) {
+            const { done, value } = await reader.read();
+            buffered += decoder.decode(value || new Uint8Array(), { stream: !done });
+            const lines = buffered.split('\n');
+            buffered = done ? '' : lines.pop();
+            for (const line of lines) {
+                if (!line.trim()) continue;
+                const chunk = JSON.parse(line);
+                if (chunk.error) throw new Error(chunk.error);
+                if (chunk.message && chunk.message.content) yield chunk.message.content;
+                if (chunk.done) return;
+            }
+            if (done) return;
+        }
+    }
+    
+    startSuggestion() {
+        // Replace the loading message with an empty suggestion that segments are appended to
+        const suggestionDiv = this.overlay && this.overlay.querySelector('.ai-suggestion');
+        if (!suggestionDiv) return null;
+        suggestionDiv.innerHTML = '<strong>AI Suggestion:</strong><br>';
+        const diffView = document.createElement('span');
+        diffView.className = 'ai-diff';
+        suggestionDiv.appendChild(diffView);
+        return diffView;
+    }
+    
+    appendSegments(diffView, segments) {
+        // Only the new spans are added; unchanged text is plain, changes are <ins>/<del>
+        if (!diffView) return;
+        for (const [tag, text] of segments) {
+            const node = document.createTextNode(text);
+            if (tag === 'equal') {
+                diffView.appendChild(node);
+            } else {
+                const span = document.createElement(tag === 'insert' ? 'ins' : 'del');
+                span.appendChild(node);
+                diffView.appendChild(span);
+            }
+        }
+    }
+    
     showSuggestion(improvedText) {
         if (!this.overlay) return;
         
-        const suggestionDiv = this.overlay.querySelector('.ai-suggestion');
         const copyBtn = this.overlay.querySelector('.ai-btn-copy');
         const applyBtn = this.overlay.querySelector('.ai-btn-apply');
         
-        suggestionDiv.innerHTML = `<strong>AI Suggestion:</strong><br>${this.escapeHtml(improvedText)}`;
-        
         // Enable buttons
         copyBtn.disabled = false;
         applyBtn.disabled = false;
@@ -444,9 +523,11 @@ OUTPUT_FORMAT: Return only the enhanced text, no explanations.`;
                 return;
             }
             
-            // Replace the selected text in the HTML
-            this.currentSelection.deleteContents();
-            this.currentSelection.insertNode(document.createTextNode(cleanText));
+            // Edit only the changed words in place; replace the whole selection if that is not possible
+            if (!this.applyEdits(this.currentSelection, cleanText)) {
+                this.currentSelection.deleteContents();
+                this.currentSelection.insertNode(document.createTextNode(cleanText));
+            }
             
             console.log('✅ Improved text applied to HTML:', cleanText.substring(0, 50) + '...');
             
@@ -462,6 +543,46 @@ OUTPUT_FORMAT: Return only the enhanced text, no explanations.`;
         }
     }
     
+    applyEdits(range, newText) {
+        // Apply the word diff between the selection and newText to the selected text nodes.
+        // Returns false when the selection is not plain text, so the caller replaces it whole.
+        const pieces = []; // {node, start (offset in the selection text), offset (in the node), length}
+        let rangeText = '';
+        const root = range.commonAncestorContainer;
+        const walker = document.createTreeWalker(
+            root.nodeType === Node.TEXT_NODE ? root.parentNode : root, NodeFilter.SHOW_TEXT);
+        for (let node = walker.nextNode(); node; node = walker.nextNode()) {
+            if (!range.intersectsNode(node)) continue;
+            const offset = node === range.startContainer ? range.startOffset : 0;
+            const end = node === range.endContainer ? range.endOffset : node.length;
+            if (end <= offset) continue;
+            pieces.push({ node, start: rangeText.length, offset, length: end - offset });
+            rangeText += node.data.slice(offset, end);
+        }
+        if (!pieces.length || rangeText.trim() !== this.selectedText) return false;
+        
+        // Keep the whitespace around the selection; only the trimmed text was sent to the model
+        const leading = rangeText.match(/^\s*/)[0];
+        const trailing = rangeText.slice(leading.length + this.selectedText.length);
+        const edits = TextDiff.charEdits(rangeText, leading + newText + trailing);
+        
+        // Edits come last first, so earlier offsets stay valid as the nodes change
+        for (const [start, end, replacement] of edits) {
+            let inserted = false;
+            for (const piece of pieces) {
+                const pieceEnd = piece.start + piece.length;
+                if (end < piece.start || start > pieceEnd || (start === pieceEnd && inserted)) continue;
+                const from = Math.max(start, piece.start) - piece.start;
+                const to = Math.min(end, pieceEnd) - piece.start;
+                if (from === to && (inserted || start !== end)) continue;
+                piece.node.replaceData(piece.offset + from, to - from, inserted ? '' : replacement);
+                inserted = true;
+            }
+        }
+        console.log(`✏️ Applied ${edits.length} edit(s) in place`);
+        return true;
+    }
+    
     // extractImprovedText method removed - AI now returns only improved text
     
     hideOverlay() {
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Word-level diff between the input text and a model's rewrite
+diff_words() runs Myers' O(ND) algorithm over word and whitespace tokens after trimming
+the common prefix and suffix, so a rewrite that only touches a few words costs little
+even on a long document. Inputs with many tokens are diffed line by line first and only
+the changed lines word by word. StreamingDiff does the same while the rewrite streams in:
+it re-diffs only the not yet settled tail against a window of the original and hands
+back the segments that are settled, so a view can append them instead of redrawing.
+"""
+
+import re
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+# (tag, i1, i2, j1, j2) like difflib: a[i1:i2] became b[j1:j2]; tag is equal, delete, insert or replace
+Opcode = Tuple[str, int, int, int, int]
+# (tag, text) for rendering: equal, insert or delete
+Segment = Tuple[str, str]
+
+_TOKEN = re.compile(r"\s+|\w+|[^\w\s]")
+LINE_DIFF_TOKENS = 4000  # Inputs with more tokens than this are diffed line by line first
+MAX_EDIT_COST = 2000     # Myers gives up and reports one replace beyond this many edits
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into words, whitespace runs and single punctuation marks"""
+    return _TOKEN.findall(text)
+
+
+def _myers(a: Sequence[Hashable], b: Sequence[Hashable], max_cost: int) -> Optional[List[Opcode]]:
+    """Shortest edit script of a into b, or None when it needs more than max_cost edits"""
+    n, m = len(a), len(b)
+    v: Dict[int, int] = {1: 0}
+    trace: List[Dict[int, int]] = []
+    for d in range(min(n + m, max_cost) + 1):
+        trace.append(dict(v))
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and v[k - 1] < v[k + 1]):
+                x = v[k + 1]
+            else:
+                x = v[k - 1] + 1
+            y = x - k
+            while x < n and y < m and a[x] == b[y]:
+                x += 1
+                y += 1
+            v[k] = x
+            if x >= n and y >= m:
+                return _backtrack(trace, n, m)
+    return None
+
+
+def _backtrack(trace: List[Dict[int, int]], n: int, m: int) -> List[Opcode]:
+    steps: List[Tuple[str, int, int]] = []  # (tag, x, y) of each single-token move, last first
+    x, y = n, m
+    for d in range(len(trace) - 1, -1, -1):
+        v = trace[d]
+        k = x - y
+        if k == -d or (k != d and v.get(k - 1, -1) < v.get(k + 1, -1)):
+            prev_k = k + 1
+        else:
+            prev_k = k - 1
+        prev_x = v.get(prev_k, 0)
+        prev_y = prev_x - prev_k
+        while x > prev_x and y > prev_y:
+            x -= 1
+            y -= 1
+            steps.append(("equal", x, y))
+        if d > 0:
+            steps.append(("insert", x, prev_y) if x == prev_x else ("delete", prev_x, y))
+        x, y = prev_x, prev_y
+
+    opcodes: List[Opcode] = []
+    for tag, x, y in reversed(steps):
+        i2 = x + (tag != "insert")
+        j2 = y + (tag != "delete")
+        if opcodes and opcodes[-1][0] == tag:
+            opcodes[-1] = (tag, opcodes[-1][1], i2, opcodes[-1][3], j2)
+        else:
+            opcodes.append((tag, x, i2, y, j2))
+    return _merge_replaces(opcodes)
+
+
+def _merge_replaces(opcodes: List[Opcode]) -> List[Opcode]:
+    """Join adjacent delete/insert runs into replace opcodes"""
+    merged: List[Opcode] = []
+    for op in opcodes:
+        if merged and op[0] != "equal" and merged[-1][0] != "equal":
+            prev = merged[-1]
+            merged[-1] = ("replace", prev[1], op[2], prev[3], op[4])
+        else:
+            merged.append(op)
+    return merged
+
+
+def diff_tokens(a: Sequence[Hashable], b: Sequence[Hashable], max_cost: int = MAX_EDIT_COST) -> List[Opcode]:
+    """Opcodes turning token list a into b"""
+    n, m = len(a), len(b)
+    start = 0
+    while start < n and start < m and a[start] == b[start]:
+        start += 1
+    end = 0
+    while end < n - start and end < m - start and a[n - 1 - end] == b[m - 1 - end]:
+        end += 1
+
+    a_mid, b_mid = a[start:n - end], b[start:m - end]
+    middle = _myers(a_mid, b_mid, max_cost) if a_mid and b_mid else None
+    if middle is None:  # Pure insertion or deletion, or too many edits to be worth a fine diff
+        middle = [("replace", 0, len(a_mid), 0, len(b_mid))]
+    opcodes: List[Opcode] = [("equal", 0, start, 0, start)] if start else []
+    opcodes += [(tag, i1 + start, i2 + start, j1 + start, j2 + start) for tag, i1, i2, j1, j2 in middle
+                if i1 != i2 or j1 != j2]
+    if end:
+        opcodes.append(("equal", n - end, n, m - end, m))
+    return _merge_replaces(opcodes)
+
+
+def _segments(a: List[str], b: List[str], opcodes: List[Opcode]) -> List[Segment]:
+    segments: List[Segment] = []
+    for tag, i1, i2, j1, j2 in opcodes:
+        if tag == "equal":
+            segments.append(("equal", "".join(b[j1:j2])))
+            continue
+        if i1 != i2:
+            segments.append(("delete", "".join(a[i1:i2])))
+        if j1 != j2:
+            segments.append(("insert", "".join(b[j1:j2])))
+    return segments
+
+
+def diff_words(old: str, new: str) -> List[Segment]:
+    """(tag, text) segments that turn old into new, word by word"""
+    a, b = tokenize(old), tokenize(new)
+    if len(a) + len(b) <= LINE_DIFF_TOKENS:
+        return _segments(a, b, diff_tokens(a, b))
+
+    # Long input: match whole lines first, then diff only the lines that changed
+    old_lines, new_lines = old.splitlines(keepends=True), new.splitlines(keepends=True)
+    segments: List[Segment] = []
+    for tag, i1, i2, j1, j2 in diff_tokens(old_lines, new_lines):
+        if tag == "equal":
+            segments.append(("equal", "".join(new_lines[j1:j2])))
+        else:
+            a, b = tokenize("".join(old_lines[i1:i2])), tokenize("".join(new_lines[j1:j2]))
+            segments += _segments(a, b, diff_tokens(a, b))
+    return segments
+
+
+def char_edits(old: str, new: str) -> List[Tuple[int, int, str]]:
+    """(start, end, replacement) character edits of old, last first, so applying them in order keeps offsets valid"""
+    edits = []
+    offset = 0
+    for tag, text in diff_words(old, new):
+        if tag == "equal":
+            offset += len(text)
+        elif tag == "delete":
+            edits.append((offset, offset + len(text), ""))
+            offset += len(text)
+        elif edits and edits[-1][1] == offset:
+            start, end, _ = edits[-1]
+            edits[-1] = (start, end, text)  # Insert right after a delete: one replacement
+        else:
+            edits.append((offset, offset, text))
+    return edits[::-1]
+
+
+class StreamingDiff:
+    """Diff of original against a rewrite that arrives in pieces
+
+    feed() returns the segments that are settled so far (each is returned once); the last
+    few output tokens and the original text they may still match stay pending until more
+    output arrives or finish() is called. Only a window of the original just past the
+    settled point is compared, so each feed costs about the same however long the text is.
+    """
+
+    def __init__(self, original: str, holdback: int = 2, window: int = 16):
+        self.original = tokenize(original)
+        self.holdback = holdback  # Output tokens never settled early (the last word may be partial)
+        self.window = window
+        self._tail = ""  # Output after the settled point
+        self._a = 0  # Settled position in original tokens
+
+    def feed(self, text: str) -> List[Segment]:
+        self._tail += text
+        b = tokenize(self._tail)
+        ready = len(b) - self.holdback
+        if ready <= 0:
+            return []
+        a = self.original[self._a:self._a + len(b) + self.window]
+        opcodes = diff_tokens(a, b)
+        # Settle everything up to the last equal run that ends before the held-back tokens
+        settled = None
+        for index, (tag, i1, i2, j1, j2) in enumerate(opcodes):
+            if tag == "equal" and j2 <= ready:
+                settled = index
+        if settled is None:
+            return []
+        segments = _segments(a, b, opcodes[:settled + 1])
+        _, _, i2, _, j2 = opcodes[settled]
+        self._a += i2
+        self._tail = "".join(b[j2:])
+        return segments
+
+    def finish(self) -> List[Segment]:
+        """The remaining segments once the whole output has arrived"""
+        a, b = self.original[self._a:], tokenize(self._tail)
+        self._a, self._tail = len(self.original), ""
+        return _segments(a, b, diff_tokens(a, b))
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Bounded rendering for the response and history panes
+Tk Text slows down badly once it holds megabytes, so VirtualTextView keeps the full
+transcript as a list of blocks but only renders a window of them. Older or newer blocks
+are rendered as the user scrolls to the edge of the window, and a single block that grows
+past spill_chars (a huge response) has the rest written to a file instead of the widget.
+A block can mix tags (a streamed diff appends equal, inserted and deleted spans); each
+append inserts only its own span.
+"""
+
+import os
+import tkinter as tk
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple
+
+DEFAULT_SPILL_DIR = os.path.join("data", "spill")
+
+
+class _Block:
+    """One message in the transcript"""
+
+    def __init__(self, text: str, tag: Optional[str]):
+        self.text = text
+        self.tag = tag
+        self.runs: List[Tuple[int, Optional[str]]] = [(0, tag)]  # (start offset, tag) of each tag run
+        self.spill: Optional[TextIO] = None
+        self.spilled_chars = 0
+
+    def add_text(self, text: str, tag: Optional[str]):
+        if tag != self.runs[-1][1]:
+            if self.runs[-1][0] == len(self.text):
+                self.runs.pop()
+            self.runs.append((len(self.text), tag))
+        self.text += text
+
+    def spans(self) -> Iterator[Tuple[str, Tuple[str, ...]]]:
+        """(text, tags) of each run, as Text.insert takes them"""
+        for (start, tag), (end, _) in zip(self.runs, self.runs[1:] + [(len(self.text), None)]):
+            if end > start:
+                yield self.text[start:end], (tag,) if tag else ()
+
+
+class VirtualTextView:
+    """Renders a bounded window of a transcript into a (disabled) Tk Text widget"""
+
+    def __init__(self, text: tk.Text, scrollbar: tk.Scrollbar,
+                 max_rendered_chars: int = 200_000, max_blocks: int = 2000,
+                 spill_chars: int = 100_000, spill_dir: Optional[str] = DEFAULT_SPILL_DIR,
+                 page_blocks: int = 10):
+        self.text = text
+        self.scrollbar = scrollbar
+        self.max_rendered_chars = max_rendered_chars
+        self.max_blocks = max_blocks
+        self.spill_chars = spill_chars
+        self.spill_dir = spill_dir  # None drops the overflow instead of saving it
+        self.page_blocks = page_blocks
+
+        # blocks[i] has absolute index base + i; [first, last) are rendered
+        self.blocks: List[_Block] = []
+        self.base = 0
+        self.first = 0
+        self.last = 0
+        self._rendered: Dict[int, int] = {}  # Absolute index -> characters in the widget
+        self._loading = False
+
+        text.configure(yscrollcommand=self._on_scroll)
+
+    @property
+    def end(self) -> int:
+        return self.base + len(self.blocks)
+
+    @property
+    def following(self) -> bool:
+        """True while the newest block is rendered, so new output should be shown"""
+        return self.last == self.end
+
+    def rendered_chars(self) -> int:
+        return sum(self._rendered.values())
+
+    def add(self, text: str, tag: Optional[str] = None):
+        """Add a new block to the end of the transcript"""
+        self._close_spill(self.blocks[-1] if self.blocks else None)
+        block = _Block("", tag)
+        self.blocks.append(block)
+        following = self.last == self.end - 1
+        if following:
+            self._set_mark(self.end - 1, "end-1c")
+            self._rendered[self.end - 1] = 0
+            self.last = self.end
+        self._extend(block, self.end - 1, text, tag)
+        self._drop_old_blocks()
+        if following:
+            self._trim_top()
+            self.text.see(tk.END)
+
+    def append(self, text: str, tag: Optional[str] = None):
+        """Extend the newest block (streamed output), in tag if given, else in the block's tag"""
+        if not self.blocks:
+            self.add(text, tag)
+            return
+        block = self.blocks[-1]
+        self._extend(block, self.end - 1, text, tag or block.tag)
+        if self.following:
+            self._trim_top()
+            self.text.see(tk.END)
+
+    def clear(self):
+        for block in self.blocks:
+            self._close_spill(block)
+        self.blocks.clear()
+        self.base = self.first = self.last = self.end
+        for index in list(self._rendered):
+            self.text.mark_unset(self._mark(index))
+        self._rendered.clear()
+        self._edit(lambda: self.text.delete("1.0", tk.END))
+
+    def _extend(self, block: _Block, index: int, text: str, tag: Optional[str] = None):
+        """Add text to block, spilling whatever goes past spill_chars"""
+        if block.spill is None and block.spilled_chars == 0:
+            room = self.spill_chars - len(block.text)
+            shown, overflow = text[:room], text[room:]
+            if shown:
+                block.add_text(shown, tag)
+                self._insert_rendered(index, shown, tag)
+            if overflow:
+                notice = self._start_spill(block)
+                block.add_text(notice, block.tag)
+                self._insert_rendered(index, notice, block.tag)
+                text = overflow
+            else:
+                return
+        block.spilled_chars += len(text)
+        if block.spill is not None:
+            block.spill.write(text)
+
+    def _start_spill(self, block: _Block) -> str:
+        if self.spill_dir is None:
+            return "\n\n[… remaining output not shown]\n"
+        os.makedirs(self.spill_dir, exist_ok=True)
+        path = os.path.join(self.spill_dir, f"response_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.txt")
+        block.spill = open(path, 'w', encoding='utf-8')
+        block.spill.write(block.text)
+        return f"\n\n[… output too long to show; full text saved to {path}]\n"
+
+    @staticmethod
+    def _close_spill(block: Optional[_Block]):
+        if block is not None and block.spill is not None:
+            block.spill.close()
+            block.spill = None
+
+    def _insert_rendered(self, index: int, text: str, tag: Optional[str]):
+        if index not in self._rendered:
+            return
+        tags = (tag,) if tag else ()
+        insert_at = self._mark(index + 1) if index + 1 in self._rendered else "end-1c"
+        self._edit(lambda: self.text.insert(insert_at, text, tags))
+        self._rendered[index] += len(text)
+
+    def _render(self, index: int, at: str):
+        """Insert block index at position at ("1.0" or "end-1c") and mark its start"""
+        block = self.blocks[index - self.base]
+        args = [item for text, tags in block.spans() for item in (text, tags)]
+        # The block that used to start at "1.0" has to move right of the inserted text
+        pushed = self._mark(index + 1) if at == "1.0" and index + 1 in self._rendered else None
+        if pushed:
+            self.text.mark_gravity(pushed, tk.RIGHT)
+        self._set_mark(index, at)
+        if args:
+            self._edit(lambda: self.text.insert(at, *args))
+        if pushed:
+            self.text.mark_gravity(pushed, tk.LEFT)
+        self._rendered[index] = len(block.text)
+
+    def _set_mark(self, index: int, at: str):
+        # Left gravity keeps the mark in front of text inserted at its position
+        self.text.mark_set(self._mark(index), at)
+        self.text.mark_gravity(self._mark(index), tk.LEFT)
+
+    def _unrender(self, index: int):
+        start = self._mark(index)
+        end = self._mark(index + 1) if index + 1 in self._rendered else "end-1c"
+        self._edit(lambda: self.text.delete(start, end))
+        self.text.mark_unset(start)
+        del self._rendered[index]
+
+    def _trim_top(self):
+        """Unrender the oldest blocks while the widget is over budget (never the newest)"""
+        while self.rendered_chars() > self.max_rendered_chars and self.last - self.first > 1:
+            self._unrender(self.first)
+            self.first += 1
+
+    def _trim_bottom(self):
+        while self.rendered_chars() > self.max_rendered_chars and self.last - self.first > 1:
+            self.last -= 1
+            self._unrender(self.last)
+
+    def _drop_old_blocks(self):
+        """Forget blocks beyond max_blocks, unrendering any of them still on screen"""
+        overflow = len(self.blocks) - self.max_blocks
+        if overflow > 0:
+            for block in self.blocks[:overflow]:
+                self._close_spill(block)
+            del self.blocks[:overflow]
+            self.base += overflow
+            while self.first < self.base and self.last - self.first > 1:
+                self._unrender(self.first)
+                self.first += 1
+            self.first = max(self.first, min(self.base, self.last))
+
+    def _on_scroll(self, first: str, last: str):
+        self.scrollbar.set(first, last)
+        if self._loading:
+            return
+        if float(first) <= 0.0 and self.first > self.base:
+            self._loading = True
+            self.text.after_idle(self._load_older)
+        elif float(last) >= 1.0 and self.last < self.end:
+            self._loading = True
+            self.text.after_idle(self._load_newer)
+
+    def _load_older(self):
+        try:
+            anchor = self.first
+            while self.first > self.base and anchor - self.first < self.page_blocks:
+                self.first -= 1
+                self._render(self.first, "1.0")
+            self._trim_bottom()
+            self.text.yview(self._mark(anchor))
+        finally:
+            self._loading = False
+
+    def _load_newer(self):
+        try:
+            anchor = self.last
+            while self.last < self.end and self.last - anchor < self.page_blocks:
+                self._render(self.last, "end-1c")
+                self.last += 1
+            self._trim_top()
+            self.text.see(self._mark(anchor))
+        finally:
+            self._loading = False
+
+    def _edit(self, change):
+        self.text.config(state=tk.NORMAL)
+        change()
+        self.text.config(state=tk.DISABLED)
+
+    @staticmethod
+    def _mark(index: int) -> str:
+        return f"block{index}"